@@ -1,10 +1,13 @@
 from django.contrib import admin
-from .models import Categoria, Producto, MenuDia, MenuItem, Orden, OrdenItem, Pago
+from .models import (
+    Categoria, Comanda, EventoOrden, Producto, MenuDia, MenuItem, Orden, OrdenItem, Pago,
+    OrdenArchivada, OrdenItemArchivado
+)
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
-    list_display = ('nombre','activa')
-    list_filter = ('activa',)
+    list_display = ('nombre','estacion','activa')
+    list_filter = ('activa','estacion')
     search_fields = ('nombre',)
 
 @admin.register(Producto)
@@ -33,4 +36,31 @@ class OrdenAdmin(admin.ModelAdmin):
     search_fields = ('folio',)
     inlines = [OrdenItemInline]
 
+@admin.register(Comanda)
+class ComandaAdmin(admin.ModelAdmin):
+    list_display = ('orden','estacion','cocinero','tomada','terminada')
+    list_filter = ('estacion',)
+
+@admin.register(EventoOrden)
+class EventoOrdenAdmin(admin.ModelAdmin):
+    list_display = ('orden_id','estacion','anterior','nuevo','en')
+    list_filter = ('nuevo','estacion')
+    # Bitácora de sólo inserción
+    def has_change_permission(self, request, obj=None): return False
+
+class OrdenItemArchivadoInline(admin.TabularInline):
+    model = OrdenItemArchivado
+    extra = 0
+    def has_change_permission(self, request, obj=None): return False
+
+@admin.register(OrdenArchivada)
+class OrdenArchivadaAdmin(admin.ModelAdmin):
+    list_display = ('folio','estado','total','creado','archivada')
+    search_fields = ('folio',)
+    date_hierarchy = 'creado'
+    inlines = [OrdenItemArchivadoInline]
+    # El archivo sólo lo escribe archivar_ordenes
+    def has_add_permission(self, request): return False
+    def has_change_permission(self, request, obj=None): return False
+
 admin.site.register(Pago)
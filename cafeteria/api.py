@@ -1,63 +1,124 @@
 from rest_framework import viewsets, routers, status
 from rest_framework.decorators import action
+from rest_framework.permissions import BasePermission, DjangoModelPermissions
 from rest_framework.response import Response
-from django.utils import timezone
-from django.db.models import Prefetch
-from django.db.models import Sum, Count
+from django.db.models import Prefetch, Q
 
 from .models import (
     Categoria, Producto,
-    MenuDia, MenuItem,
-    Orden, OrdenItem
+    Orden, OrdenItem, Comanda,
+    OrdenArchivada, OrdenItemArchivado
 )
+from . import bitacora, catalogo, cola
+from .busqueda import autocompletar
+from .utils import normalizar
+from .campos import CamposMixin
+from .filtros import filtrar_archivadas, filtrar_ordenes, rango_fechas
+from .lectura import LecturaPlanaMixin, OrdenItemPlano, OrdenPlana, ProductoPlano
+from .paginacion import ItemsCursorPagination, RecientesCursorPagination, ReportePagination
+from .signals import recalculo_diferido
+from .transiciones import cambiar_estado
+from .versionado import VersionadoMixin
 from .serializers import (
     CategoriaSerializer, ProductoSerializer,
     MenuDiaSerializer, MenuItemSerializer,
     OrdenSerializer, OrdenCreateUpdateSerializer,
-    OrdenItemReadSerializer, OrdenItemWriteSerializer
+    OrdenItemReadSerializer, OrdenItemWriteSerializer,
+    TransicionLoteSerializer, ComandaSerializer,
+    OrdenArchivadaSerializer
 )
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(VersionadoMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all().order_by('nombre')
     serializer_class = CategoriaSerializer
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(LecturaPlanaMixin, VersionadoMixin, viewsets.ModelViewSet):
     serializer_class = ProductoSerializer
+    lectura = ProductoPlano
+    versiones_extra = (Categoria,)
+
+    def filtrar_desde(self, qs, desde):
+        # También los productos cuya categoría (anidada) cambió
+        return qs.filter(Q(actualizado__gt=desde) | Q(categoria__actualizado__gt=desde))
+
+    def _filtros(self):
+        # ?categoria= que no es un id y ?disponible= distinto de true/false se
+        # ignoran; normalizados también sirven de llave del listado en caché
+        params = self.request.query_params
+        try:
+            categoria = int(params.get('categoria') or '')
+        except ValueError:
+            categoria = None
+        disponible = params.get('disponible')
+        return categoria, disponible if disponible in ('true', 'false') else None
 
     def get_queryset(self):
         qs = Producto.objects.select_related('categoria').all().order_by('nombre')
-        categoria = self.request.query_params.get('categoria')
-        disponible = self.request.query_params.get('disponible')
+        categoria, disponible = self._filtros()
         q = self.request.query_params.get('q')
-        if categoria:
+        if categoria is not None:
             qs = qs.filter(categoria_id=categoria)
-        if disponible in ('true', 'false'):
+        if disponible is not None:
             qs = qs.filter(disponible=(disponible == 'true'))
         if q:
-            qs = qs.filter(nombre__icontains=q)
+            qs = qs.filter(nombre_busqueda__contains=normalizar(q))
         return qs
 
-class MenuDiaViewSet(viewsets.ModelViewSet):
-    queryset = MenuDia.objects.all().order_by('-fecha')
+    @action(detail=False, methods=['get'])
+    def buscar(self, request):
+        # Type-ahead del POS: sólo id/nombre/precio, sin serializer ni versión
+        try:
+            limite = max(1, min(int(request.query_params.get('limite', 10)), 50))
+        except ValueError:
+            limite = 10
+        return Response(autocompletar(request.query_params.get('q', ''), limite))
+
+    def serializar_listado(self, qs):
+        # Sin búsqueda libre, el listado sale del catálogo en caché (filtrado en Python)
+        params = self.request.query_params
+        if params.get('q'):
+            return super().serializar_listado(qs)
+        categoria, disponible = self._filtros()
+
+        def construir():
+            productos = catalogo.productos()
+            if categoria is not None:
+                productos = [p for p in productos if p.categoria_id == categoria]
+            if disponible is not None:
+                productos = [p for p in productos if p.disponible == (disponible == 'true')]
+            # Objetos del catálogo, no filas: el serializer normal (el resultado queda en caché)
+            return ProductoSerializer(productos, many=True).data
+
+        return catalogo.obtener(f"api:{'' if categoria is None else categoria}:{disponible or ''}", construir)
+
+class MenuDiaViewSet(VersionadoMixin, viewsets.ModelViewSet):
+    queryset = catalogo.menus_con_items().order_by('-fecha')
     serializer_class = MenuDiaSerializer
+    versiones_extra = (Producto, Categoria)
 
-    @action(detail=False, methods=['get'])
-    def hoy(self, request):
-        hoy = timezone.localdate()
-        menu = MenuDia.objects.filter(fecha=hoy, publicado=True).first()
-        if not menu:
-            return Response({'detail': 'Sin menú para hoy'}, status=404)
-        return Response(MenuDiaSerializer(menu).data)
+    def filtrar_desde(self, qs, desde):
+        # También los menús cuyo producto (anidado) o la categoría de éste cambió
+        return qs.filter(Q(actualizado__gt=desde) | Q(productos__actualizado__gt=desde)
+                         | Q(productos__categoria__actualizado__gt=desde)).distinct()
 
     @action(detail=True, methods=['post'])
     def agregar_item(self, request, pk=None):
         menu = self.get_object()
         ser = MenuItemSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
-        ser.save()
+        ser.save(menu=menu)
         return Response(ser.data, status=201)
 
-class OrdenViewSet(viewsets.ModelViewSet):
+class CambiarOrdenPermission(DjangoModelPermissions):
+    # Una transición modifica órdenes existentes: pide change_orden, no add_orden
+    perms_map = {**DjangoModelPermissions.perms_map,
+                 'POST': ['%(app_label)s.change_%(model_name)s']}
+
+class OrdenViewSet(CamposMixin, LecturaPlanaMixin, VersionadoMixin, viewsets.ModelViewSet):
+    pagination_class = RecientesCursorPagination
+    acciones_campos = acciones_lectura = ('list', 'retrieve', 'reporte')
+    lectura = OrdenPlana
+    serializer_class = OrdenSerializer
     queryset = (Orden.objects
                 .order_by('-creado')
                 .prefetch_related(Prefetch('items', queryset=OrdenItem.objects.select_related('producto'))))
@@ -65,7 +126,12 @@ class OrdenViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return OrdenCreateUpdateSerializer
-        return OrdenSerializer
+        return super().get_serializer_class()
+
+    def perform_destroy(self, instance):
+        # La orden se va completa: sin ajustar su total por cada item borrado
+        with recalculo_diferido(recalcular=False):
+            instance.delete()
 
     @action(detail=True, methods=['get'])
     def items(self, request, pk=None):
@@ -73,37 +139,111 @@ class OrdenViewSet(viewsets.ModelViewSet):
         data = OrdenItemReadSerializer(orden.items.all(), many=True).data
         return Response(data)
     
+    @action(detail=False, methods=['get'], pagination_class=ReportePagination)
+    def reporte(self, request):
+        # Filtros en SQL e items embebidos con el mismo Prefetch del queryset
+        try:
+            qs = filtrar_ordenes(self.filter_queryset(self.get_queryset()), request.query_params)
+            archivadas = filtrar_archivadas(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        if archivadas is not None and archivadas.exists():
+            # La paginación no cruza las dos tablas: lo archivado se consulta aparte
+            return Response({'detail': 'El rango incluye órdenes archivadas; consúltalas en '
+                                       '/api/ordenes-archivadas/ con los mismos filtros'}, status=400)
+        page = self.paginate_queryset(qs.order_by('-creado', '-id'))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=False, methods=['post'], permission_classes=[CambiarOrdenPermission])
+    def transicion(self, request):
+        # {"ordenes": [ids], "estado": "LISTA"} -> resultado por orden
+        ser = TransicionLoteSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        resultados = cambiar_estado(ser.validated_data['ordenes'], ser.validated_data['estado'])
+        return Response({'aplicadas': sum(r['ok'] for r in resultados), 'resultados': resultados})
+
     @action(detail=False, methods=['get'])
-    def estadisticas(self, request):
-        hoy = timezone.localdate()
-        qs_hoy = Orden.objects.filter(creado__date=hoy)
-
-        estados = Orden.Estado
-        total_ventas_hoy = (
-            qs_hoy.exclude(estado=estados.PENDIENTE_PAGO)
-                 .aggregate(s=Sum('total'))['s'] or 0
-        )
-
-        data = {
-            "fecha": str(hoy),
-            "total_ventas_hoy": float(total_ventas_hoy),
-            "total_ordenes_hoy": qs_hoy.count(),
-            "pendientes_pago": qs_hoy.filter(estado=estados.PENDIENTE_PAGO).count(),
-            "pagadas": qs_hoy.filter(estado=estados.PAGADA).count(),
-            "en_cola": qs_hoy.filter(estado=estados.EN_COLA).count(),
-            "en_preparacion": qs_hoy.filter(estado=estados.EN_PREPARACION).count(),
-            "listas": qs_hoy.filter(estado=estados.LISTA).count(),
-            "entregadas": qs_hoy.filter(estado=estados.ENTREGADA).count(),
-        }
-        return Response(data)
+    def latencias(self, request):
+        # Percentiles de espera/preparación desde la bitácora de transiciones
+        try:
+            desde, hasta = rango_fechas(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        return Response({'desde': str(desde), 'hasta': str(hasta), **bitacora.latencias(desde, hasta)})
 
-class OrdenItemViewSet(viewsets.ModelViewSet):
+class OrdenItemViewSet(CamposMixin, LecturaPlanaMixin, viewsets.ModelViewSet):
+    pagination_class = ItemsCursorPagination
+    lectura = OrdenItemPlano
+    serializer_class = OrdenItemWriteSerializer
     queryset = OrdenItem.objects.select_related('orden', 'producto').all().order_by('-id')
 
-    def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
-            return OrdenItemReadSerializer
-        return OrdenItemWriteSerializer
+    # list/retrieve: OrdenItemPlano (misma salida que OrdenItemReadSerializer)
+
+class OrdenArchivadaViewSet(viewsets.ReadOnlyModelViewSet):
+    """Órdenes movidas al archivo; mismo id que tenían en ``/api/ordenes/``.
+
+    ``?folio=`` busca una; con ``?desde`` aplica los filtros del reporte.
+    """
+    serializer_class = OrdenArchivadaSerializer
+    pagination_class = ReportePagination
+    queryset = (OrdenArchivada.objects
+                .select_related('pago')
+                .prefetch_related(Prefetch('items', queryset=OrdenItemArchivado.objects.select_related('producto')))
+                .order_by('-creado', '-id'))
+
+    def filter_queryset(self, qs):
+        params = self.request.query_params
+        if params.get('folio'):
+            qs = qs.filter(folio=params['folio'])
+        if params.get('desde'):
+            qs = filtrar_ordenes(qs, params)
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        try:
+            return super().list(request, *args, **kwargs)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+
+class PuedeCocinar(BasePermission):
+    # Las comandas se operan con el permiso de cocina sobre órdenes
+    def has_permission(self, request, view):
+        return request.user.has_perm('cafeteria.change_orden')
+
+class ComandaViewSet(viewsets.ReadOnlyModelViewSet):
+    """Comandas en curso del cocinero; ``?estacion=`` para una sola estación."""
+    serializer_class = ComandaSerializer
+    permission_classes = [PuedeCocinar]
+
+    def get_queryset(self):
+        qs = Comanda.objects.filter(cocinero=self.request.user, terminada__isnull=True)
+        if self.request.query_params.get('estacion'):
+            qs = qs.filter(estacion=self.request.query_params['estacion'])
+        return qs.order_by('tomada', 'pk')
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.get_serializer(cola.con_lineas(self.get_queryset()), many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def estaciones(self, request):
+        return Response(cola.estaciones())
+
+    @action(detail=False, methods=['post'])
+    def tomar(self, request):
+        estacion = request.data.get('estacion')
+        if not estacion:
+            return Response({'detail': 'Falta "estacion"'}, status=400)
+        comanda = cola.tomar_siguiente(estacion, request.user)
+        if comanda is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        c, = cola.con_lineas(Comanda.objects.filter(pk=comanda.pk))
+        return Response(self.get_serializer(c).data, status=201)
+
+    @action(detail=True, methods=['post'])
+    def terminar(self, request, pk=None):
+        if not cola.terminar(self.get_object()):
+            return Response({'detail': 'La comanda ya estaba terminada'}, status=409)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 router = routers.DefaultRouter()
 router.register(r'categorias', CategoriaViewSet, basename='categoria')
@@ -111,3 +251,5 @@ router.register(r'productos', ProductoViewSet, basename='producto')
 router.register(r'menu', MenuDiaViewSet, basename='menu')
 router.register(r'ordenes', OrdenViewSet, basename='orden')
 router.register(r'orden-items', OrdenItemViewSet, basename='ordenitem')
+router.register(r'ordenes-archivadas', OrdenArchivadaViewSet, basename='ordenarchivada')
+router.register(r'comandas', ComandaViewSet, basename='comanda')
@@ -4,4 +4,4 @@ class CafeteriaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cafeteria'
     def ready(self):
-        from . import signals  # noqa
+        from . import metricas, signals  # noqa  (metricas: antes de la primera conexión)
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import resumen
+from .models import (
+    Comanda, Orden, OrdenArchivada, OrdenItem, OrdenItemArchivado, Pago, PagoArchivado
+)
+
+CAMPOS_ORDEN = ('id', 'folio', 'alumno_id', 'creada_por_id', 'estado', 'total', 'creado', 'actualizado')
+CAMPOS_ITEM = ('orden_id', 'producto_id', 'cantidad', 'precio_unitario', 'subtotal')
+CAMPOS_PAGO = ('orden_id', 'metodo', 'monto', 'recibido_en')
+
+
+def corte(dias=None):
+    """Inicio (hora local) del día más viejo que se conserva en las tablas vivas."""
+    dias = settings.ARCHIVO_RETENCION_DIAS if dias is None else dias
+    inicio, _ = resumen.rango_dias(timezone.localdate() - timedelta(days=dias))
+    return inicio
+
+def archivables(antes_de):
+    return Orden.objects.filter(estado=Orden.Estado.ENTREGADA, creado__lt=antes_de)
+
+def _borrar(modelo, columna, ids):
+    # DELETE directo: sin señales (ajustes de total y de resumen) ni el Collector
+    q = connection.ops.quote_name
+    marcas = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cur:
+        cur.execute(f'DELETE FROM {q(modelo._meta.db_table)} WHERE {q(columna)} IN ({marcas})', ids)
+
+@transaction.atomic
+def archivar_lote(antes_de, lote=500, resumidos=None):
+    """Mueve hasta ``lote`` órdenes ENTREGADA anteriores a ``antes_de`` (con sus
+    líneas y pago) al archivo; devuelve cuántas movió.
+
+    Antes de mover, reconstruye el resumen de cada día tocado que no esté en
+    ``resumidos`` (y lo agrega), para que los reportes no dependan de las filas.
+    """
+    filas = list(archivables(antes_de).select_for_update()
+                 .order_by('creado', 'id').values(*CAMPOS_ORDEN)[:lote])
+    if not filas:
+        return 0
+    resumidos = set() if resumidos is None else resumidos
+    for fecha in {timezone.localtime(f['creado']).date() for f in filas} - resumidos:
+        resumen.reconstruir(fecha)
+        resumidos.add(fecha)
+
+    ids = [f['id'] for f in filas]
+    OrdenArchivada.objects.bulk_create([OrdenArchivada(**f) for f in filas])
+    OrdenItemArchivado.objects.bulk_create([
+        OrdenItemArchivado(**f) for f in OrdenItem.objects.filter(orden_id__in=ids).values(*CAMPOS_ITEM)])
+    PagoArchivado.objects.bulk_create([
+        PagoArchivado(**f) for f in Pago.objects.filter(orden_id__in=ids).values(*CAMPOS_PAGO)])
+    # La bitácora (EventoOrden) no tiene FK real: se queda y sigue apuntando al mismo id
+    for modelo in (Comanda, Pago, OrdenItem):
+        _borrar(modelo, 'orden_id', ids)
+    _borrar(Orden, 'id', ids)
+    return len(ids)
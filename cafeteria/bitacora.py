@@ -0,0 +1,92 @@
+import math
+from datetime import timedelta
+
+from django.db.models import Subquery
+from django.utils import timezone
+
+from .models import EventoOrden, Orden
+from .resumen import rango_dias
+
+Estado = Orden.Estado
+
+# Tramo medido -> (estado con el que empieza, estado con el que termina)
+TRAMOS = {
+    'espera': (Estado.EN_COLA, Estado.EN_PREPARACION),
+    'preparacion': (Estado.EN_PREPARACION, Estado.LISTA),
+}
+PERCENTILES = (50, 95, 99)
+
+
+def registrar_estaciones(pares, anterior, nuevo, en=None):
+    """Una transición por ``(orden_id, estacion)``, todas en un solo INSERT."""
+    en = en or timezone.now()
+    EventoOrden.objects.bulk_create([
+        EventoOrden(orden_id=pk, estacion=estacion, anterior=anterior or '', nuevo=nuevo, en=en)
+        for pk, estacion in pares
+    ])
+
+def registrar(orden_ids, anterior, nuevo, en=None, estacion=''):
+    registrar_estaciones([(pk, estacion) for pk in orden_ids], anterior, nuevo, en)
+
+
+def percentil(ordenados, p):
+    # Rango más cercano sobre una lista ya ordenada
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+def estadistica(segundos):
+    segundos = sorted(segundos)
+    if not segundos:
+        return {'n': 0, **{f'p{p}': None for p in PERCENTILES}}
+    return {'n': len(segundos), **{f'p{p}': round(percentil(segundos, p), 1) for p in PERCENTILES}}
+
+
+def duraciones(desde, hasta=None):
+    """Itera ``(tramo, estacion, inicio, segundos)`` de los tramos que empezaron en el rango.
+
+    Se leen sólo los eventos de las órdenes que iniciaron algún tramo en el
+    rango, ordenados por orden y tiempo, y se emparejan en una pasada.
+    """
+    inicio, fin = rango_dias(desde, hasta)
+    arranques = {a for a, _ in TRAMOS.values()}
+    ordenes = (EventoOrden.objects.filter(en__gte=inicio, en__lt=fin, nuevo__in=arranques)
+               .values('orden_id'))
+    eventos = (EventoOrden.objects
+               .filter(orden_id__in=Subquery(ordenes), en__gte=inicio, en__lt=fin + timedelta(days=1))
+               .order_by('orden_id', 'estacion', 'en', 'pk')
+               .values_list('orden_id', 'estacion', 'nuevo', 'en'))
+    abiertos = {}
+    for orden_id, estacion, nuevo, en in eventos.iterator(chunk_size=2000):
+        for tramo, (desde_estado, hasta_estado) in TRAMOS.items():
+            clave = (orden_id, estacion, tramo)
+            if nuevo == desde_estado:
+                abiertos[clave] = en
+            elif nuevo == hasta_estado and clave in abiertos:
+                empezo = abiertos.pop(clave)
+                if empezo < fin:
+                    yield tramo, estacion, empezo, (en - empezo).total_seconds()
+
+
+def latencias(desde, hasta=None):
+    """p50/p95/p99 (segundos) de espera en cola y de preparación, por hora y por estación.
+
+    La hora es la hora local en que empezó el tramo; las estaciones salen de
+    las comandas y el agregado por hora, de las transiciones de la orden completa.
+    """
+    por_hora, por_estacion = {}, {}
+    for tramo, estacion, empezo, segundos in duraciones(desde, hasta):
+        if estacion:
+            grupo = por_estacion.setdefault(estacion, {t: [] for t in TRAMOS})
+        else:
+            hora = timezone.localtime(empezo).replace(minute=0, second=0, microsecond=0)
+            grupo = por_hora.setdefault(hora, {t: [] for t in TRAMOS})
+        grupo[tramo].append(segundos)
+
+    def resumir(grupo):
+        return {t: estadistica(v) for t, v in grupo.items()}
+
+    total = {t: [s for g in por_hora.values() for s in g[t]] for t in TRAMOS}
+    return {
+        'general': resumir(total),
+        'por_hora': [{'hora': h.isoformat(), **resumir(g)} for h, g in sorted(por_hora.items())],
+        'por_estacion': [{'estacion': e, **resumir(g)} for e, g in sorted(por_estacion.items())],
+    }
@@ -0,0 +1,95 @@
+import threading
+from bisect import bisect_left
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+
+from . import catalogo
+from .models import Producto
+from .utils import normalizar
+
+# Rango de coincidencia: el nombre empieza con q, alguna palabra empieza con q,
+# o q aparece en medio.
+PREFIJO, PALABRA, CONTIENE = 0, 1, 2
+
+
+class IndicePrefijos:
+    """Índice en memoria sobre el catálogo en caché (fallback sin PostgreSQL).
+
+    Guarda, ordenados, los sufijos de cada nombre normalizado que empiezan en
+    una palabra; un prefijo se resuelve con bisect y el resto es un recorrido
+    lineal para las coincidencias en medio de palabra.
+    """
+
+    def __init__(self, productos):
+        self.productos = productos
+        self.nombres = [normalizar(p.nombre) for p in productos]
+        claves = []
+        for i, nombre in enumerate(self.nombres):
+            inicio = 0
+            for palabra in nombre.split(' '):
+                claves.append((nombre[inicio:], i, PREFIJO if inicio == 0 else PALABRA))
+                inicio += len(palabra) + 1
+        claves.sort()
+        self.claves = claves
+        self._solo_claves = [c for c, _, _ in claves]
+
+    def buscar(self, q):
+        rangos = {}
+        pos = bisect_left(self._solo_claves, q)
+        while pos < len(self.claves) and self.claves[pos][0].startswith(q):
+            _, i, rango = self.claves[pos]
+            rangos[i] = min(rango, rangos.get(i, CONTIENE))
+            pos += 1
+        for i, nombre in enumerate(self.nombres):
+            if i not in rangos and q in nombre:
+                rangos[i] = CONTIENE
+        orden = sorted(rangos, key=lambda i: (rangos[i], self.nombres[i], i))
+        return [self.productos[i] for i in orden]
+
+
+_indice = threading.local()
+
+def _indice_vigente():
+    # Un índice por hilo y por versión del catálogo
+    version = catalogo.version()
+    if getattr(_indice, 'version', None) != version:
+        _indice.valor = IndicePrefijos(catalogo.productos())
+        _indice.version = version
+    return _indice.valor
+
+
+def _queryset(qn, solo_disponibles):
+    qs = Producto.objects.filter(nombre_busqueda__contains=qn)
+    if solo_disponibles:
+        qs = qs.filter(disponible=True)
+    rango = Case(
+        When(nombre_busqueda__startswith=qn, then=Value(PREFIJO)),
+        When(nombre_busqueda__contains=' ' + qn, then=Value(PALABRA)),
+        default=Value(CONTIENE), output_field=IntegerField())
+    return qs.annotate(rango=rango).order_by('rango', 'nombre_busqueda', 'pk')
+
+def usa_indice_sql():
+    return connection.vendor == 'postgresql'
+
+def buscar_productos(q, solo_disponibles=True, limite=None):
+    """Productos que coinciden con ``q`` sin distinguir acentos, ya ordenados por rango."""
+    qn = normalizar(q)
+    if not qn:
+        return []
+    if usa_indice_sql():
+        return list(_queryset(qn, solo_disponibles).select_related('categoria')[:limite])
+    productos = _indice_vigente().buscar(qn)
+    if solo_disponibles:
+        productos = [p for p in productos if p.disponible]
+    return productos[:limite]
+
+def autocompletar(q, limite=10):
+    """Sólo id/nombre/precio de los disponibles, para el type-ahead del POS."""
+    qn = normalizar(q)
+    if not qn:
+        return []
+    if usa_indice_sql():
+        return list(_queryset(qn, True).values('id', 'nombre', 'precio')[:limite])
+    return [{'id': p.pk, 'nombre': p.nombre, 'precio': p.precio}
+            for p in buscar_productos(qn, limite=limite)]
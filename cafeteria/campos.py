@@ -0,0 +1,66 @@
+from functools import cached_property
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+def recortar(qs, campos, extra=()):
+    """Limita el SELECT de ``qs`` a lo que leen los ``campos`` del serializer.
+
+    Las relaciones inversas (p. ej. ``items``) conservan su prefetch sólo si se
+    pidieron; un campo que no sale de una columna (``source='*'``, propiedades)
+    deja el queryset como estaba.
+    """
+    meta = qs.model._meta
+    columnas, inversas = {meta.pk.name, *extra}, set()
+    for campo in campos.values():
+        partes = campo.source.split('.')
+        try:
+            f = meta.get_field(partes[0])
+        except FieldDoesNotExist:
+            return qs
+        if f.is_relation and not f.concrete:
+            inversas.add(partes[0])
+        else:
+            columnas.add('__'.join(partes))
+    relacionadas = {c.rsplit('__', 1)[0] for c in columnas if '__' in c}
+    qs = qs.select_related(None)
+    if relacionadas:
+        qs = qs.select_related(*relacionadas)
+    if not inversas:
+        qs = qs.prefetch_related(None)
+    return qs.only(*columnas)
+
+
+class CamposMixin:
+    """``?fields=id,folio,...`` en lecturas: recorta la respuesta y el SELECT (``only()``)."""
+    acciones_campos = ('list', 'retrieve')
+
+    @cached_property
+    def campos(self):
+        valor = self.request.query_params.get('fields') if self.action in self.acciones_campos else None
+        if not valor:
+            return None
+        pedidos = [c.strip() for c in valor.split(',') if c.strip()]
+        disponibles = self.get_serializer_class()().fields
+        desconocidos = set(pedidos) - set(disponibles)
+        if desconocidos:
+            raise ValidationError({'fields': f"Campos desconocidos: {', '.join(sorted(desconocidos))}"})
+        return {n: disponibles[n] for n in pedidos}
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if not self.campos:
+            return qs
+        # El cursor lee las columnas del orden de cada fila de la página
+        orden = getattr(self.paginator, 'ordering', None) or ()
+        orden = [orden] if isinstance(orden, str) else orden
+        return recortar(qs, self.campos, extra=[o.lstrip('-') for o in orden])
+
+    def get_serializer(self, *args, **kwargs):
+        ser = super().get_serializer(*args, **kwargs)
+        if self.campos:
+            hijo = getattr(ser, 'child', ser)
+            for nombre in set(hijo.fields) - set(self.campos):
+                hijo.fields.pop(nombre)
+        return ser
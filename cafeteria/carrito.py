@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.http import Http404
+
+from . import catalogo
+from .folios import siguiente_folio
+from .models import Orden, OrdenItem, Producto
+
+LLAVE_SESION = 'carrito'
+
+
+class LineaBorrador:
+    # Mismos atributos que usa partials/_carrito.html de un OrdenItem;
+    # el id es el del producto (una línea por producto).
+    def __init__(self, producto, cantidad):
+        self.id = producto.pk
+        self.producto = producto
+        self.cantidad = cantidad
+        self.precio_unitario = producto.precio
+        self.subtotal = cantidad * producto.precio
+
+
+class _Lineas:
+    def __init__(self, lineas):
+        self._lineas = lineas
+
+    def all(self):
+        return self._lineas
+
+    def exists(self):
+        return bool(self._lineas)
+
+
+class CarritoBorrador:
+    """Orden en captura que vive en la sesión hasta cobrarla.
+
+    Sólo guarda ``{producto_id: cantidad}``; precios y nombres salen del
+    catálogo en caché, así que armar el carrito no toca la base de datos.
+    """
+    folio = 'Borrador'
+    estado = Orden.Estado.PENDIENTE_PAGO
+
+    def __init__(self, cantidades=None):
+        self.cantidades = {str(k): v for k, v in (cantidades or {}).items()}
+
+    @classmethod
+    def de_sesion(cls, session):
+        datos = session.get(LLAVE_SESION)
+        return cls(datos) if datos is not None else None
+
+    def guardar(self, session):
+        session[LLAVE_SESION] = self.cantidades
+
+    @staticmethod
+    def descartar(session):
+        session.pop(LLAVE_SESION, None)
+
+    def agregar(self, producto_id, cantidad):
+        producto = catalogo.por_id().get(producto_id)
+        if producto is None or not producto.disponible:
+            raise Http404("Producto no disponible")
+        k = str(producto_id)
+        self.cantidades[k] = self.cantidades.get(k, 0) + cantidad
+
+    def quitar(self, producto_id):
+        if self.cantidades.pop(str(producto_id), None) is None:
+            raise Http404("El producto no está en el carrito")
+
+    @property
+    def lineas(self):
+        mapa = catalogo.por_id()
+        return [LineaBorrador(mapa[int(k)], c) for k, c in self.cantidades.items()
+                if int(k) in mapa]
+
+    @property
+    def items(self):
+        return _Lineas(self.lineas)
+
+    @property
+    def total(self):
+        return sum((l.subtotal for l in self.lineas), 0)
+
+    def get_estado_display(self):
+        return Orden.Estado(self.estado).label
+
+    @transaction.atomic
+    def persistir(self, usuario):
+        """Crea la Orden PAGADA con todas sus líneas en una sola transacción.
+
+        Los precios se toman de la base (no del caché) al momento de cobrar.
+        Si algún producto del carrito ya no está disponible lanza ValueError
+        sin escribir nada: el total que vio el cliente ya no se puede cobrar.
+        """
+        productos = Producto.objects.in_bulk([int(k) for k in self.cantidades])
+        faltan = [k for k in self.cantidades
+                  if int(k) not in productos or not productos[int(k)].disponible]
+        if faltan:
+            mapa = catalogo.por_id()
+            nombres = [getattr(productos.get(int(k)) or mapa.get(int(k)), 'nombre', f'#{k}') for k in faltan]
+            raise ValueError(f"Ya no están disponibles: {', '.join(nombres)}; quítalos del carrito")
+        lineas = [OrdenItem(producto=productos[int(k)], cantidad=c,
+                            precio_unitario=productos[int(k)].precio,
+                            subtotal=c * productos[int(k)].precio)
+                  for k, c in self.cantidades.items()]
+        if not lineas:
+            return None
+        orden = Orden.objects.create(
+            folio=siguiente_folio(), creada_por=usuario, estado=Orden.Estado.PAGADA,
+            total=sum(l.subtotal for l in lineas))
+        for l in lineas:
+            l.orden = orden
+        OrdenItem.objects.bulk_create(lineas)
+        return orden
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .models import Categoria, MenuDia, MenuItem, Producto
+
+# Catálogo y menú del día. Todas las llaves incluyen la versión vigente: invalidar es sólo
+# incrementarla, y las entradas viejas expiran solas.
+LLAVE_VERSION = 'catalogo:version'
+
+
+def version():
+    v = cache.get(LLAVE_VERSION)
+    if v is None:
+        cache.add(LLAVE_VERSION, 1, timeout=None)
+        v = cache.get(LLAVE_VERSION, 1)
+    return v
+
+async def aversion():
+    v = await cache.aget(LLAVE_VERSION)
+    if v is None:
+        await cache.aadd(LLAVE_VERSION, 1, timeout=None)
+        v = await cache.aget(LLAVE_VERSION, 1)
+    return v
+
+def invalidar():
+    try:
+        cache.incr(LLAVE_VERSION)
+    except ValueError:
+        cache.add(LLAVE_VERSION, 1, timeout=None)
+
+def llave(*partes, v=None):
+    return ':'.join(['catalogo', str(v or version()), *map(str, partes)])
+
+def obtener(nombre, construir):
+    """Lee ``nombre`` de la versión vigente o lo construye y guarda."""
+    k = llave(nombre)
+    valor = cache.get(k)
+    if valor is None:
+        valor = construir()
+        cache.set(k, valor, settings.CATALOGO_CACHE_TTL)
+    return valor
+
+async def aobtener(nombre, construir):
+    """``obtener`` para vistas async: ``construir`` es una corrutina."""
+    k = llave(nombre, v=await aversion())
+    valor = await cache.aget(k)
+    if valor is None:
+        valor = await construir()
+        await cache.aset(k, valor, settings.CATALOGO_CACHE_TTL)
+    return valor
+
+
+def _cargar():
+    # Dos queries sin JOIN: la categoría se toma del mapa
+    mapa = {c.pk: c for c in Categoria.objects.order_by('nombre')}
+    productos = list(Producto.objects.order_by('nombre'))
+    for p in productos:
+        p.categoria = mapa[p.categoria_id]
+    return {'categorias': mapa, 'productos': productos,
+            'por_id': {p.pk: p for p in productos}}
+
+def datos():
+    return obtener('datos', _cargar)
+
+def categorias():
+    """Mapa id -> Categoria."""
+    return datos()['categorias']
+
+def productos():
+    """Todos los productos ordenados por nombre, con su categoría."""
+    return datos()['productos']
+
+def por_id():
+    """Mapa id -> Producto."""
+    return datos()['por_id']
+
+def productos_disponibles():
+    return [p for p in productos() if p.disponible]
+
+
+def menus_con_items():
+    # Menú -> items -> producto -> categoría en dos queries, sin importar el tamaño
+    items = MenuItem.objects.select_related('producto__categoria').order_by('pk')
+    return MenuDia.objects.prefetch_related(Prefetch('menuitem_set', queryset=items))
+
+def menu_del_dia(fecha):
+    """Menú publicado de ``fecha`` con sus items ya cargados, o None."""
+    return obtener(f'menu:{fecha}', lambda: {
+        'menu': menus_con_items().filter(fecha=fecha, publicado=True).first()
+    })['menu']
+
+async def amenu_del_dia(fecha):
+    # Misma llave que menu_del_dia: las vistas sync y async comparten la entrada
+    async def construir():
+        return {'menu': await menus_con_items().filter(fecha=fecha, publicado=True).afirst()}
+    return (await aobtener(f'menu:{fecha}', construir))['menu']
@@ -0,0 +1,106 @@
+from django.db import connection, transaction
+from django.db.models import Count, Prefetch
+from django.utils import timezone
+
+from . import bitacora
+from .models import Categoria, Comanda, Orden, OrdenItem
+from .transiciones import cambiar_estado
+
+Estado = Orden.Estado
+
+# Estados de orden con comandas que todavía se pueden tomar
+ESTADOS_TOMABLES = (Estado.EN_COLA, Estado.EN_PREPARACION)
+
+
+def _por_estacion():
+    pendientes = (Comanda.objects
+                  .filter(cocinero__isnull=True, orden__estado__in=ESTADOS_TOMABLES)
+                  .values_list('estacion').annotate(n=Count('pk')).order_by())
+    todas = Categoria.objects.values_list('estacion', flat=True).distinct()
+    return pendientes, todas
+
+def _combinar(pendientes, todas):
+    return {e: pendientes.get(e, 0) for e in sorted({*todas, *pendientes})}
+
+def estaciones():
+    """Estación -> comandas en espera, incluidas las estaciones sin trabajo."""
+    pendientes, todas = _por_estacion()
+    return _combinar(dict(pendientes), todas)
+
+async def aestaciones():
+    """``estaciones`` con el ORM async."""
+    pendientes, todas = _por_estacion()
+    return _combinar({e: n async for e, n in pendientes}, [e async for e in todas])
+
+
+def con_lineas(comandas):
+    """Comandas con ``lineas``: sólo los items de la orden que son de su estación."""
+    items = OrdenItem.objects.select_related('producto__categoria').order_by('pk')
+    comandas = list(comandas.select_related('orden')
+                    .prefetch_related(Prefetch('orden__items', queryset=items)))
+    for c in comandas:
+        c.lineas = [i for i in c.orden.items.all() if i.producto.categoria.estacion == c.estacion]
+    return comandas
+
+def en_curso(estacion, cocinero):
+    """Lo que el cocinero tiene tomado y sin terminar en la estación."""
+    return con_lineas(Comanda.objects.filter(estacion=estacion, cocinero=cocinero,
+                                             terminada__isnull=True).order_by('tomada', 'pk'))
+
+
+def _pendientes(estacion):
+    return (Comanda.objects
+            .filter(estacion=estacion, cocinero__isnull=True, orden__estado__in=ESTADOS_TOMABLES)
+            .order_by('creada', 'pk'))
+
+def _reclamar(pk, cocinero, ahora):
+    # UPDATE condicional: sólo gana quien la encuentra todavía sin cocinero
+    return Comanda.objects.filter(pk=pk, cocinero__isnull=True).update(cocinero=cocinero, tomada=ahora)
+
+@transaction.atomic
+def _tomar_skip_locked(estacion, cocinero, ahora):
+    # Cada cocinero salta las filas que otro está tomando en vez de esperarlas;
+    # el candado dura sólo lo que tarda el reclamo
+    comanda = _pendientes(estacion).select_for_update(skip_locked=True, of=('self',)).first()
+    if comanda is not None:
+        _reclamar(comanda.pk, cocinero, ahora)
+    return comanda
+
+def _tomar_optimista(estacion, cocinero, ahora):
+    # Sin candados de fila (SQLite): se lee la candidata y se reclama; si otro
+    # ganó en medio, se intenta con la siguiente.
+    while True:
+        comanda = _pendientes(estacion).first()
+        if comanda is None or _reclamar(comanda.pk, cocinero, ahora):
+            return comanda
+
+def tomar_siguiente(estacion, cocinero):
+    """El cocinero toma la comanda más antigua de su estación, o None si no hay."""
+    ahora = timezone.now()
+    if connection.features.has_select_for_update_skip_locked:
+        comanda = _tomar_skip_locked(estacion, cocinero, ahora)
+    else:
+        comanda = _tomar_optimista(estacion, cocinero, ahora)
+    if comanda is None:
+        return None
+    comanda.cocinero, comanda.tomada = cocinero, ahora
+    bitacora.registrar([comanda.orden_id], Estado.EN_COLA, Estado.EN_PREPARACION,
+                       en=ahora, estacion=estacion)
+    # La primera estación que empieza pone la orden en preparación
+    cambiar_estado([comanda.orden_id], Estado.EN_PREPARACION)
+    return comanda
+
+@transaction.atomic
+def terminar(comanda):
+    """Marca la comanda terminada; la última de la orden la pasa a LISTA."""
+    # Tocar la orden primero serializa a las estaciones que terminan a la vez:
+    # la última siempre ve terminadas a las demás.
+    ahora = timezone.now()
+    Orden.objects.filter(pk=comanda.orden_id).update(actualizado=ahora)
+    if not Comanda.objects.filter(pk=comanda.pk, terminada__isnull=True).update(terminada=ahora):
+        return False
+    bitacora.registrar([comanda.orden_id], Estado.EN_PREPARACION, Estado.LISTA,
+                       en=ahora, estacion=comanda.estacion)
+    if not Comanda.objects.filter(orden_id=comanda.orden_id, terminada__isnull=True).exists():
+        cambiar_estado([comanda.orden_id], Estado.LISTA)
+    return True
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+from .models import Orden
+
+ESTADOS_COCINA = (Orden.Estado.EN_COLA, Orden.Estado.EN_PREPARACION, Orden.Estado.LISTA)
+
+# Eventos ``(tipo, orden_id)`` juntados por en_lote() (None = uno por publicación)
+_lote: ContextVar = ContextVar('eventos_lote', default=None)
+
+
+class Suscripcion:
+    """Cola de un cliente conectado; se usa como ``with hub.suscribir() as sub``."""
+
+    def __init__(self, hub, maximo=100):
+        self.hub = hub
+        self.maximo = maximo
+
+    def __enter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=self.maximo)
+        self.hub._registrar(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.hub._quitar(self)
+
+    def entregar(self, evento):
+        # Llamado desde cualquier hilo: el put ocurre dentro del loop del cliente
+        def _put():
+            try:
+                self.cola.put_nowait(evento)
+            except asyncio.QueueFull:
+                pass  # cliente lento: se resincroniza al recargar la pantalla
+        try:
+            self.loop.call_soon_threadsafe(_put)
+        except RuntimeError:
+            self.hub._quitar(self)  # el loop ya cerró
+
+    async def recibir(self, timeout=None):
+        """Siguiente evento, o ``None`` si pasa ``timeout`` segundos sin eventos."""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class HubLocal:
+    """Difusión en memoria del proceso.
+
+    Basta con un solo worker ASGI; con varios procesos hay que apuntar
+    ``COCINA_HUB`` a una implementación sobre un broker externo que exponga
+    la misma interfaz (``suscribir()`` y ``publicar(evento)``).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscripciones = set()
+
+    def suscribir(self):
+        return Suscripcion(self)
+
+    def publicar(self, evento):
+        with self._lock:
+            destinos = list(self._suscripciones)
+        for sub in destinos:
+            sub.entregar(evento)
+
+    def _registrar(self, sub):
+        with self._lock:
+            self._suscripciones.add(sub)
+
+    def _quitar(self, sub):
+        with self._lock:
+            self._suscripciones.discard(sub)
+
+
+@lru_cache(maxsize=None)
+def obtener_hub():
+    return import_string(settings.COCINA_HUB)()
+
+@receiver(setting_changed)
+def _reiniciar_hub(setting, **kwargs):
+    if setting == 'COCINA_HUB':
+        obtener_hub.cache_clear()
+
+
+def evento_orden(tipo, orden):
+    # ``orden`` llega con creada_por e items ya cargados para renderizar la tarjeta
+    evento = {'tipo': tipo, 'orden': orden.pk, 'folio': orden.folio, 'estado': orden.estado}
+    if orden.estado in ESTADOS_COCINA:
+        evento['html'] = render_to_string('partials/_card_orden.html', {'o': orden})
+    return evento
+
+
+def _publicar_lote(pendientes):
+    # Todas las órdenes del lote en un in_bulk; un evento por pedido, en su orden
+    ordenes = (Orden.objects
+               .select_related('creada_por')
+               .prefetch_related('items__producto')
+               .in_bulk({pk for _, pk in pendientes}))
+    hub = obtener_hub()
+    for tipo, pk in pendientes:
+        if pk in ordenes:
+            hub.publicar(evento_orden(tipo, ordenes[pk]))
+
+@contextmanager
+def en_lote():
+    """Junta los ``publicar_orden`` del bloque en un solo ``on_commit``.
+
+    Se usa dentro de la transacción: si el bloque falla no se registra nada,
+    y si la transacción se revierte Django descarta el callback.
+    """
+    if _lote.get() is not None:
+        yield
+        return
+    token = _lote.set([])
+    try:
+        yield
+        pendientes = _lote.get()
+    finally:
+        _lote.reset(token)
+    if pendientes:
+        transaction.on_commit(partial(_publicar_lote, pendientes))
+
+def publicar_orden(tipo, orden):
+    """Publica el cambio de la orden cuando la transacción confirme."""
+    pendientes = _lote.get()
+    if pendientes is not None:
+        pendientes.append((tipo, orden.pk))
+    else:
+        transaction.on_commit(partial(_publicar_lote, [(tipo, orden.pk)]))
+
+def formato_sse(evento):
+    return f"event: orden\ndata: {json.dumps(evento)}\n\n"
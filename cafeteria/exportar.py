@@ -0,0 +1,94 @@
+import csv
+import heapq
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Subquery
+
+from .models import OrdenItem, OrdenItemArchivado
+
+CHUNK = 2000
+
+# tipo -> columnas exportadas vía values_list()
+COLUMNAS = {
+    'ordenes': [
+        'id', 'folio', 'creado', 'estado', 'total',
+        'creada_por__username', 'alumno__username',
+        'pago__metodo', 'pago__monto', 'pago__recibido_en',
+    ],
+    'lineas': [
+        'orden_id', 'orden__folio', 'orden__creado', 'orden__estado',
+        'producto_id', 'producto__nombre', 'cantidad', 'precio_unitario', 'subtotal',
+    ],
+}
+# Orden de salida; también la llave para intercalar las filas del archivo
+ORDEN = {'ordenes': ('creado', 'id'), 'lineas': ('orden__creado', 'orden_id')}
+TIPOS = tuple(COLUMNAS)
+FORMATOS = ('csv', 'ndjson')
+
+
+def _consulta(tipo, ordenes, modelo_items):
+    if tipo == 'ordenes':
+        qs = ordenes.order_by('creado', 'id')
+    else:
+        qs = (modelo_items.objects
+              .filter(orden_id__in=Subquery(ordenes.values('pk')))
+              .order_by('orden__creado', 'orden_id', 'id'))
+    return qs.values_list(*COLUMNAS[tipo]).iterator(chunk_size=CHUNK)
+
+def filas(tipo, ordenes, archivadas=None):
+    """Itera las filas a exportar con cursor del lado del servidor.
+
+    ``ordenes`` es un queryset de Orden ya filtrado; para ``lineas`` se usa como
+    subconsulta, así que nunca se materializa en Python. Con ``archivadas``
+    (queryset de OrdenArchivada con los mismos filtros) se abre un segundo
+    cursor y las filas de ambos se intercalan por fecha.
+    """
+    vivas = _consulta(tipo, ordenes, OrdenItem)
+    if archivadas is None:
+        return vivas
+    posiciones = [COLUMNAS[tipo].index(c) for c in ORDEN[tipo]]
+    return heapq.merge(_consulta(tipo, archivadas, OrdenItemArchivado), vivas,
+                       key=lambda fila: [fila[i] for i in posiciones])
+
+
+class _Eco:
+    # Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla
+    def write(self, valor):
+        return valor
+
+def _valor_csv(v):
+    return v.isoformat() if hasattr(v, 'isoformat') else v
+
+def generar(tipo, formato, ordenes, archivadas=None):
+    """Genera el archivo pieza por pieza (str) en CSV o NDJSON."""
+    columnas = COLUMNAS[tipo]
+    if formato == 'csv':
+        writer = csv.writer(_Eco())
+        yield writer.writerow(columnas)
+        for fila in filas(tipo, ordenes, archivadas):
+            yield writer.writerow([_valor_csv(v) for v in fila])
+    else:
+        encoder = DjangoJSONEncoder()
+        for fila in filas(tipo, ordenes, archivadas):
+            yield encoder.encode(dict(zip(columnas, fila))) + '\n'
+
+
+async def agenerar(tipo, formato, ordenes, archivadas=None):
+    """``generar`` para ASGI, donde un iterador síncrono se leería completo en memoria.
+
+    El cursor avanza en el hilo del ORM; cada salto trae un bloque de ``CHUNK`` piezas.
+    """
+    piezas = generar(tipo, formato, ordenes, archivadas)
+    siguiente = sync_to_async(lambda: list(islice(piezas, CHUNK)))
+    while bloque := await siguiente():
+        yield ''.join(bloque)
+
+
+def validar(tipo, formato):
+    if tipo not in TIPOS:
+        raise ValueError(f"tipo debe ser uno de: {', '.join(TIPOS)}")
+    if formato not in FORMATOS:
+        raise ValueError(f"formato debe ser uno de: {', '.join(FORMATOS)}")
@@ -0,0 +1,51 @@
+from datetime import date
+
+from django.utils import timezone
+
+from . import archivo
+from .models import Orden, OrdenArchivada
+from .resumen import rango_dias
+
+def rango_fechas(params):
+    # ?desde/?hasta en AAAA-MM-DD; por defecto hoy, y hasta = desde
+    try:
+        desde = date.fromisoformat(params.get('desde') or str(timezone.localdate()))
+        hasta = date.fromisoformat(params.get('hasta') or str(desde))
+    except ValueError:
+        raise ValueError('Fechas en formato AAAA-MM-DD') from None
+    if hasta < desde:
+        raise ValueError('"hasta" debe ser posterior a "desde"')
+    return desde, hasta
+
+def filtrar_ordenes(qs, params):
+    """Aplica en SQL los filtros de reporte/exportación sobre un queryset de Orden.
+
+    ``desde``/``hasta`` (AAAA-MM-DD, por defecto hoy) se traducen a un rango
+    sobre ``creado``; ``estado`` acepta varios separados por coma y
+    ``creador`` es el id del usuario que levantó la orden. Lanza ValueError
+    con un mensaje para el cliente si algún parámetro es inválido.
+    """
+    inicio, fin = rango_dias(*rango_fechas(params))
+    qs = qs.filter(creado__gte=inicio, creado__lt=fin)
+
+    if params.get('estado'):
+        estados = [e.strip().upper() for e in params['estado'].split(',') if e.strip()]
+        invalidos = set(estados) - set(Orden.Estado.values)
+        if invalidos:
+            raise ValueError(f"Estado inválido: {', '.join(sorted(invalidos))}")
+        qs = qs.filter(estado__in=estados)
+
+    if params.get('creador'):
+        try:
+            qs = qs.filter(creada_por_id=int(params['creador']))
+        except ValueError:
+            raise ValueError('"creador" debe ser un id de usuario')
+    return qs
+
+def filtrar_archivadas(params):
+    """Las órdenes del archivo con los mismos filtros, o ``None`` si el rango
+    empieza después del corte de archivo y no hace falta consultarlas."""
+    inicio, _ = rango_dias(rango_fechas(params)[0])
+    if inicio >= archivo.corte():
+        return None
+    return filtrar_ordenes(OrdenArchivada.objects.all(), params)
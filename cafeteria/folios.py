@@ -0,0 +1,43 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import FolioDiario
+from .utils import generar_folio
+
+# En PostgreSQL el incremento es una sola sentencia atómica: la fila del día
+# se bloquea sólo durante el UPDATE y nunca se lee la tabla de órdenes.
+_UPSERT_PG = (
+    "INSERT INTO {tabla} (fecha, ultimo) VALUES (%s, 1) "
+    "ON CONFLICT (fecha) DO UPDATE SET ultimo = {tabla}.ultimo + 1 "
+    "RETURNING ultimo"
+)
+
+def _siguiente_pg(fecha) -> int:
+    tabla = connection.ops.quote_name(FolioDiario._meta.db_table)
+    with connection.cursor() as cur:
+        cur.execute(_UPSERT_PG.format(tabla=tabla), [fecha])
+        return cur.fetchone()[0]
+
+def _siguiente_generico(fecha) -> int:
+    # Fallback (SQLite en pruebas): el UPDATE toma el candado de escritura
+    # antes de leer, así que dos cajas nunca obtienen el mismo número.
+    with transaction.atomic():
+        if not FolioDiario.objects.filter(fecha=fecha).update(ultimo=F('ultimo') + 1):
+            try:
+                with transaction.atomic():
+                    FolioDiario.objects.create(fecha=fecha, ultimo=1)
+                return 1
+            except IntegrityError:
+                FolioDiario.objects.filter(fecha=fecha).update(ultimo=F('ultimo') + 1)
+        return FolioDiario.objects.filter(fecha=fecha).values_list('ultimo', flat=True).get()
+
+def siguiente_secuencia(fecha=None) -> int:
+    fecha = fecha or timezone.localdate()
+    if connection.vendor == 'postgresql':
+        return _siguiente_pg(fecha)
+    return _siguiente_generico(fecha)
+
+def siguiente_folio(fecha=None) -> str:
+    fecha = fecha or timezone.localdate()
+    return generar_folio(siguiente_secuencia(fecha), fecha)
@@ -6,7 +6,9 @@ class BuscarProductoForm(forms.Form):
         required=False,
         widget=forms.TextInput(attrs={
             "placeholder": "Buscar producto...",
-            "class": "form-control me-2"  
+            "class": "form-control me-2",
+            "list": "sugerencias-productos",
+            "autocomplete": "off",
         })
     )
 
@@ -0,0 +1,151 @@
+from types import SimpleNamespace
+
+from django.db.models import DateTimeField
+from django.utils import timezone
+
+from .models import Orden, OrdenItem, Producto
+
+
+def _es_fecha(modelo, ruta):
+    campo = None
+    for parte in ruta.split('__'):
+        campo = modelo._meta.get_field(parte)
+        modelo = campo.related_model
+    return isinstance(campo, DateTimeField)
+
+
+class Plano:
+    """Serializador de sólo lectura sobre filas de ``values()``.
+
+    Misma salida que su ModelSerializer, sin un Field por columna y por fila:
+    ``campos`` va de nombre de salida a ruta ORM (un dict arma un objeto
+    anidado con el mismo JOIN) e ``hijos`` son listas que se leen en una
+    consulta aparte, agrupadas por la FK al padre. Los Decimal salen tal cual
+    (el renderer orjson los escribe como texto); las fechas, en hora local.
+    """
+    modelo = None
+    campos = {}
+    hijos = {}  # salida -> (Plano del hijo, FK del hijo hacia este modelo)
+
+    def __init__(self, instance=None, many=False, **kwargs):
+        self.instance, self.many = instance, many
+        self.context = kwargs.get('context', {})
+        # Recortable como un serializer (CamposMixin hace pop de lo que no se pidió)
+        self.fields = {n: SimpleNamespace(source=self._fuente(n)) for n in [*self.campos, *self.hijos]}
+
+    @classmethod
+    def _fuente(cls, nombre):
+        if nombre in cls.hijos:
+            return nombre
+        ruta = cls.campos[nombre]
+        if isinstance(ruta, dict):
+            ruta = next(iter(ruta.values())).rsplit('__', 1)[0]
+        return ruta.replace('__', '.')
+
+    @classmethod
+    def rutas(cls, nombres=None):
+        rutas = []
+        for n in nombres or cls.campos:
+            ruta = cls.campos.get(n)
+            if ruta is not None:
+                rutas += ruta.values() if isinstance(ruta, dict) else [ruta]
+        return rutas
+
+    @classmethod
+    def consulta(cls, qs, nombres=None, extra=()):
+        """``qs`` como filas de values() con sólo las columnas de ``nombres``."""
+        pk = cls.modelo._meta.pk.name
+        return qs.select_related(None).prefetch_related(None).values(
+            *dict.fromkeys([pk, *extra, *cls.rutas(nombres)]))
+
+    def a_dicts(self, filas):
+        nombres = list(self.fields)
+        planos = [(n, r, r if isinstance(r, dict) else None)
+                  for n in nombres if (r := self.campos.get(n)) is not None]
+        fechas = {r for r in self.rutas(nombres) if _es_fecha(self.modelo, r)}
+
+        def valor(f, r):
+            # Sin tocar la fila: la paginación por cursor vuelve a leer sus columnas
+            v = f[r]
+            return timezone.localtime(v) if r in fechas and v is not None else v
+
+        salida = [{n: {k: valor(f, rr) for k, rr in anidado.items()} if anidado else valor(f, r)
+                   for n, r, anidado in planos}
+                  for f in filas]
+        for n in nombres:
+            if n in self.hijos:
+                self._hijos(n, filas, salida)
+        return salida
+
+    def _hijos(self, nombre, filas, salida):
+        clase, fk = self.hijos[nombre]
+        pk = self.modelo._meta.pk.name
+        ids = [f[pk] for f in filas]
+        hijo = clase()
+        por_padre = {i: [] for i in ids}
+        if ids:
+            qs = clase.consulta(clase.modelo.objects.filter(**{f'{fk}__in': ids}), extra=[fk])
+            filas_hijo = list(qs.order_by('pk'))
+            for fila, dato in zip(filas_hijo, hijo.a_dicts(filas_hijo)):
+                por_padre[fila[fk]].append(dato)
+        for d, i in zip(salida, ids):
+            d[nombre] = por_padre[i]
+
+    @property
+    def data(self):
+        if self.instance is None:
+            return [] if self.many else {}
+        filas = list(self.instance) if self.many else [self.instance]
+        salida = self.a_dicts(filas)
+        return salida if self.many else salida[0]
+
+
+class ProductoPlano(Plano):
+    # = ProductoSerializer
+    modelo = Producto
+    campos = {
+        'id': 'id', 'nombre': 'nombre', 'precio': 'precio', 'disponible': 'disponible',
+        'categoria': 'categoria',
+        'categoria_detalle': {'id': 'categoria__id', 'nombre': 'categoria__nombre',
+                              'activa': 'categoria__activa'},
+    }
+
+class OrdenItemPlano(Plano):
+    # = OrdenItemReadSerializer
+    modelo = OrdenItem
+    campos = {
+        'id': 'id', 'producto': 'producto', 'producto_nombre': 'producto__nombre',
+        'cantidad': 'cantidad', 'precio_unitario': 'precio_unitario', 'subtotal': 'subtotal',
+    }
+
+class OrdenPlana(Plano):
+    # = OrdenSerializer
+    modelo = Orden
+    campos = {
+        'id': 'id', 'folio': 'folio', 'estado': 'estado', 'total': 'total',
+        'creado': 'creado', 'creada_por': 'creada_por',
+    }
+    hijos = {'items': (OrdenItemPlano, 'orden_id')}
+
+
+class LecturaPlanaMixin:
+    """Sirve ``acciones_lectura`` con el Plano de ``lectura`` sobre ``values()``."""
+    lectura = None
+    acciones_lectura = ('list', 'retrieve')
+
+    def usa_lectura(self):
+        return self.lectura is not None and self.action in self.acciones_lectura
+
+    def get_serializer_class(self):
+        return self.lectura if self.usa_lectura() else super().get_serializer_class()
+
+    def filter_queryset(self, qs):
+        qs = super().filter_queryset(qs)
+        if not self.usa_lectura():
+            return qs
+        campos = getattr(self, 'campos', None)
+        # El cursor de la paginación lee sus columnas de cada fila
+        orden = getattr(self.paginator, 'ordering', None) or ()
+        orden = [orden] if isinstance(orden, str) else orden
+        return self.lectura.consulta(qs, list(campos) if campos else None,
+                                     extra=[o.lstrip('-') for o in orden])
@@ -0,0 +1,58 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Orden, OrdenItem
+from .signals import recalcular_totales
+
+# Alta de una línea en una sola sentencia: si el producto ya está en la orden,
+# se suma la cantidad y se toma el precio vigente; la restricción única
+# (orden, producto) es la que resuelve el choque entre dos clics simultáneos.
+_UPSERT_PG = (
+    "INSERT INTO {tabla} (orden_id, producto_id, cantidad, precio_unitario, subtotal) "
+    "VALUES (%s, %s, %s, %s, %s) "
+    "ON CONFLICT (orden_id, producto_id) DO UPDATE SET "
+    "cantidad = {tabla}.cantidad + EXCLUDED.cantidad, "
+    "precio_unitario = EXCLUDED.precio_unitario, "
+    "subtotal = ({tabla}.cantidad + EXCLUDED.cantidad) * EXCLUDED.precio_unitario"
+)
+
+def _upsert_pg(orden_id, producto, cantidad):
+    tabla = connection.ops.quote_name(OrdenItem._meta.db_table)
+    with connection.cursor() as cur:
+        cur.execute(_UPSERT_PG.format(tabla=tabla),
+                    [orden_id, producto.pk, cantidad, producto.precio, cantidad * producto.precio])
+
+def _upsert_generico(orden_id, producto, cantidad):
+    # Mismo patrón que los folios: UPDATE primero y, si no había línea, INSERT;
+    # si otro hilo la insertó en medio, la restricción falla y se vuelve a sumar.
+    linea = OrdenItem.objects.filter(orden_id=orden_id, producto=producto)
+    suma = dict(cantidad=F('cantidad') + cantidad, precio_unitario=producto.precio,
+                subtotal=(F('cantidad') + cantidad) * producto.precio)
+    if linea.update(**suma):
+        return
+    try:
+        with transaction.atomic():
+            OrdenItem.objects.bulk_create([OrdenItem(
+                orden_id=orden_id, producto=producto, cantidad=cantidad,
+                precio_unitario=producto.precio, subtotal=cantidad * producto.precio)])
+    except IntegrityError:
+        linea.update(**suma)
+
+@transaction.atomic
+def agregar_linea(orden_id, producto, cantidad) -> bool:
+    """Suma ``cantidad`` de ``producto`` a la orden y recalcula su total.
+
+    Devuelve False si la orden no existe. Tocar la orden primero toma su
+    candado (y en SQLite el de escritura), así que los recálculos quedan en
+    serie y el total nunca pierde una línea concurrente.
+    """
+    if not Orden.objects.filter(pk=orden_id).update(actualizado=timezone.now()):
+        return False
+    if connection.vendor == 'postgresql':
+        _upsert_pg(orden_id, producto, cantidad)
+    else:
+        _upsert_generico(orden_id, producto, cantidad)
+    # Ni el upsert ni bulk_create disparan señales: el total se recalcula en SQL
+    recalcular_totales([orden_id])
+    return True
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cafeteria import archivo
+
+class Command(BaseCommand):
+    help = "Mueve las órdenes ENTREGADA fuera de la retención (con líneas y pago) al archivo, por lotes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.ARCHIVO_RETENCION_DIAS,
+                            help='Días completos que se conservan en las tablas vivas')
+        parser.add_argument('--lote', type=int, default=500, help='Órdenes por transacción')
+        parser.add_argument('--pausa', type=float, default=0, help='Segundos entre lotes')
+        parser.add_argument('--simular', action='store_true', help='Sólo cuenta lo que se archivaría')
+
+    def handle(self, *args, **o):
+        if o['dias'] < 0 or o['lote'] < 1:
+            raise CommandError('--dias debe ser >= 0 y --lote >= 1')
+        corte = archivo.corte(o['dias'])
+        self.stdout.write(f"Archivando órdenes entregadas antes de {timezone.localtime(corte):%Y-%m-%d}")
+        if o['simular']:
+            self.stdout.write(f"{archivo.archivables(corte).count()} órdenes por archivar (simulación)")
+            return
+
+        total, resumidos = 0, set()
+        while movidas := archivo.archivar_lote(corte, o['lote'], resumidos):
+            total += movidas
+            self.stdout.write(f"  {total} órdenes archivadas")
+            if o['pausa']:
+                time.sleep(o['pausa'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} órdenes archivadas; {len(resumidos)} días de resumen reconstruidos."))
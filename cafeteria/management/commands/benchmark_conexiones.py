@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from cafeteria.management.commands.benchmark_pos import ClienteHttp, Medidor, _commit
+
+# Lecturas que sirven las vistas async
+RUTAS = ('/', '/cocina/', '/api/ordenes/estadisticas/', '/api/menu/hoy/')
+EVENTOS = '/cocina/eventos/'
+
+# Como en el Procfile de cada modo: workers síncronos de gunicorn contra uvicorn
+SERVIDORES = {
+    'wsgi': ['config.wsgi:application'],
+    'asgi': ['config.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'],
+}
+
+
+def _peticion(host, ruta, cookie):
+    return (f'GET {ruta} HTTP/1.1\r\nHost: {host}\r\nCookie: {cookie}\r\n'
+            f'Accept: */*\r\nConnection: close\r\n\r\n').encode()
+
+async def _get(host, puerto, ruta, cookie, timeout):
+    """Una petición en su propia conexión; devuelve el status o None si no hubo respuesta."""
+    try:
+        lector, escritor = await asyncio.wait_for(asyncio.open_connection(host, puerto), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    try:
+        escritor.write(_peticion(host, ruta, cookie))
+        await escritor.drain()
+        respuesta = await asyncio.wait_for(lector.read(), timeout)
+        return int(respuesta.split(b' ', 2)[1])
+    except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+        return None
+    finally:
+        escritor.close()
+
+async def _escuchar(host, puerto, cookie, timeout, abiertas, fin):
+    # Una pantalla de cocina: cuenta si recibe el primer evento y se queda conectada
+    try:
+        lector, escritor = await asyncio.wait_for(asyncio.open_connection(host, puerto), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return
+    try:
+        escritor.write(_peticion(host, EVENTOS, cookie))
+        await escritor.drain()
+
+        async def primer_evento():
+            recibido = b''
+            while b': conectado' not in recibido:
+                parte = await lector.read(1024)
+                if not parte:
+                    raise ConnectionError
+                recibido += parte
+
+        await asyncio.wait_for(primer_evento(), timeout)
+        abiertas.append(time.perf_counter())
+        await fin.wait()
+    except (OSError, asyncio.TimeoutError):
+        pass
+    finally:
+        escritor.close()
+
+async def carga(host, puerto, cookie, o):
+    """``escuchas`` conexiones SSE abiertas mientras ``concurrencia`` clientes leen RUTAS."""
+    medir, abiertas, fin = Medidor(), [], asyncio.Event()
+    escuchas = [asyncio.create_task(_escuchar(host, puerto, cookie, o['timeout'], abiertas, fin))
+                for _ in range(o['escuchas'])]
+    if escuchas:
+        await asyncio.sleep(1)  # las pantallas se conectan antes de medir
+
+    inicio = time.perf_counter()
+    limite = inicio + o['duracion']
+
+    async def cliente(i):
+        k = i
+        while time.perf_counter() < limite:
+            ruta = RUTAS[k % len(RUTAS)]
+            k += 1
+            t = time.perf_counter()
+            status = await _get(host, puerto, ruta, cookie, o['timeout'])
+            medir.registrar(ruta, (time.perf_counter() - t) * 1000, status)
+
+    await asyncio.gather(*(cliente(i) for i in range(o['concurrencia'])))
+    duracion = time.perf_counter() - inicio
+    fin.set()
+    await asyncio.gather(*escuchas)
+
+    endpoints = medir.reporte(duracion)
+    peticiones = sum(e['n'] for e in endpoints.values())
+    errores = sum(e['errores'] for e in endpoints.values())
+    return {
+        'escuchas_abiertas': len(abiertas),
+        'peticiones': peticiones,
+        'errores': errores,
+        'respuestas_por_segundo': round((peticiones - errores) / duracion, 2),
+        'duracion_s': round(duracion, 3),
+        'endpoints': endpoints,
+    }
+
+
+class Command(BaseCommand):
+    help = ("Capacidad de conexiones concurrentes: pantallas de cocina conectadas por SSE "
+            "mientras otros clientes leen las vistas async; compara gunicorn WSGI contra ASGI "
+            "(workers de uvicorn) o mide un servidor ya corriendo con --url")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servidor', action='append', choices=tuple(SERVIDORES),
+                            help='Modo a levantar con gunicorn (repetible; por defecto ambos)')
+        parser.add_argument('--url', help='Servidor ya corriendo (en lugar de levantar gunicorn)')
+        parser.add_argument('--usuario', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn')
+        parser.add_argument('--puerto', type=int, default=8765)
+        parser.add_argument('--escuchas', type=int, default=20, help='Conexiones SSE abiertas')
+        parser.add_argument('--concurrencia', type=int, default=50, help='Clientes leyendo a la vez')
+        parser.add_argument('--duracion', type=float, default=10, help='Segundos de carga')
+        parser.add_argument('--timeout', type=float, default=5, help='Segundos por petición')
+        parser.add_argument('--salida', default='benchmark_conexiones.json',
+                            help='Archivo JSON de resultados')
+
+    def handle(self, *args, **o):
+        if o['url']:
+            objetivos = {o['url']: None}
+        else:
+            objetivos = {s: SERVIDORES[s] for s in o['servidor'] or SERVIDORES}
+
+        servidores = {}
+        for nombre, app in objetivos.items():
+            url = o['url'] or f"http://127.0.0.1:{o['puerto']}"
+            proc = self._levantar(nombre, app, o) if app else None
+            try:
+                servidores[nombre] = self._medir(url, o)
+            finally:
+                if proc is not None:
+                    self._detener(proc)
+            self._imprimir(nombre, servidores[nombre])
+
+        resultado = {
+            'commit': _commit(),
+            'fecha': timezone.now().isoformat(),
+            'base_de_datos': connection.vendor,
+            'parametros': {k: o[k] for k in ('workers', 'escuchas', 'concurrencia', 'duracion', 'timeout')},
+            'servidores': servidores,
+        }
+        with open(o['salida'], 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados → {o['salida']}"))
+
+    def _levantar(self, nombre, app, o):
+        try:
+            socket.create_connection(('127.0.0.1', o['puerto']), timeout=0.5).close()
+        except OSError:
+            pass
+        else:
+            raise CommandError(f"El puerto {o['puerto']} ya está ocupado; usa --puerto")
+        comando = [sys.executable, '-m', 'gunicorn', *app, '--workers', str(o['workers']),
+                   '--bind', f"127.0.0.1:{o['puerto']}"]
+        # Grupo de procesos propio: al final se detienen también los workers
+        proc = subprocess.Popen(comando, env=os.environ.copy(), start_new_session=True,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if proc.poll() is not None:
+                raise CommandError(f'{nombre}: gunicorn terminó al arrancar ({" ".join(comando)})')
+            try:
+                socket.create_connection(('127.0.0.1', o['puerto']), timeout=0.5).close()
+                return proc
+            except OSError:
+                time.sleep(0.2)
+        self._detener(proc)
+        raise CommandError(f'{nombre}: gunicorn no aceptó conexiones en 30 s')
+
+    @staticmethod
+    def _detener(proc):
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            # Workers síncronos atorados en conexiones SSE que nunca terminan
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+
+    def _medir(self, url, o):
+        partes = urlsplit(url)
+        cliente = ClienteHttp(url, o['usuario'], o['password'])
+        cookie = '; '.join(f'{c.name}={c.value}' for c in cliente.cookies)
+        return asyncio.run(carga(partes.hostname, partes.port or 80, cookie, o))
+
+    def _imprimir(self, nombre, r):
+        self.stdout.write(f"{nombre}: {r['escuchas_abiertas']} escuchas SSE abiertas, "
+                          f"{r['peticiones']} peticiones, {r['errores']} errores, "
+                          f"{r['respuestas_por_segundo']} respuestas/s")
+        for ruta, e in r['endpoints'].items():
+            self.stdout.write(f"  {ruta:<28} n={e['n']:<6} err={e['errores']:<4} "
+                              f"p50={e['p50_ms']}ms p95={e['p95_ms']}ms p99={e['p99_ms']}ms")
@@ -0,0 +1,249 @@
+import json
+import random
+import subprocess
+import threading
+import time
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+
+from cafeteria import cola, siembra
+from cafeteria.bitacora import percentil
+from cafeteria.models import Producto
+
+
+# Rol de setup_roles con el que entra cada tipo de cliente en proceso
+ROLES = {'cajero': 'Cajero', 'cocinero': 'Cocinero'}
+
+
+class ClienteDjango:
+    """Peticiones en proceso con el test client (misma base que settings)."""
+
+    def __init__(self, usuario):
+        self.c = Client()
+        self.c.force_login(usuario)
+
+    def pedir(self, metodo, url, datos=None, es_json=False):
+        if metodo == 'GET':
+            r = self.c.get(url)
+        elif es_json:
+            r = self.c.post(url, json.dumps(datos or {}), content_type='application/json')
+        else:
+            r = self.c.post(url, datos or {})
+        return r.status_code, r.content
+
+class _SinRedirecciones(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class ClienteHttp:
+    """Contra un servidor corriendo: sesión por cookie y token CSRF como un navegador."""
+
+    def __init__(self, base, usuario, password):
+        self.base = base.rstrip('/')
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _SinRedirecciones)
+        self.pedir('GET', '/accounts/login/')
+        status, _ = self.pedir('POST', '/accounts/login/', {'username': usuario, 'password': password})
+        if status != 302:
+            raise CommandError(f'No se pudo iniciar sesión como {usuario} en {self.base}')
+
+    def _csrf(self):
+        return next((c.value for c in self.cookies if c.name == 'csrftoken'), '')
+
+    def pedir(self, metodo, url, datos=None, es_json=False):
+        cuerpo, headers = None, {'Referer': self.base + url}
+        if metodo == 'POST':
+            headers['X-CSRFToken'] = self._csrf()
+            if es_json:
+                cuerpo, headers['Content-Type'] = json.dumps(datos or {}).encode(), 'application/json'
+            else:
+                cuerpo = urlencode(datos or {}).encode()
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            with self.opener.open(Request(self.base + url, cuerpo, headers, method=metodo)) as r:
+                return r.status, r.read()
+        except HTTPError as e:
+            return e.code, e.read()
+
+
+class Medidor:
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.tiempos, self.errores = {}, {}
+
+    def __call__(self, nombre, cliente, metodo, url, datos=None, es_json=False):
+        t = time.perf_counter()
+        status, cuerpo = cliente.pedir(metodo, url, datos, es_json)
+        self.registrar(nombre, (time.perf_counter() - t) * 1000, status)
+        return status, cuerpo
+
+    def registrar(self, nombre, ms, status):
+        # status None: la petición no obtuvo respuesta (conexión rechazada o timeout)
+        with self._candado:
+            self.tiempos.setdefault(nombre, []).append(ms)
+            if status is None or status >= 400:
+                self.errores[nombre] = self.errores.get(nombre, 0) + 1
+
+    def reporte(self, duracion):
+        endpoints = {}
+        for nombre, ms in sorted(self.tiempos.items()):
+            ms = sorted(ms)
+            endpoints[nombre] = {
+                'n': len(ms), 'errores': self.errores.get(nombre, 0),
+                'por_segundo': round(len(ms) / duracion, 2),
+                **{f'p{p}_ms': round(percentil(ms, p), 2) for p in (50, 95, 99)},
+                'max_ms': round(ms[-1], 2),
+            }
+        return endpoints
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _quitar_usuarios(ids):
+    # Los cajeros quedan como creada_por (PROTECT) de las órdenes del benchmark:
+    # esos sólo se desactivan; los demás se borran
+    usuarios = User.objects.filter(pk__in=ids)
+    usuarios.filter(ordenes_creadas__isnull=True).delete()
+    usuarios.update(is_active=False)
+
+
+class Command(BaseCommand):
+    help = ("Carga sintética: cajeros (nueva → add-item × N → cobrar → enviar-cocina) y "
+            "cocineros (tomar/terminar comandas) concurrentes; escribe los resultados en JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cajeros', type=int, default=4)
+        parser.add_argument('--cocineros', type=int, default=2)
+        parser.add_argument('--ordenes', type=int, default=25, help='Órdenes por cajero')
+        parser.add_argument('--items', type=int, default=4, help='add-item por orden')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--url', help='Servidor a probar (p. ej. http://127.0.0.1:8000); '
+                                          'por defecto el test client en proceso')
+        parser.add_argument('--usuario', help='Usuario para --url')
+        parser.add_argument('--password', help='Contraseña para --url')
+        parser.add_argument('--salida', default='benchmark.json', help='Archivo JSON de resultados')
+
+    def handle(self, *args, **o):
+        if o['url'] and not (o['usuario'] and o['password']):
+            raise CommandError('--url requiere --usuario y --password')
+        productos = list(Producto.objects.filter(disponible=True).values_list('pk', flat=True)[:500])
+        if not productos:
+            raise CommandError('No hay productos disponibles; corre sembrar_datos primero')
+        estaciones = list(cola.estaciones()) or ['general']
+
+        medir = Medidor()
+        terminaron_cajeros = threading.Event()
+        conteo = {'ordenes': 0, 'comandas': 0}
+        candado = threading.Lock()
+        errores = []
+        # Antes de los hilos: setup_roles corre a lo más una vez
+        grupos = {} if o['url'] else {rol: siembra.rol(nombre) for rol, nombre in ROLES.items()}
+        creados = []
+
+        def cliente(rol, i):
+            if o['url']:
+                return ClienteHttp(o['url'], o['usuario'], o['password'])
+            usuario, _ = User.objects.update_or_create(
+                username=f'_bench_{rol}_{i}', defaults={'is_active': True})
+            usuario.groups.add(grupos[rol])
+            with candado:
+                creados.append(usuario.pk)
+            return ClienteDjango(usuario)
+
+        def cajero(i):
+            rnd = random.Random(o['semilla'] + i)
+            c = cliente('cajero', i)
+            for _ in range(o['ordenes']):
+                medir('pos_nueva', c, 'GET', '/pos/nueva/')
+                for _ in range(o['items']):
+                    medir('pos_add_item', c, 'POST', '/pos/add-item/',
+                          {'producto_id': rnd.choice(productos), 'cantidad': rnd.randint(1, 3)})
+                medir('pos_cobrar', c, 'POST', '/pos/cobrar/')
+                status, _ = medir('pos_enviar_cocina', c, 'POST', '/pos/enviar-cocina/')
+                if status < 400:
+                    with candado:
+                        conteo['ordenes'] += 1
+
+        def cocinero(i):
+            # Empieza en su estación (reparto round-robin) y pasa a la siguiente cuando se vacía
+            c = cliente('cocinero', i)
+            k, vacias = i, 0
+            while True:
+                fin = terminaron_cajeros.is_set()
+                status, cuerpo = medir('comanda_tomar', c, 'POST', '/api/comandas/tomar/',
+                                       {'estacion': estaciones[k % len(estaciones)]}, es_json=True)
+                if status == 201:
+                    comanda = json.loads(cuerpo)['id']
+                    medir('comanda_terminar', c, 'POST', f'/api/comandas/{comanda}/terminar/', es_json=True)
+                    with candado:
+                        conteo['comandas'] += 1
+                    vacias = 0
+                    continue
+                k, vacias = k + 1, vacias + 1
+                if vacias >= len(estaciones):
+                    if fin:
+                        return  # todas las colas vacías y ya no llegan órdenes
+                    vacias = 0
+                    time.sleep(0.05)
+
+        def hilo(fn, i):
+            try:
+                fn(i)
+            except Exception as exc:
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        cajeros = [threading.Thread(target=hilo, args=(cajero, i)) for i in range(o['cajeros'])]
+        cocineros = [threading.Thread(target=hilo, args=(cocinero, i)) for i in range(o['cocineros'])]
+        self.stdout.write(f"{o['cajeros']} cajeros × {o['ordenes']} órdenes, {o['cocineros']} cocineros "
+                          f"en {', '.join(estaciones)}…")
+        inicio = time.perf_counter()
+        try:
+            for h in cajeros + cocineros:
+                h.start()
+            for h in cajeros:
+                h.join()
+            terminaron_cajeros.set()
+            for h in cocineros:
+                h.join()
+        finally:
+            _quitar_usuarios(creados)
+        duracion = time.perf_counter() - inicio
+        if errores:
+            raise CommandError(f'Falló un hilo del benchmark: {errores[0]!r}')
+
+        resultado = {
+            'commit': _commit(),
+            'fecha': timezone.now().isoformat(),
+            'modo': o['url'] or 'test_client',
+            'base_de_datos': connection.vendor,
+            'parametros': {k: o[k] for k in ('cajeros', 'cocineros', 'ordenes', 'items', 'semilla')},
+            'duracion_s': round(duracion, 3),
+            'ordenes': conteo['ordenes'],
+            'comandas': conteo['comandas'],
+            'ordenes_por_minuto': round(conteo['ordenes'] / duracion * 60, 1),
+            'endpoints': medir.reporte(duracion),
+        }
+        with open(o['salida'], 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+        for nombre, e in resultado['endpoints'].items():
+            self.stdout.write(f"{nombre:<20} n={e['n']:<6} err={e['errores']:<4} "
+                              f"p50={e['p50_ms']}ms p95={e['p95_ms']}ms p99={e['p99_ms']}ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['ordenes_por_minuto']} órdenes/min en {resultado['duracion_s']}s → {o['salida']}"))
@@ -0,0 +1,94 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from cafeteria import siembra
+from cafeteria.lectura import OrdenItemPlano, OrdenPlana, ProductoPlano
+from cafeteria.models import Orden, OrdenItem, Producto
+from cafeteria.renderers import ORJSONRenderer
+from cafeteria.serializers import OrdenItemReadSerializer, OrdenSerializer, ProductoSerializer
+
+PREFIJO = '_bench_ser'
+
+
+class _Rollback(Exception):
+    pass
+
+
+def casos():
+    """nombre -> (queryset como lo arma la API, ModelSerializer, Plano)."""
+    items = OrdenItem.objects.select_related('producto').order_by('pk')
+    return {
+        'ordenes': (Orden.objects.filter(folio__startswith=PREFIJO).order_by('-creado', '-id')
+                    .prefetch_related(Prefetch('items', queryset=items)), OrdenSerializer, OrdenPlana),
+        'orden_items': (items.filter(orden__folio__startswith=PREFIJO), OrdenItemReadSerializer, OrdenItemPlano),
+        'productos': (Producto.objects.filter(nombre__startswith=PREFIJO).select_related('categoria')
+                      .order_by('nombre'), ProductoSerializer, ProductoPlano),
+    }
+
+def mejor_de(n, fn):
+    tiempos = []
+    for _ in range(n):
+        t = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t)
+    return min(tiempos) * 1000
+
+
+class Command(BaseCommand):
+    help = ("Compara ModelSerializer + JSONRenderer contra los serializadores planos (values()) "
+            "+ orjson sobre datos sembrados en una transacción que se revierte")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ordenes', type=int, default=1000)
+        parser.add_argument('--lineas', type=int, default=8, help='Líneas por orden')
+        parser.add_argument('--productos', type=int, default=300)
+        parser.add_argument('--repeticiones', type=int, default=5, help='Se reporta la mejor')
+        parser.add_argument('--json', action='store_true', help='Salida en JSON')
+
+    def handle(self, *args, **o):
+        if o['lineas'] > o['productos']:
+            raise CommandError('--lineas no puede ser mayor que --productos')
+        try:
+            with transaction.atomic():
+                resultados = self._medir(o)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if o['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+        self.stdout.write(f"{'caso':<12} {'filas':>7} {'drf+json':>10} {'drf+orjson':>11} "
+                          f"{'plano+orjson':>13} {'aceleración':>12}")
+        for nombre, r in resultados.items():
+            self.stdout.write(f"{nombre:<12} {r['filas']:>7} {r['drf_json_ms']:>8.1f}ms "
+                              f"{r['drf_orjson_ms']:>9.1f}ms {r['plano_orjson_ms']:>11.1f}ms "
+                              f"{r['aceleracion']:>11.1f}x")
+
+    def _medir(self, o):
+        rnd = random.Random(42)
+        creadores = siembra.usuarios(PREFIJO, 2)
+        productos = siembra.catalogo(PREFIJO, o['productos'], 6, rnd=rnd)
+        siembra.ordenes(PREFIJO, o['ordenes'], 30, productos, creadores, o['lineas'], rnd=rnd)
+
+        resultados = {}
+        for nombre, (qs, serializer, plano) in casos().items():
+            # Consulta + serialización + render, como en una petición de listado
+            drf = lambda r: r.render(serializer(qs.all(), many=True).data)
+            rapido = lambda: ORJSONRenderer().render(plano(plano.consulta(qs.all()), many=True).data)
+            if json.loads(drf(JSONRenderer())) != json.loads(rapido()):
+                raise CommandError(f'{nombre}: la salida plana difiere de la del serializer')
+            ms = {
+                'drf_json_ms': mejor_de(o['repeticiones'], lambda: drf(JSONRenderer())),
+                'drf_orjson_ms': mejor_de(o['repeticiones'], lambda: drf(ORJSONRenderer())),
+                'plano_orjson_ms': mejor_de(o['repeticiones'], rapido),
+            }
+            resultados[nombre] = {'filas': qs.count(), **{k: round(v, 2) for k, v in ms.items()},
+                                  'aceleracion': round(ms['drf_json_ms'] / ms['plano_orjson_ms'], 2)}
+        return resultados
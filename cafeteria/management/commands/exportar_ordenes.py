@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cafeteria import exportar
+from cafeteria.filtros import filtrar_archivadas, filtrar_ordenes
+from cafeteria.models import Orden
+
+class Command(BaseCommand):
+    help = "Exporta órdenes o sus líneas a CSV/NDJSON en streaming"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', choices=exportar.TIPOS, default='ordenes')
+        parser.add_argument('--formato', choices=exportar.FORMATOS, default='csv')
+        parser.add_argument('--desde', help='AAAA-MM-DD (por defecto hoy)')
+        parser.add_argument('--hasta', help='AAAA-MM-DD (por defecto igual a --desde)')
+        parser.add_argument('--estado', help='Estados separados por coma')
+        parser.add_argument('--salida', help='Archivo destino (por defecto stdout)')
+
+    def handle(self, *args, **opts):
+        try:
+            ordenes = filtrar_ordenes(Orden.objects.all(), opts)
+            archivadas = filtrar_archivadas(opts)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        piezas = exportar.generar(opts['tipo'], opts['formato'], ordenes, archivadas)
+        if opts['salida']:
+            with open(opts['salida'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(piezas)
+            self.stderr.write(self.style.SUCCESS(f"Exportado a {opts['salida']}"))
+        else:
+            for pieza in piezas:
+                self.stdout.write(pieza, ending='')
@@ -0,0 +1,40 @@
+import json
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cafeteria import bitacora
+
+def _fila(nombre, grupo):
+    celdas = []
+    for tramo in bitacora.TRAMOS:
+        e = grupo[tramo]
+        ps = ' / '.join('-' if e[f'p{p}'] is None else f"{e[f'p{p}']:.0f}s" for p in bitacora.PERCENTILES)
+        celdas.append(f"{tramo} n={e['n']} {ps}")
+    return f"{nombre:<20} " + ' | '.join(celdas)
+
+class Command(BaseCommand):
+    help = "p50/p95/p99 de espera en cola y de preparación, por hora y por estación"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='AAAA-MM-DD (por defecto hoy)')
+        parser.add_argument('--hasta', help='AAAA-MM-DD (por defecto igual a --desde)')
+        parser.add_argument('--json', action='store_true', help='Salida en JSON')
+
+    def handle(self, *args, **opts):
+        try:
+            desde = date.fromisoformat(opts['desde']) if opts['desde'] else timezone.localdate()
+            hasta = date.fromisoformat(opts['hasta']) if opts['hasta'] else desde
+        except ValueError:
+            raise CommandError('Fechas en formato AAAA-MM-DD')
+
+        r = bitacora.latencias(desde, hasta)
+        if opts['json']:
+            self.stdout.write(json.dumps(r, indent=2))
+            return
+        self.stdout.write(_fila('general', r['general']))
+        for g in r['por_hora']:
+            self.stdout.write(_fila(g['hora'][:16], g))
+        for g in r['por_estacion']:
+            self.stdout.write(_fila(g['estacion'], g))
@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cafeteria import resumen
+
+class Command(BaseCommand):
+    help = "Recalcula el resumen diario desde Orden y las órdenes archivadas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='AAAA-MM-DD (por defecto hoy)')
+        parser.add_argument('--hasta', help='AAAA-MM-DD (por defecto igual a --desde)')
+
+    def handle(self, *args, **opts):
+        try:
+            desde = date.fromisoformat(opts['desde']) if opts['desde'] else timezone.localdate()
+            hasta = date.fromisoformat(opts['hasta']) if opts['hasta'] else desde
+        except ValueError:
+            raise CommandError('Fechas en formato AAAA-MM-DD')
+
+        dia = desde
+        while dia <= hasta:
+            r = resumen.reconstruir(dia)
+            self.stdout.write(f"{dia}: {r['total_ordenes']} órdenes, ventas {r['total_ventas']}")
+            dia += timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS('Resumen reconstruido.'))
@@ -0,0 +1,39 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from cafeteria import catalogo, resumen, siembra
+
+class Command(BaseCommand):
+    help = "Siembra catálogo e historia de órdenes con bulk_create (para pruebas de carga)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefijo', default='bench', help='Prefijo de nombres, folios y usuarios')
+        parser.add_argument('--categorias', type=int, default=12)
+        parser.add_argument('--productos', type=int, default=300)
+        parser.add_argument('--ordenes', type=int, default=10000)
+        parser.add_argument('--dias', type=int, default=30)
+        parser.add_argument('--lineas', type=int, default=4, help='Líneas por orden')
+        parser.add_argument('--usuarios', type=int, default=8)
+        parser.add_argument('--password', help='Contraseña de los usuarios sembrados (para --url)')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **o):
+        if o['lineas'] > o['productos']:
+            raise CommandError('--lineas no puede ser mayor que --productos')
+        rnd = random.Random(o['semilla'])
+        with transaction.atomic():
+            creadores = siembra.usuarios(o['prefijo'], o['usuarios'], o['password'])
+            productos = siembra.catalogo(o['prefijo'], o['productos'], o['categorias'], rnd)
+            self.stdout.write(f"{len(productos)} productos en {o['categorias']} categorías")
+            siembra.ordenes(o['prefijo'], o['ordenes'], o['dias'], productos, creadores, o['lineas'], rnd)
+            self.stdout.write(f"{o['ordenes']} órdenes en {o['dias']} días")
+            # bulk_create no pasa por las señales: rollup y caché se ponen al día aquí
+            hoy = timezone.localdate()
+            for d in range(o['dias'] + 1):
+                resumen.reconstruir(hoy - timedelta(days=d))
+        catalogo.invalidar()
+        self.stdout.write(self.style.SUCCESS('Datos sembrados.'))
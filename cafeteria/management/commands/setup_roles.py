@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
-from cafeteria.models import Categoria, Producto, MenuDia, MenuItem, Orden, OrdenItem
+from cafeteria import permisos as permisos_cache
+from cafeteria.models import Categoria, Producto, MenuDia, MenuItem, Orden, OrdenItem, OrdenArchivada
 
 def perms_for(model, actions=('view',)):
     ct = ContentType.objects.get_for_model(model)
@@ -50,7 +51,8 @@ class Command(BaseCommand):
                 perms_for(MenuDia, ('add','change','delete','view')) +
                 perms_for(MenuItem, ('add','change','delete','view')) +
                 perms_for(Orden, ('view',)) +
-                perms_for(OrdenItem, ('view',))
+                perms_for(OrdenItem, ('view',)) +
+                perms_for(OrdenArchivada, ('view',))
             ),
         }
 
@@ -59,4 +61,6 @@ class Command(BaseCommand):
             g.permissions.set(permisos)
             self.stdout.write(self.style.SUCCESS(f'Grupo {nombre} listo ({len(permisos)} permisos)'))
 
+        # Aunque set() no haya cambiado nada: correr el comando siempre renueva los permisos en caché
+        permisos_cache.invalidar()
         self.stdout.write(self.style.SUCCESS('Roles y permisos configurados.'))
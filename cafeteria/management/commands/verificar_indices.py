@@ -0,0 +1,96 @@
+import random
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from cafeteria import siembra
+from cafeteria.eventos import ESTADOS_COCINA
+from cafeteria.filtros import filtrar_ordenes
+from cafeteria.models import Orden, OrdenItem
+
+TABLAS = ('cafeteria_orden', 'cafeteria_ordenitem')
+
+
+class _Rollback(Exception):
+    pass
+
+
+def consultas_calientes(usuario_id, orden_id):
+    """Las consultas de los caminos críticos, construidas igual que en la app."""
+    hoy = str(timezone.localdate())
+    return {
+        'cocina': Orden.objects.filter(estado__in=ESTADOS_COCINA).order_by('creado'),
+        'api_ordenes': Orden.objects.order_by('-creado')[:50],
+        'reporte_hoy': filtrar_ordenes(Orden.objects.all(), {'desde': hoy}).order_by('-creado', '-id'),
+        'reporte_estado': filtrar_ordenes(Orden.objects.all(), {'desde': hoy, 'estado': 'ENTREGADA'}),
+        'reporte_creador': filtrar_ordenes(Orden.objects.all(), {'desde': hoy, 'creador': usuario_id}),
+        'items_orden': OrdenItem.objects.filter(orden_id=orden_id),
+    }
+
+
+def escaneo_secuencial(plan):
+    """Tabla caliente recorrida completa según el plan, o None."""
+    for tabla in TABLAS:
+        if connection.vendor == 'postgresql':
+            if re.search(rf'Seq Scan on {tabla}\b', plan):
+                return tabla
+        elif connection.vendor == 'sqlite':
+            # "SCAN t" sin índice; "SCAN t USING INDEX i" es recorrido ordenado por índice
+            if re.search(rf'\bSCAN {tabla}\b(?! USING (COVERING )?INDEX)', plan):
+                return tabla
+    return None
+
+
+class Command(BaseCommand):
+    help = ("Siembra datos (en una transacción que se revierte) y corre EXPLAIN sobre "
+            "las consultas calientes; falla si alguna hace escaneo secuencial")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ordenes', type=int, default=20000,
+                            help='Órdenes a sembrar (0 para usar los datos existentes)')
+        parser.add_argument('--dias', type=int, default=60, help='Días de historia sembrada')
+
+    def handle(self, *args, **opts):
+        try:
+            with transaction.atomic():
+                fallas = self._verificar(opts['ordenes'], opts['dias'])
+                raise _Rollback
+        except _Rollback:
+            pass
+        if fallas:
+            raise CommandError('Escaneo secuencial en: ' + ', '.join(fallas))
+        self.stdout.write(self.style.SUCCESS('Todas las consultas calientes usan índice.'))
+
+    def _verificar(self, n, dias):
+        usuario, orden_id = self._sembrar(n, dias) if n else self._existentes()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cur:
+                for tabla in TABLAS:
+                    cur.execute(f'ANALYZE {tabla}')
+
+        fallas = []
+        for nombre, qs in consultas_calientes(usuario, orden_id).items():
+            plan = qs.explain()
+            tabla = escaneo_secuencial(plan)
+            estado = self.style.ERROR(f'SEQ SCAN {tabla}') if tabla else self.style.SUCCESS('ok')
+            self.stdout.write(f'{nombre}: {estado}')
+            self.stdout.write('    ' + plan.replace('\n', '\n    '), self.style.HTTP_INFO)
+            if tabla:
+                fallas.append(nombre)
+        return fallas
+
+    def _existentes(self):
+        orden = Orden.objects.order_by('-pk').first()
+        if orden is None:
+            raise CommandError('No hay órdenes; usa --ordenes N para sembrar')
+        return orden.creada_por_id, orden.pk
+
+    def _sembrar(self, n, dias):
+        self.stdout.write(f'Sembrando {n} órdenes en {dias} días…')
+        rnd = random.Random(42)
+        creadores = siembra.usuarios('_explain', 10)
+        productos = siembra.catalogo('_explain', 50, rnd=rnd)
+        ordenes = siembra.ordenes('_explain', n, dias, productos, creadores, rnd=rnd)
+        return creadores[0].pk, ordenes[-1].pk
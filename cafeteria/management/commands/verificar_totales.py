@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.utils import timezone
+
+from cafeteria.models import Orden
+from cafeteria.signals import recalcular_totales, suma_items
+
+class Command(BaseCommand):
+    help = "Verifica que Orden.total coincida con la suma de sus items"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help='Revisar sólo órdenes de los últimos N días')
+        parser.add_argument('--corregir', action='store_true',
+                            help='Recalcula el total de las órdenes inconsistentes')
+
+    def handle(self, *args, **opts):
+        qs = Orden.objects.annotate(suma=suma_items()).exclude(total=F('suma'))
+        if opts['dias'] is not None:
+            qs = qs.filter(creado__gte=timezone.now() - timedelta(days=opts['dias']))
+
+        malas = list(qs.values_list('pk', 'folio', 'total', 'suma'))
+        for pk, folio, total, suma in malas:
+            self.stdout.write(f'Orden {folio} (id={pk}): total={total} items={suma}')
+
+        if not malas:
+            self.stdout.write(self.style.SUCCESS('Totales consistentes.'))
+            return
+        if opts['corregir']:
+            n = recalcular_totales(pk for pk, *_ in malas)
+            self.stdout.write(self.style.SUCCESS(f'{n} órdenes corregidas.'))
+            return
+        raise CommandError(f'{len(malas)} órdenes con total inconsistente')
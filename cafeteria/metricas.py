@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger('cafeteria.lento')
+
+# Mediciones de la petición en curso (None fuera de una petición)
+_medicion: ContextVar = ContextVar('medicion', default=None)
+
+SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# nombre -> (ayuda, buckets, clave en Medicion)
+SERIES = {
+    'cafeteria_request_seconds': ('Tiempo total de la petición', SEGUNDOS, 'total'),
+    'cafeteria_db_seconds': ('Tiempo en la base de datos por petición', SEGUNDOS, 'db'),
+    'cafeteria_template_seconds': ('Tiempo de render de plantillas por petición', SEGUNDOS, 'plantillas'),
+    'cafeteria_queries': ('Consultas SQL por petición', CONSULTAS, 'consultas'),
+}
+
+
+class Medicion:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.total = self.db = self.plantillas = 0.0
+        self.sql = []  # (segundos, sql)
+
+    @property
+    def consultas(self):
+        return len(self.sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: se llama en cada consulta de la petición
+        t = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            dur = time.perf_counter() - t
+            self.db += dur
+            self.sql.append((dur, sql))
+
+
+def _medir(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    return medicion(execute, sql, params, many, context)
+
+@receiver(connection_created)
+def _instalar_medicion(sender, connection, **kwargs):
+    # En cada conexión y no por petición: bajo ASGI el ORM corre en hilos del
+    # executor con su propia conexión; el ContextVar viaja con sync_to_async.
+    if connection.alias == 'default' and _medir not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir)
+
+
+class Histograma:
+    """Histograma acumulado por vista, al estilo Prometheus (en memoria del proceso)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}  # vista -> [conteo por bucket..., +Inf], suma
+
+    def observar(self, vista, valor):
+        conteos, suma = self.series.get(vista) or ([0] * (len(self.buckets) + 1), 0)
+        conteos[bisect_left(self.buckets, valor)] += 1
+        self.series[vista] = (conteos, suma + valor)
+
+
+class Registro:
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.histogramas = {nombre: Histograma(b) for nombre, (_, b, _) in SERIES.items()}
+
+    def observar(self, vista, medicion):
+        with self._candado:
+            for nombre, (_, _, clave) in SERIES.items():
+                self.histogramas[nombre].observar(vista, getattr(medicion, clave))
+
+    def exposicion(self):
+        """Formato de texto de Prometheus (0.0.4)."""
+        lineas = []
+        with self._candado:
+            for nombre, (ayuda, buckets, _) in SERIES.items():
+                lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} histogram']
+                for vista, (conteos, suma) in sorted(self.histogramas[nombre].series.items()):
+                    acumulado = 0
+                    for le, n in zip([*buckets, '+Inf'], conteos):
+                        acumulado += n
+                        lineas.append(f'{nombre}_bucket{{vista="{vista}",le="{le}"}} {acumulado}')
+                    lineas.append(f'{nombre}_sum{{vista="{vista}"}} {suma:.6f}')
+                    lineas.append(f'{nombre}_count{{vista="{vista}"}} {acumulado}')
+        return '\n'.join(lineas) + '\n'
+
+
+registro = Registro()
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """Backend de plantillas que suma su tiempo de render a la petición en curso."""
+
+    def get_template(self, template_name):
+        return _PlantillaMedida(super().get_template(template_name))
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(super().from_string(template_code))
+
+class _PlantillaMedida:
+    def __init__(self, plantilla):
+        self.plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self.plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        medicion = _medicion.get()
+        t = time.perf_counter()
+        try:
+            return self.plantilla.render(context, request)
+        finally:
+            if medicion is not None:
+                medicion.plantillas += time.perf_counter() - t
+
+
+class MetricasMiddleware:
+    """Consultas, tiempo de BD, de plantillas y total por vista.
+
+    Agrega ``Server-Timing`` a la respuesta (visible en las devtools para los
+    parciales HTMX), alimenta los histogramas de ``/metrics`` y registra en
+    ``cafeteria.lento`` las peticiones que pasan de ``METRICAS_LENTO_MS`` junto
+    con sus consultas más lentas. Funciona en la cadena síncrona (WSGI) y en
+    la asíncrona (ASGI) sin forzar a la otra a adaptarse.
+    """
+
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._cerrar(request, response, medicion)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._cerrar(request, response, medicion)
+
+    def _cerrar(self, request, response, medicion):
+        medicion.total = time.perf_counter() - medicion.inicio
+
+        match = getattr(request, 'resolver_match', None)
+        vista = (match.view_name if match else None) or 'sin_ruta'
+        registro.observar(vista, medicion)
+        response['Server-Timing'] = (
+            f'db;dur={medicion.db * 1000:.1f};desc="{medicion.consultas} consultas", '
+            f'tpl;dur={medicion.plantillas * 1000:.1f}, '
+            f'total;dur={medicion.total * 1000:.1f}')
+        if medicion.total * 1000 >= settings.METRICAS_LENTO_MS:
+            self._reportar(request, vista, medicion)
+        return response
+
+    @staticmethod
+    def _reportar(request, vista, medicion):
+        peores = sorted(medicion.sql, key=lambda x: x[0], reverse=True)[:5]
+        logger.warning(
+            'Petición lenta %s %s (%s): %.0f ms, %d consultas en %.0f ms, plantillas %.0f ms\n%s',
+            request.method, request.path, vista, medicion.total * 1000, medicion.consultas,
+            medicion.db * 1000, medicion.plantillas * 1000,
+            '\n'.join(f'  {d * 1000:.1f} ms  {sql}' for d, sql in peores))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:07
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def sembrar_contadores(apps, schema_editor):
+    # Arranca cada contador en el mayor folio ya emitido ese día
+    Orden = apps.get_model('cafeteria', 'Orden')
+    FolioDiario = apps.get_model('cafeteria', 'FolioDiario')
+    maximos = {}
+    for folio in Orden.objects.values_list('folio', flat=True).iterator():
+        dia, _, seq = folio.partition('-')
+        try:
+            fecha = datetime.strptime(dia, '%Y%m%d').date()
+            seq = int(seq)
+        except ValueError:
+            continue
+        maximos[fecha] = max(seq, maximos.get(fecha, 0))
+    FolioDiario.objects.bulk_create(
+        [FolioDiario(fecha=f, ultimo=n) for f, n in maximos.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafeteria', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FolioDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('ultimo', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(sembrar_contadores, migrations.RunPython.noop),
+    ]
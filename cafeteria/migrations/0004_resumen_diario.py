@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:13
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+ESTADOS = {
+    'PENDIENTE_PAGO': 'pendientes_pago',
+    'PAGADA': 'pagadas',
+    'EN_COLA': 'en_cola',
+    'EN_PREPARACION': 'en_preparacion',
+    'LISTA': 'listas',
+    'ENTREGADA': 'entregadas',
+}
+
+
+def backfill(apps, schema_editor):
+    Orden = apps.get_model('cafeteria', 'Orden')
+    ResumenDiario = apps.get_model('cafeteria', 'ResumenDiario')
+    agg = {campo: Count('pk', filter=Q(estado=e)) for e, campo in ESTADOS.items()}
+    filas = (Orden.objects
+             .annotate(fecha=TruncDate('creado', tzinfo=timezone.get_current_timezone()))
+             .values('fecha')
+             .annotate(total_ordenes=Count('pk'),
+                       total_ventas=Sum('total', filter=~Q(estado='PENDIENTE_PAGO')),
+                       **agg)
+             .order_by())
+    ResumenDiario.objects.bulk_create([
+        ResumenDiario(**{**f, 'total_ventas': f['total_ventas'] or Decimal('0')}) for f in filas
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafeteria', '0003_actualizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('total_ordenes', models.IntegerField(default=0)),
+                ('pendientes_pago', models.IntegerField(default=0)),
+                ('pagadas', models.IntegerField(default=0)),
+                ('en_cola', models.IntegerField(default=0)),
+                ('en_preparacion', models.IntegerField(default=0)),
+                ('listas', models.IntegerField(default=0)),
+                ('entregadas', models.IntegerField(default=0)),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:16
+
+from django.db import migrations, models
+
+from cafeteria.utils import normalizar
+
+INDICE_TRGM = 'cafeteria_producto_nombre_busqueda_trgm'
+
+
+def llenar_nombre_busqueda(apps, schema_editor):
+    Producto = apps.get_model('cafeteria', 'Producto')
+    productos = list(Producto.objects.only('pk', 'nombre'))
+    for p in productos:
+        p.nombre_busqueda = normalizar(p.nombre)
+    Producto.objects.bulk_update(productos, ['nombre_busqueda'], batch_size=500)
+
+
+def crear_trigramas(apps, schema_editor):
+    # Índice trigram sólo en PostgreSQL: acelera el "contiene" de la búsqueda
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDICE_TRGM} ON cafeteria_producto '
+        'USING gin (nombre_busqueda gin_trgm_ops)'
+    )
+
+
+def borrar_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDICE_TRGM}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafeteria', '0004_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='nombre_busqueda',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=120),
+        ),
+        migrations.RunPython(llenar_nombre_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(crear_trigramas, borrar_trigramas),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafeteria', '0005_producto_nombre_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(condition=models.Q(('estado__in', ['EN_COLA', 'EN_PREPARACION', 'LISTA'])), fields=['creado'], name='orden_cocina_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['creado', 'id'], name='orden_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['estado', 'creado'], name='orden_estado_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['creada_por', 'creado'], name='orden_creador_creado_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:22
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def fusionar_duplicados(apps, schema_editor):
+    # Antes de la restricción (0008): cada (orden, producto) repetido queda en su línea
+    # más antigua con la suma de cantidades y de subtotales. Así el total de la orden
+    # (y el ResumenDiario que ya lo contó) no cambia aunque las líneas tuvieran
+    # precios distintos; precio_unitario queda como el promedio resultante.
+    OrdenItem = apps.get_model('cafeteria', 'OrdenItem')
+    repetidos = (OrdenItem.objects.values('orden_id', 'producto_id')
+                 .annotate(n=Count('id'), primera=Min('id'), suma=Sum('cantidad'),
+                           importe=Sum('subtotal'))
+                 .filter(n__gt=1))
+    for r in list(repetidos):
+        linea = OrdenItem.objects.get(pk=r['primera'])
+        linea.cantidad = r['suma']
+        linea.subtotal = r['importe']
+        linea.precio_unitario = (r['importe'] / r['suma']).quantize(Decimal('0.01'))
+        linea.save(update_fields=['cantidad', 'precio_unitario', 'subtotal'])
+        (OrdenItem.objects.filter(orden_id=r['orden_id'], producto_id=r['producto_id'])
+         .exclude(pk=linea.pk).delete())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafeteria', '0006_indices_orden'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_duplicados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:22
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Separada de 0007: PostgreSQL no permite ALTER TABLE con eventos de
+    # triggers pendientes en la misma transacción que el DELETE.
+
+    dependencies = [
+        ('cafeteria', '0007_fusionar_lineas'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='ordenitem',
+            unique_together={('orden', 'producto')},
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def encolar_activas(apps, schema_editor):
+    # Las órdenes que ya esperan en cocina entran a la cola de la estación "general"
+    Orden = apps.get_model('cafeteria', 'Orden')
+    Comanda = apps.get_model('cafeteria', 'Comanda')
+    Comanda.objects.bulk_create([
+        Comanda(orden_id=pk, estacion='general')
+        for pk in Orden.objects.filter(estado='EN_COLA').values_list('pk', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafeteria', '0008_ordenitem_unico'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='estacion',
+            field=models.CharField(default='general', max_length=40),
+        ),
+        migrations.CreateModel(
+            name='Comanda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estacion', models.CharField(max_length=40)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('tomada', models.DateTimeField(blank=True, null=True)),
+                ('terminada', models.DateTimeField(blank=True, null=True)),
+                ('cocinero', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='comandas', to=settings.AUTH_USER_MODEL)),
+                ('orden', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comandas', to='cafeteria.orden')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('cocinero__isnull', True)), fields=['estacion', 'creada'], name='comanda_pendiente_idx')],
+                'unique_together': {('orden', 'estacion')},
+            },
+        ),
+        migrations.RunPython(encolar_activas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafeteria', '0009_comandas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoOrden',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estacion', models.CharField(blank=True, default='', max_length=40)),
+                ('anterior', models.CharField(blank=True, choices=[('PENDIENTE_PAGO', 'Pendiente de pago'), ('PAGADA', 'Pagada'), ('EN_COLA', 'En cola'), ('EN_PREPARACION', 'En preparación'), ('LISTA', 'Lista'), ('ENTREGADA', 'Entregada')], default='', max_length=20)),
+                ('nuevo', models.CharField(choices=[('PENDIENTE_PAGO', 'Pendiente de pago'), ('PAGADA', 'Pagada'), ('EN_COLA', 'En cola'), ('EN_PREPARACION', 'En preparación'), ('LISTA', 'Lista'), ('ENTREGADA', 'Entregada')], max_length=20)),
+                ('en', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('orden', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='eventos', to='cafeteria.orden')),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafeteria', '0010_evento_orden'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrdenArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('folio', models.CharField(max_length=20, unique=True)),
+                ('estado', models.CharField(choices=[('PENDIENTE_PAGO', 'Pendiente de pago'), ('PAGADA', 'Pagada'), ('EN_COLA', 'En cola'), ('EN_PREPARACION', 'En preparación'), ('LISTA', 'Lista'), ('ENTREGADA', 'Entregada')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('creado', models.DateTimeField()),
+                ('actualizado', models.DateTimeField()),
+                ('archivada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('alumno', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('creada_por', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrdenItemArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('orden', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='cafeteria.ordenarchivada')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='cafeteria.producto')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PagoArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metodo', models.CharField(choices=[('EFECTIVO', 'Efectivo'), ('TARJETA', 'Tarjeta')], max_length=10)),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('recibido_en', models.DateTimeField()),
+                ('orden', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pago', to='cafeteria.ordenarchivada')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ordenarchivada',
+            index=models.Index(fields=['creado', 'id'], name='archivada_creado_idx'),
+        ),
+    ]
@@ -7,19 +7,26 @@ User = settings.AUTH_USER_MODEL
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     activa = models.BooleanField(default=True)
+    # Estación de cocina que prepara sus productos (p. ej. "bebidas", "cocina caliente")
+    estacion = models.CharField(max_length=40, default='general')
+    actualizado = models.DateTimeField(auto_now=True, db_index=True)
     def __str__(self): return self.nombre
 
 class Producto(models.Model):
     nombre = models.CharField(max_length=120)
+    # nombre sin acentos y en minúsculas (ver utils.normalizar); lo llena una señal
+    nombre_busqueda = models.CharField(max_length=120, db_index=True, editable=False, default='')
     categoria = models.ForeignKey(Categoria, on_delete=models.PROTECT, related_name='productos')
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     disponible = models.BooleanField(default=True)
+    actualizado = models.DateTimeField(auto_now=True, db_index=True)
     def __str__(self): return self.nombre
 
 class MenuDia(models.Model):
     fecha = models.DateField(unique=True)
     publicado = models.BooleanField(default=False)
     productos = models.ManyToManyField(Producto, through='MenuItem', related_name='menus')
+    actualizado = models.DateTimeField(auto_now=True, db_index=True)
     def __str__(self): return f"Menú {self.fecha}"
 
 class MenuItem(models.Model):
@@ -44,8 +51,22 @@ class Orden(models.Model):
     estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE_PAGO)
     total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     creado = models.DateTimeField(auto_now_add=True)
+    # Se toca también desde los update() de totales/estado (ver signals)
+    actualizado = models.DateTimeField(auto_now=True, db_index=True)
     def __str__(self): return f"Orden {self.folio}"
 
+    class Meta:
+        indexes = [
+            # Cocina: sólo las órdenes activas, ya en el orden de la pantalla
+            models.Index(fields=['creado'], name='orden_cocina_idx',
+                         condition=models.Q(estado__in=['EN_COLA', 'EN_PREPARACION', 'LISTA'])),
+            # Listados por fecha (-creado) y rangos de folio/estadísticas/reportes
+            models.Index(fields=['creado', 'id'], name='orden_creado_idx'),
+            # Reportes filtrados por estado dentro de un rango de fechas
+            models.Index(fields=['estado', 'creado'], name='orden_estado_creado_idx'),
+            models.Index(fields=['creada_por', 'creado'], name='orden_creador_creado_idx'),
+        ]
+
 class OrdenItem(models.Model):
     orden = models.ForeignKey(Orden, on_delete=models.CASCADE, related_name='items')
     producto = models.ForeignKey(Producto, on_delete=models.PROTECT)
@@ -53,6 +74,10 @@ class OrdenItem(models.Model):
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=12, decimal_places=2)
 
+    class Meta:
+        # Una línea por producto: el POS suma cantidades con un upsert
+        unique_together = (('orden','producto'),)
+
 class Pago(models.Model):
     class Metodo(models.TextChoices):
         EFECTIVO = "EFECTIVO", "Efectivo"
@@ -61,3 +86,85 @@ class Pago(models.Model):
     metodo = models.CharField(max_length=10, choices=Metodo.choices)
     monto = models.DecimalField(max_digits=12, decimal_places=2)
     recibido_en = models.DateTimeField(default=timezone.now)
+
+class Comanda(models.Model):
+    # Parte de una orden que prepara una estación; un cocinero la toma y la termina
+    orden = models.ForeignKey(Orden, on_delete=models.CASCADE, related_name='comandas')
+    estacion = models.CharField(max_length=40)
+    creada = models.DateTimeField(auto_now_add=True)
+    cocinero = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL,
+                                 related_name='comandas')
+    tomada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = (('orden','estacion'),)
+        indexes = [
+            # Cola de cada estación: sólo lo que nadie ha tomado, en orden de llegada
+            models.Index(fields=['estacion', 'creada'], name='comanda_pendiente_idx',
+                         condition=models.Q(cocinero__isnull=True)),
+        ]
+    def __str__(self): return f"{self.orden_id} @ {self.estacion}"
+
+class EventoOrden(models.Model):
+    # Bitácora de transiciones: sólo se inserta. Sin FK real para que sobreviva
+    # a la orden; ``estacion`` vacía = transición de la orden completa.
+    orden = models.ForeignKey(Orden, on_delete=models.DO_NOTHING, db_constraint=False,
+                              related_name='eventos')
+    estacion = models.CharField(max_length=40, blank=True, default='')
+    anterior = models.CharField(max_length=20, choices=Orden.Estado.choices, blank=True, default='')
+    nuevo = models.CharField(max_length=20, choices=Orden.Estado.choices)
+    en = models.DateTimeField(default=timezone.now, db_index=True)
+    def __str__(self): return f"{self.orden_id}: {self.anterior or '-'} -> {self.nuevo}"
+
+class FolioDiario(models.Model):
+    # Contador por día para asignar folios sin escanear Orden
+    fecha = models.DateField(unique=True)
+    ultimo = models.PositiveIntegerField(default=0)
+    def __str__(self): return f"{self.fecha}: {self.ultimo}"
+
+class ResumenDiario(models.Model):
+    # Rollup por día (fecha local de Orden.creado), mantenido en cada transición
+    fecha = models.DateField(unique=True)
+    total_ordenes = models.IntegerField(default=0)
+    pendientes_pago = models.IntegerField(default=0)
+    pagadas = models.IntegerField(default=0)
+    en_cola = models.IntegerField(default=0)
+    en_preparacion = models.IntegerField(default=0)
+    listas = models.IntegerField(default=0)
+    entregadas = models.IntegerField(default=0)
+    # Suma de Orden.total de las órdenes ya pagadas (cualquier estado salvo PENDIENTE_PAGO)
+    total_ventas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    def __str__(self): return f"Resumen {self.fecha}"
+
+# --------- Archivo ----------
+# Órdenes ENTREGADA fuera de la retención (ver archivo.py). Conservan su id
+# original, así la bitácora (EventoOrden) y los enlaces siguen apuntando a ellas.
+
+class OrdenArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    folio = models.CharField(max_length=20, unique=True)
+    alumno = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    creada_por = models.ForeignKey('auth.User', on_delete=models.PROTECT, related_name='+')
+    estado = models.CharField(max_length=20, choices=Orden.Estado.choices)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    creado = models.DateTimeField()
+    actualizado = models.DateTimeField()
+    archivada = models.DateTimeField(default=timezone.now)
+    def __str__(self): return f"Orden {self.folio} (archivada)"
+
+    class Meta:
+        indexes = [models.Index(fields=['creado', 'id'], name='archivada_creado_idx')]
+
+class OrdenItemArchivado(models.Model):
+    orden = models.ForeignKey(OrdenArchivada, on_delete=models.CASCADE, related_name='items')
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name='+')
+    cantidad = models.PositiveIntegerField()
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+
+class PagoArchivado(models.Model):
+    orden = models.OneToOneField(OrdenArchivada, on_delete=models.CASCADE, related_name='pago')
+    metodo = models.CharField(max_length=10, choices=Pago.Metodo.choices)
+    monto = models.DecimalField(max_digits=12, decimal_places=2)
+    recibido_en = models.DateTimeField()
@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+class ReportePagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+class RecientesCursorPagination(CursorPagination):
+    # Keyset sobre (creado, id): recorre orden_creado_idx hacia atrás; sin COUNT ni un
+    # OFFSET que crezca con la página
+    ordering = ('-creado', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+class ItemsCursorPagination(RecientesCursorPagination):
+    # OrdenItem no tiene fecha propia: el id crece con el tiempo
+    ordering = ('-id',)
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+# Permisos resueltos por usuario. Como en el catálogo, las llaves llevan la versión
+# de roles vigente: setup_roles o un cambio de grupos/permisos sólo la incrementa.
+LLAVE_VERSION = 'permisos:version'
+
+
+def version():
+    v = cache.get(LLAVE_VERSION)
+    if v is None:
+        cache.add(LLAVE_VERSION, 1, timeout=None)
+        v = cache.get(LLAVE_VERSION, 1)
+    return v
+
+def invalidar():
+    try:
+        cache.incr(LLAVE_VERSION)
+    except ValueError:
+        cache.add(LLAVE_VERSION, 1, timeout=None)
+
+async def aversion():
+    v = await cache.aget(LLAVE_VERSION)
+    if v is None:
+        await cache.aadd(LLAVE_VERSION, 1, timeout=None)
+        v = await cache.aget(LLAVE_VERSION, 1)
+    return v
+
+def llave(usuario_id, v=None):
+    return f'permisos:{v or version()}:{usuario_id}'
+
+
+class PermisosCacheadosBackend(ModelBackend):
+    """ModelBackend cuyo conjunto de permisos por usuario vive en la caché compartida.
+
+    ``permission_required`` y los permisos de DRF terminan en
+    ``get_all_permissions`` (``aget_all_permissions`` en las vistas async);
+    con la entrada en caché no consultan la base.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return super().get_all_permissions(user_obj, obj)
+        if not hasattr(user_obj, '_perm_cache'):
+            k = llave(user_obj.pk)
+            permisos = cache.get(k)
+            if permisos is None:
+                permisos = super().get_all_permissions(user_obj)
+                cache.set(k, permisos, settings.PERMISOS_CACHE_TTL)
+            user_obj._perm_cache = permisos
+        return user_obj._perm_cache
+
+    async def aget_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return await super().aget_all_permissions(user_obj, obj)
+        if not hasattr(user_obj, '_perm_cache'):
+            k = llave(user_obj.pk, v=await aversion())
+            permisos = await cache.aget(k)
+            if permisos is None:
+                permisos = await super().aget_all_permissions(user_obj)
+                await cache.aset(k, permisos, settings.PERMISOS_CACHE_TTL)
+            user_obj._perm_cache = permisos
+        return user_obj._perm_cache
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Lo que orjson no serializa solo. Decimal como texto, igual que DecimalField de DRF
+    # (el JSONRenderer estándar lo convertiría a float); lo demás como el encoder de DRF.
+    if isinstance(obj, Decimal):
+        return str(obj)
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """JSON con orjson: fechas ISO 8601 (UTC como "Z", igual que DRF), Decimal como texto."""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    opciones = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        opciones = self.opciones
+        if accepted_media_type and 'indent=' in accepted_media_type:
+            opciones |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=opciones)
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
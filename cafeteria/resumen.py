@@ -0,0 +1,128 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Orden, OrdenArchivada, ResumenDiario
+
+Estado = Orden.Estado
+
+# Columna del rollup para cada estado
+CAMPO_ESTADO = {
+    Estado.PENDIENTE_PAGO: 'pendientes_pago',
+    Estado.PAGADA: 'pagadas',
+    Estado.EN_COLA: 'en_cola',
+    Estado.EN_PREPARACION: 'en_preparacion',
+    Estado.LISTA: 'listas',
+    Estado.ENTREGADA: 'entregadas',
+}
+CAMPOS = ['total_ordenes', *CAMPO_ESTADO.values(), 'total_ventas']
+
+
+def rango_dias(desde, hasta=None):
+    # [inicio, fin) en hora local: filtra sobre creado sin envolverlo en DATE()
+    hasta = hasta or desde
+    tz = timezone.get_current_timezone()
+    inicio = timezone.make_aware(datetime.combine(desde, time.min), tz)
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min), tz)
+    return inicio, fin
+
+def agregar_ordenes(qs):
+    """Conteos por estado y ventas en una sola consulta (agregación condicional)."""
+    agg = {campo: Count('pk', filter=Q(estado=estado)) for estado, campo in CAMPO_ESTADO.items()}
+    agg['total_ordenes'] = Count('pk')
+    agg['total_ventas'] = Coalesce(
+        Sum('total', filter=~Q(estado=Estado.PENDIENTE_PAGO)), Value(Decimal('0')),
+        output_field=DecimalField(max_digits=14, decimal_places=2))
+    return qs.order_by().aggregate(**agg)
+
+def reconstruir(fecha):
+    """Recalcula el rollup de un día desde Orden y el archivo (para backfill o corrección)."""
+    inicio, fin = rango_dias(fecha)
+    vivas = agregar_ordenes(Orden.objects.filter(creado__gte=inicio, creado__lt=fin))
+    archivadas = agregar_ordenes(OrdenArchivada.objects.filter(creado__gte=inicio, creado__lt=fin))
+    valores = {c: vivas[c] + archivadas[c] for c in CAMPOS}
+    ResumenDiario.objects.update_or_create(fecha=fecha, defaults=valores)
+    return valores
+
+def _vacio(campo):
+    return Decimal('0') if campo == 'total_ventas' else 0
+
+def _del_rango(desde, hasta):
+    return ResumenDiario.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+
+def leer(desde, hasta=None):
+    """Suma del rollup en [desde, hasta]; un día es una búsqueda por clave única."""
+    hasta = hasta or desde
+    qs = _del_rango(desde, hasta)
+    if desde == hasta:
+        return qs.values(*CAMPOS).first() or {c: _vacio(c) for c in CAMPOS}
+    agg = qs.aggregate(**{c: Sum(c) for c in CAMPOS})
+    return {c: v if v is not None else _vacio(c) for c, v in agg.items()}
+
+async def aleer(desde, hasta=None):
+    """``leer`` con el ORM async."""
+    hasta = hasta or desde
+    qs = _del_rango(desde, hasta)
+    if desde == hasta:
+        return await qs.values(*CAMPOS).afirst() or {c: _vacio(c) for c in CAMPOS}
+    agg = await qs.aaggregate(**{c: Sum(c) for c in CAMPOS})
+    return {c: v if v is not None else _vacio(c) for c, v in agg.items()}
+
+
+def _aplicar(orden, **deltas):
+    fecha = timezone.localtime(orden.creado).date()
+    cambios = {c: F(c) + d for c, d in deltas.items() if d}
+    if not cambios:
+        return
+    if not ResumenDiario.objects.filter(fecha=fecha).update(**cambios):
+        ResumenDiario.objects.get_or_create(fecha=fecha)
+        ResumenDiario.objects.filter(fecha=fecha).update(**cambios)
+
+def _venta(total, estado):
+    return total if estado != Estado.PENDIENTE_PAGO else 0
+
+def registrar_alta(orden):
+    _aplicar(orden, total_ordenes=1, **{CAMPO_ESTADO[orden.estado]: 1},
+             total_ventas=_venta(orden.total, orden.estado))
+
+def registrar_cambio(orden, anterior, total_anterior):
+    """Una orden guardada con save(): puede cambiar su estado, su total o ambos."""
+    if anterior is None:
+        return
+    deltas = {}
+    if anterior != orden.estado:
+        deltas = {CAMPO_ESTADO[anterior]: -1, CAMPO_ESTADO[orden.estado]: 1}
+    if total_anterior is None:
+        total_anterior = orden.total  # total diferido: no cambió en este save()
+    deltas['total_ventas'] = _venta(orden.total, orden.estado) - _venta(total_anterior, anterior)
+    _aplicar(orden, **deltas)
+
+def registrar_transiciones(ordenes, anterior, nuevo):
+    # Lote del mismo anterior -> nuevo: una actualización por día, no por orden
+    por_dia = {}
+    for orden in ordenes:
+        por_dia.setdefault(timezone.localtime(orden.creado).date(), []).append(orden)
+    for lote in por_dia.values():
+        _aplicar(lote[0], **{CAMPO_ESTADO[anterior]: -len(lote), CAMPO_ESTADO[nuevo]: len(lote)},
+                 total_ventas=sum(_venta(o.total, nuevo) - _venta(o.total, anterior) for o in lote))
+
+def registrar_totales(cambios):
+    """Totales escritos con update() sin cambio de estado: ``[(orden, delta)]``.
+
+    ``orden`` sólo necesita ``estado`` y ``creado``; una actualización por día.
+    """
+    por_dia = {}
+    for orden, delta in cambios:
+        if delta and orden.estado != Estado.PENDIENTE_PAGO:
+            dia = por_dia.setdefault(timezone.localtime(orden.creado).date(), [orden, 0])
+            dia[1] += delta
+    for orden, delta in por_dia.values():
+        _aplicar(orden, total_ventas=delta)
+
+def registrar_baja(orden, estado, total):
+    # ``estado`` y ``total`` tal como los tenía la base (lo que el rollup contó)
+    _aplicar(orden, total_ordenes=-1, **{CAMPO_ESTADO[estado]: -1},
+             total_ventas=-_venta(total, estado))
@@ -1,9 +1,13 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import (
     Categoria, Producto,
     MenuDia, MenuItem,
-    Orden, OrdenItem
+    Orden, OrdenItem, Comanda,
+    OrdenArchivada, OrdenItemArchivado, PagoArchivado
 )
+from .signals import recalculo_diferido
+from .transiciones import encolar, permitida
 
 class CategoriaSerializer(serializers.ModelSerializer):
     class Meta:
@@ -35,10 +39,25 @@ class MenuDiaSerializer(serializers.ModelSerializer):
 
 # --------- Orden & Items ----------
 
+class ProductoLoteField(serializers.PrimaryKeyRelatedField):
+    # Resuelve contra los productos precargados en un solo query por el serializer
+    # padre; si no está en el lote cae al lookup normal (y su mensaje de error).
+    def to_internal_value(self, data):
+        lote = self.context.get('productos_lote')
+        if lote is not None:
+            try:
+                return lote[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
 class OrdenItemWriteSerializer(serializers.ModelSerializer):
+    producto = ProductoLoteField(queryset=Producto.objects.all())
+
     class Meta:
         model = OrdenItem
         fields = ['id', 'producto', 'cantidad', 'precio_unitario', 'subtotal']
+        read_only_fields = ['subtotal']
 
 class OrdenItemReadSerializer(serializers.ModelSerializer):
     producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
@@ -63,24 +82,123 @@ class OrdenCreateUpdateSerializer(serializers.ModelSerializer):
         model = Orden
         fields = ['id', 'folio', 'estado', 'items']
 
+    def to_internal_value(self, data):
+        items = data.get('items') if hasattr(data, 'get') else None
+        if isinstance(items, list):
+            ids = set()
+            for it in items:
+                try:
+                    ids.add(int(it.get('producto')))
+                except (AttributeError, TypeError, ValueError):
+                    pass
+            self.context['productos_lote'] = Producto.objects.in_bulk(ids)
+        return super().to_internal_value(data)
+
+    def validate_estado(self, value):
+        # Al editar, el estado sólo avanza por la máquina de estados
+        if self.instance is not None and value != self.instance.estado \
+                and not permitida(self.instance.estado, value):
+            raise serializers.ValidationError(
+                f'transición {self.instance.estado} → {value} no permitida')
+        return value
+
+    @staticmethod
+    def _lineas(items_data):
+        # Agrupa por producto (una línea por producto, como el POS) y calcula
+        # los subtotales en Python, ya que bulk_create no dispara señales.
+        lineas = {}
+        for it in items_data:
+            producto = it['producto']
+            previa = lineas.get(producto.pk)
+            cantidad = it.get('cantidad', 1) + (previa['cantidad'] if previa else 0)
+            lineas[producto.pk] = {'producto': producto, 'cantidad': cantidad,
+                                   'precio_unitario': it['precio_unitario']}
+        for ln in lineas.values():
+            ln['subtotal'] = ln['cantidad'] * ln['precio_unitario']
+        return lineas
+
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
         user = self.context['request'].user if self.context and self.context.get('request') and self.context['request'].user.is_authenticated else None
-        orden = Orden.objects.create(creada_por=user, **validated_data)
-        for it in items_data:
-            OrdenItem.objects.create(orden=orden, **it)
+        lineas = self._lineas(items_data)
+        total = sum((ln['subtotal'] for ln in lineas.values()), 0)
+        orden = Orden.objects.create(creada_por=user, total=total, **validated_data)
+        OrdenItem.objects.bulk_create([OrdenItem(orden=orden, **ln) for ln in lineas.values()])
+        if orden.estado == Orden.Estado.EN_COLA:
+            # La señal de alta corrió antes de que existieran las líneas
+            encolar([orden.pk])
         return orden
 
+    @transaction.atomic
     def update(self, instance, validated_data):
     
         items_data = validated_data.pop('items', None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
 
         if items_data is not None:
-            instance.items.all().delete()
-            for it in items_data:
-                OrdenItem.objects.create(orden=instance, **it)
+            self._sincronizar_items(instance, self._lineas(items_data))
 
+        instance.save()
         return instance
+
+    def _sincronizar_items(self, orden, lineas):
+        # Diff contra las líneas actuales: sólo inserta, actualiza o borra lo
+        # que cambió, con un número fijo de queries sin importar cuántas sean.
+        total = sum((ln['subtotal'] for ln in lineas.values()), 0)
+        cambiados, borrar = [], []
+        for item in orden.items.all():
+            ln = lineas.pop(item.producto_id, None)
+            if ln is None:
+                borrar.append(item.pk)
+            elif (item.cantidad, item.precio_unitario) != (ln['cantidad'], ln['precio_unitario']):
+                item.cantidad = ln['cantidad']
+                item.precio_unitario = ln['precio_unitario']
+                item.subtotal = ln['subtotal']
+                cambiados.append(item)
+        nuevos = [OrdenItem(orden=orden, **ln) for ln in lineas.values()]
+
+        # El total se escribe una vez con el save() de la orden
+        with recalculo_diferido(recalcular=False):
+            if borrar:
+                OrdenItem.objects.filter(pk__in=borrar).delete()
+            if cambiados:
+                OrdenItem.objects.bulk_update(cambiados, ['cantidad', 'precio_unitario', 'subtotal'])
+            if nuevos:
+                OrdenItem.objects.bulk_create(nuevos)
+        orden.total = total
+
+class TransicionLoteSerializer(serializers.Serializer):
+    ordenes = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=200)
+    estado = serializers.ChoiceField(choices=Orden.Estado.choices)
+
+class ComandaSerializer(serializers.ModelSerializer):
+    folio = serializers.CharField(source='orden.folio', read_only=True)
+    lineas = OrdenItemReadSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Comanda
+        fields = ['id', 'orden', 'folio', 'estacion', 'cocinero', 'creada', 'tomada', 'terminada', 'lineas']
+
+# --------- Archivo (sólo lectura) ----------
+
+class OrdenItemArchivadoSerializer(serializers.ModelSerializer):
+    producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
+
+    class Meta:
+        model = OrdenItemArchivado
+        fields = ['id', 'producto', 'producto_nombre', 'cantidad', 'precio_unitario', 'subtotal']
+
+class PagoArchivadoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PagoArchivado
+        fields = ['metodo', 'monto', 'recibido_en']
+
+class OrdenArchivadaSerializer(serializers.ModelSerializer):
+    items = OrdenItemArchivadoSerializer(many=True, read_only=True)
+    pago = PagoArchivadoSerializer(read_only=True)
+
+    class Meta:
+        model = OrdenArchivada
+        fields = ['id', 'folio', 'estado', 'total', 'creado', 'creada_por', 'archivada', 'items', 'pago']
@@ -0,0 +1,76 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.utils import timezone
+
+from .eventos import ESTADOS_COCINA
+from .models import Categoria, Orden, OrdenItem, Producto
+from .utils import normalizar
+
+ESTACIONES = ('bebidas', 'caliente', 'fria')
+
+
+def catalogo(prefijo, productos, categorias=1, rnd=None):
+    """Categorías (repartidas entre ESTACIONES) y productos con ``bulk_create``."""
+    rnd = rnd or random.Random(42)
+    cats = Categoria.objects.bulk_create([
+        Categoria(nombre=f'{prefijo} {i}', estacion=ESTACIONES[i % len(ESTACIONES)])
+        for i in range(categorias)])
+    # bulk_create no dispara la señal que llena nombre_busqueda
+    return Producto.objects.bulk_create([
+        Producto(nombre=f'{prefijo} {i}', nombre_busqueda=normalizar(f'{prefijo} {i}'),
+                 categoria=cats[i % categorias], precio=Decimal(rnd.randrange(1000, 9000)) / 100)
+        for i in range(productos)])
+
+def rol(nombre):
+    """Grupo ``nombre`` de setup_roles; corre el comando si los roles aún no existen."""
+    grupo = Group.objects.filter(name=nombre).first()
+    if grupo is None:
+        call_command('setup_roles', stdout=StringIO())
+        grupo = Group.objects.get(name=nombre)
+    return grupo
+
+def usuarios(prefijo, n, password=None, grupo='Cajero'):
+    # Usuarios normales con el rol de setup_roles: sin staff ni superusuario, las
+    # pruebas pasan por las mismas revisiones de permisos que un cajero real
+    nuevos = [User(username=f'{prefijo}_{i}') for i in range(n)]
+    for u in nuevos:
+        u.set_password(password) if password else u.set_unusable_password()
+    nuevos = User.objects.bulk_create(nuevos)
+    rol(grupo).user_set.add(*nuevos)
+    return nuevos
+
+def ordenes(prefijo, n, dias, productos, creadores, lineas=2, rnd=None):
+    """Historia de ``n`` órdenes en ``dias`` días: casi todo entregado, lo reciente en cocina.
+
+    Las señales no corren (total, rollup y bitácora); el total se calcula aquí
+    y el rollup se reconstruye aparte (``reconstruir_resumen``).
+    """
+    rnd = rnd or random.Random(42)
+    ahora = timezone.now()
+    nuevas = []
+    for i in range(n):
+        hace = timedelta(minutes=rnd.randint(0, dias * 24 * 60))
+        reciente = hace < timedelta(minutes=30)
+        estado = (rnd.choice(ESTADOS_COCINA) if reciente and rnd.random() < 0.7
+                  else Orden.Estado.ENTREGADA)
+        nuevas.append(Orden(folio=f'{prefijo}-{i}', creada_por=rnd.choice(creadores), estado=estado))
+        nuevas[-1]._creado = ahora - hace
+    items = []
+    for o in nuevas:
+        elegidos = rnd.sample(productos, lineas)
+        o.total = sum(p.precio for p in elegidos)
+        items += [(o, p) for p in elegidos]
+    Orden.objects.bulk_create(nuevas, batch_size=2000)
+    # auto_now_add ignora el valor en bulk_create: se ajusta "creado" aparte
+    for o in nuevas:
+        o.creado = o._creado
+    Orden.objects.bulk_update(nuevas, ['creado'], batch_size=2000)
+    OrdenItem.objects.bulk_create([
+        OrdenItem(orden=o, producto=p, cantidad=1, precio_unitario=p.precio, subtotal=p.precio)
+        for o, p in items], batch_size=5000)
+    return nuevas
@@ -1,19 +1,192 @@
-from django.db.models.signals import pre_save, post_save, post_delete
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.contrib.auth.models import Group, Permission, User
+from django.db.models.signals import m2m_changed, pre_delete, pre_save, post_save, post_delete, post_init
 from django.dispatch import receiver
-from .models import OrdenItem, Orden
+from django.utils import timezone
+from .models import Categoria, MenuDia, MenuItem, OrdenItem, Orden, Producto
+from . import bitacora, catalogo, permisos, resumen
+from .transiciones import encolar
+from .utils import normalizar
+
+# Órdenes tocadas mientras el recálculo está diferido (None = modo normal)
+_diferidas: ContextVar = ContextVar('ordenes_diferidas', default=None)
+
+def suma_items():
+    # Subconsulta correlacionada: suma de subtotales de la orden externa
+    suma = (OrdenItem.objects
+            .filter(orden=OuterRef('pk'))
+            .values('orden')
+            .annotate(s=Sum('subtotal'))
+            .values('s'))
+    return Coalesce(Subquery(suma), Value(Decimal('0')),
+                    output_field=DecimalField(max_digits=12, decimal_places=2))
+
+def recalcular_totales(orden_ids):
+    # Un solo UPDATE para todas las órdenes, sin traer items a Python. Las
+    # pendientes de pago no cuentan en ventas; de las cobradas se lee antes el
+    # total nuevo para mover sus ventas en el rollup.
+    ids = list(orden_ids)
+    pendientes = Orden.objects.filter(pk__in=ids, estado=Orden.Estado.PENDIENTE_PAGO)
+    n = pendientes.update(total=suma_items(), actualizado=timezone.now())
+    if n < len(ids):
+        cobradas = list(Orden.objects.filter(pk__in=ids).exclude(estado=Orden.Estado.PENDIENTE_PAGO)
+                        .annotate(nuevo=suma_items()).only('estado', 'creado', 'total'))
+        n += Orden.objects.filter(pk__in=[o.pk for o in cobradas]).update(
+            total=suma_items(), actualizado=timezone.now())
+        resumen.registrar_totales([(o, o.nuevo - o.total) for o in cobradas])
+    return n
+
+@contextmanager
+def recalculo_diferido(recalcular=True):
+    """Suspende los ajustes por item y recalcula cada orden tocada una vez al salir.
+
+    Con ``recalcular=False`` el llamador se hace cargo de escribir los totales.
+    """
+    if _diferidas.get() is not None:
+        yield
+        return
+    token = _diferidas.set(set())
+    try:
+        yield
+        tocadas = _diferidas.get()
+    finally:
+        _diferidas.reset(token)
+    if tocadas and recalcular:
+        recalcular_totales(tocadas)
+
+def _ajustar_total(orden_id, delta):
+    tocadas = _diferidas.get()
+    if tocadas is not None:
+        tocadas.add(orden_id)
+    elif not delta:
+        # Mismo total, pero la orden cambió: su versión (ETag / ?since=) también
+        Orden.objects.filter(pk=orden_id).update(actualizado=timezone.now())
+    else:
+        cambios = {'total': F('total') + delta, 'actualizado': timezone.now()}
+        if not Orden.objects.filter(pk=orden_id, estado=Orden.Estado.PENDIENTE_PAGO).update(**cambios):
+            # Ya cobrada: el cambio de total también mueve sus ventas del día
+            orden = Orden.objects.filter(pk=orden_id).only('estado', 'creado').first()
+            if orden is not None:
+                Orden.objects.filter(pk=orden_id).update(**cambios)
+                resumen.registrar_totales([(orden, delta)])
+
+def _recalcular(orden_ids):
+    # Sin el subtotal previo no hay delta: se recalcula desde los items
+    tocadas = _diferidas.get()
+    if tocadas is not None:
+        tocadas.update(orden_ids)
+    else:
+        recalcular_totales(orden_ids)
+
+@receiver(post_init, sender=OrdenItem)
+def recordar_subtotal(sender, instance: OrdenItem, **kwargs):
+    # Vía __dict__ para no disparar la carga de campos diferidos (.only());
+    # un campo diferido queda en None: valor previo desconocido
+    datos = instance.__dict__
+    instance._subtotal_previo = (datos['subtotal'] or 0) if 'subtotal' in datos else None
+    instance._orden_previa_id = datos.get('orden_id')
 
 @receiver(pre_save, sender=OrdenItem)
 def calcular_subtotal(sender, instance: OrdenItem, **kwargs):
     instance.subtotal = instance.cantidad * instance.precio_unitario
 
-def _recalcular_total(orden: Orden):
-    total = sum(i.subtotal for i in orden.items.all())
-    Orden.objects.filter(pk=orden.pk).update(total=total)
-
 @receiver(post_save, sender=OrdenItem)
-def actualizar_total_al_guardar(sender, instance, **kwargs):
-    _recalcular_total(instance.orden)
+def actualizar_total_al_guardar(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and {'cantidad', 'precio_unitario'} & update_fields \
+            and 'subtotal' not in update_fields:
+        # save() parcial (update_fields o campos diferidos): el subtotal de
+        # calcular_subtotal no entró en el UPDATE
+        OrdenItem.objects.filter(pk=instance.pk).update(subtotal=instance.subtotal)
+    previo = 0 if created else instance._subtotal_previo
+    if previo is None or (not created and instance._orden_previa_id is None):
+        _recalcular({instance.orden_id, instance._orden_previa_id} - {None})
+    else:
+        if not created and instance._orden_previa_id != instance.orden_id:
+            # El item cambió de orden: sale completo de la anterior
+            _ajustar_total(instance._orden_previa_id, -previo)
+            previo = 0
+        _ajustar_total(instance.orden_id, instance.subtotal - previo)
+    instance._subtotal_previo = instance.subtotal
+    instance._orden_previa_id = instance.orden_id
 
 @receiver(post_delete, sender=OrdenItem)
-def actualizar_total_al_borrar(sender, instance, **kwargs):
-    _recalcular_total(instance.orden)
+def actualizar_total_al_borrar(sender, instance, origin=None, **kwargs):
+    # En cascada desde su orden no hay total que ajustar: la baja de la orden
+    # descuenta del rollup el total completo
+    modelo = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if modelo is Orden:
+        return
+    if instance._subtotal_previo is None:
+        _recalcular({instance.orden_id})
+    else:
+        _ajustar_total(instance.orden_id, -instance._subtotal_previo)
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def tocar_menu(sender, instance, **kwargs):
+    # Los items viajan anidados en el menú: su cambio es un cambio del menú
+    MenuDia.objects.filter(pk=instance.menu_id).update(actualizado=timezone.now())
+
+@receiver(post_init, sender=Orden)
+def recordar_estado(sender, instance: Orden, **kwargs):
+    instance._estado_previo = instance.__dict__.get('estado')
+    instance._total_previo = instance.__dict__.get('total')
+
+@receiver(post_save, sender=Orden)
+def resumen_al_guardar(sender, instance: Orden, created, **kwargs):
+    if created:
+        resumen.registrar_alta(instance)
+        bitacora.registrar([instance.pk], None, instance.estado)
+    else:
+        resumen.registrar_cambio(instance, instance._estado_previo, instance._total_previo)
+        if instance._estado_previo not in (None, instance.estado):
+            bitacora.registrar([instance.pk], instance._estado_previo, instance.estado)
+    if instance.estado == Orden.Estado.EN_COLA and instance._estado_previo != Orden.Estado.EN_COLA:
+        encolar([instance.pk])
+    instance._estado_previo = instance.estado
+    instance._total_previo = instance.total
+
+@receiver(pre_delete, sender=Orden)
+def recordar_lo_registrado(sender, instance: Orden, **kwargs):
+    # La instancia puede estar desfasada (totales movidos con update()): se lee la fila
+    instance._registrado = Orden.objects.filter(pk=instance.pk).values('estado', 'total').first()
+
+@receiver(post_delete, sender=Orden)
+def resumen_al_borrar(sender, instance: Orden, **kwargs):
+    fila = getattr(instance, '_registrado', None) or {'estado': instance.estado, 'total': instance.total}
+    resumen.registrar_baja(instance, fila['estado'], fila['total'])
+
+@receiver(pre_save, sender=Producto)
+def normalizar_nombre(sender, instance: Producto, **kwargs):
+    instance.nombre_busqueda = normalizar(instance.nombre)
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=MenuDia)
+@receiver(post_delete, sender=MenuDia)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def invalidar_catalogo(sender, **kwargs):
+    # El menú del día se cachea junto con el catálogo (ver catalogo.menu_del_dia)
+    catalogo.invalidar()
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidar_permisos(sender, action, **kwargs):
+    # Membresía o permisos de un rol: todos los usuarios vuelven a resolverse
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        permisos.invalidar()
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidar_permisos_al_borrar(sender, **kwargs):
+    # El borrado en cascada de las tablas intermedias no emite m2m_changed
+    permisos.invalidar()
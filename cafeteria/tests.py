@@ -1,3 +1,1453 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .eventos import HubLocal, en_lote, obtener_hub, publicar_orden
+from .folios import siguiente_folio, siguiente_secuencia
+from .lectura import OrdenItemPlano, OrdenPlana, ProductoPlano
+from .lineas import agregar_linea
+from .metricas import registro
+from . import bitacora, busqueda, catalogo, cola, resumen
+from .models import (
+    Categoria, Comanda, EventoOrden, FolioDiario, MenuDia, MenuItem, Orden, OrdenArchivada,
+    OrdenItem, OrdenItemArchivado, Pago, Producto, ResumenDiario
+)
+from .renderers import ORJSONRenderer
+from .serializers import OrdenItemReadSerializer, OrdenSerializer, ProductoSerializer
+from .signals import recalculo_diferido
+from . import transiciones
+from .versionado import a_cursor
+
+
+class FolioDiarioTests(TestCase):
+    def test_secuencia_por_dia(self):
+        lunes, martes = date(2025, 10, 6), date(2025, 10, 7)
+        self.assertEqual(siguiente_secuencia(lunes), 1)
+        self.assertEqual(siguiente_secuencia(lunes), 2)
+        self.assertEqual(siguiente_secuencia(martes), 1)
+        self.assertEqual(siguiente_folio(lunes), '20251006-0003')
+        self.assertEqual(FolioDiario.objects.get(fecha=lunes).ultimo, 3)
+
+
+class FolioDiarioConcurrenciaTests(TransactionTestCase):
+    HILOS = 8
+    POR_HILO = 25
+
+    def test_sin_colisiones_entre_cajas(self):
+        fecha = date(2025, 10, 6)
+        folios, errores = [], []
+        candado = threading.Lock()
+        barrera = threading.Barrier(self.HILOS)
+
+        def caja():
+            try:
+                barrera.wait()
+                propios = [siguiente_folio(fecha) for _ in range(self.POR_HILO)]
+                with candado:
+                    folios.extend(propios)
+            except Exception as exc:  # pragma: no cover - se reporta abajo
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=caja) for _ in range(self.HILOS)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual(errores, [])
+        total = self.HILOS * self.POR_HILO
+        self.assertEqual(len(set(folios)), total)
+        self.assertEqual(FolioDiario.objects.get(fecha=fecha).ultimo, total)
+
+
+class TotalOrdenTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cajero')
+        cat = Categoria.objects.create(nombre='Bebidas')
+        cls.cafe = Producto.objects.create(nombre='Café', categoria=cat, precio=Decimal('20.00'))
+        cls.torta = Producto.objects.create(nombre='Torta', categoria=cat, precio=Decimal('45.50'))
+
+    def setUp(self):
+        self.orden = Orden.objects.create(folio='T-1', creada_por=self.user)
+
+    def total(self):
+        self.orden.refresh_from_db(fields=['total'])
+        return self.orden.total
+
+    def test_total_por_deltas(self):
+        a = OrdenItem.objects.create(orden=self.orden, producto=self.cafe, cantidad=2,
+                                     precio_unitario=self.cafe.precio)
+        OrdenItem.objects.create(orden=self.orden, producto=self.torta, cantidad=1,
+                                 precio_unitario=self.torta.precio)
+        self.assertEqual(self.total(), Decimal('85.50'))
+
+        a.cantidad = 3
+        with self.assertNumQueries(2):  # UPDATE item + UPDATE total
+            a.save()
+        self.assertEqual(self.total(), Decimal('105.50'))
+
+        a.delete()
+        self.assertEqual(self.total(), Decimal('45.50'))
+
+    def test_subtotal_diferido_y_version(self):
+        a = OrdenItem.objects.create(orden=self.orden, producto=self.cafe, cantidad=2,
+                                     precio_unitario=self.cafe.precio)
+        # Sin el subtotal cargado no hay delta confiable: se recalcula desde los items
+        parcial = OrdenItem.objects.only('cantidad', 'precio_unitario').get(pk=a.pk)
+        parcial.cantidad = 5
+        parcial.save()
+        self.assertEqual(self.total(), Decimal('100.00'))
+        call_command('verificar_totales', stdout=StringIO())
+
+        # Mismo subtotal con otro producto: el total no cambia, la versión sí
+        Orden.objects.filter(pk=self.orden.pk).update(actualizado=timezone.now() - timedelta(minutes=1))
+        antes = Orden.objects.get(pk=self.orden.pk).actualizado
+        a = OrdenItem.objects.get(pk=a.pk)
+        a.producto = self.torta
+        a.save()
+        despues = Orden.objects.get(pk=self.orden.pk)
+        self.assertEqual(despues.total, Decimal('100.00'))
+        self.assertGreater(despues.actualizado, antes)
+
+    def test_recalculo_diferido(self):
+        with recalculo_diferido():
+            for i in range(5):
+                # Una línea por producto (restricción única orden/producto)
+                p = Producto.objects.create(nombre=f'Café {i}', categoria=self.cafe.categoria,
+                                            precio=self.cafe.precio)
+                OrdenItem.objects.create(orden=self.orden, producto=p, cantidad=1,
+                                         precio_unitario=p.precio)
+            self.assertEqual(self.total(), 0)
+        self.assertEqual(self.total(), Decimal('100.00'))
+
+    def test_verificar_totales(self):
+        OrdenItem.objects.create(orden=self.orden, producto=self.cafe, cantidad=1,
+                                 precio_unitario=self.cafe.precio)
+        call_command('verificar_totales', stdout=StringIO())
+        Orden.objects.filter(pk=self.orden.pk).update(total=0)
+        with self.assertRaises(CommandError):
+            call_command('verificar_totales', stdout=StringIO())
+        call_command('verificar_totales', '--corregir', stdout=StringIO())
+        self.assertEqual(self.total(), Decimal('20.00'))
+
+
+class OrdenApiEscrituraTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', password='x')
+        cat = Categoria.objects.create(nombre='Comida')
+        cls.productos = Producto.objects.bulk_create([
+            Producto(nombre=f'P{i}', categoria=cat, precio=Decimal('10.00')) for i in range(40)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def crear(self, folio, n):
+        items = [{'producto': p.pk, 'cantidad': 2, 'precio_unitario': '10.00'}
+                 for p in self.productos[:n]]
+        r = self.client.post('/api/ordenes/', {'folio': folio, 'items': items},
+                             content_type='application/json')
+        self.assertEqual(r.status_code, 201, r.content)
+        return Orden.objects.get(folio=folio)
+
+    def test_crear_con_queries_constantes(self):
+        self.crear('Z', 1)  # crea la fila del resumen diario
+        with CaptureQueriesContext(connection) as pocas:
+            self.crear('A', 3)
+        with self.assertNumQueries(len(pocas)):
+            orden = self.crear('B', 40)
+        self.assertEqual(orden.total, Decimal('800.00'))
+        self.assertEqual(orden.items.count(), 40)
+
+    def test_actualizar_solo_lo_que_cambia(self):
+        orden = self.crear('C', 3)
+        conservado = orden.items.get(producto=self.productos[0])
+        items = [
+            {'producto': self.productos[0].pk, 'cantidad': 2, 'precio_unitario': '10.00'},
+            {'producto': self.productos[1].pk, 'cantidad': 5, 'precio_unitario': '10.00'},
+            {'producto': self.productos[3].pk, 'cantidad': 1, 'precio_unitario': '10.00'},
+        ]
+        r = self.client.put(f'/api/ordenes/{orden.pk}/', {'folio': 'C', 'items': items},
+                            content_type='application/json')
+        self.assertEqual(r.status_code, 200, r.content)
+        orden.refresh_from_db()
+        self.assertEqual(orden.total, Decimal('80.00'))
+        self.assertEqual(
+            dict(orden.items.values_list('producto_id', 'cantidad')),
+            {self.productos[0].pk: 2, self.productos[1].pk: 5, self.productos[3].pk: 1},
+        )
+        self.assertTrue(OrdenItem.objects.filter(pk=conservado.pk).exists())
+        call_command('verificar_totales', stdout=StringIO())
+
+
+class HubPrueba:
+    """Stand-in del hub que sólo registra lo publicado."""
+
+    def __init__(self):
+        self.publicados = []
+
+    def publicar(self, evento):
+        self.publicados.append(evento)
+
+
+class EventosCocinaTests(TestCase):
+    def test_hub_local_difunde_a_suscriptores(self):
+        hub = HubLocal()
+
+        async def escenario():
+            with hub.suscribir() as a, hub.suscribir() as b:
+                # Publicación desde otro hilo, como la haría una vista síncrona
+                await asyncio.to_thread(hub.publicar, {'orden': 1})
+                return await a.recibir(1), await b.recibir(1), await a.recibir(0.01)
+
+        self.assertEqual(asyncio.run(escenario()), ({'orden': 1}, {'orden': 1}, None))
+        self.assertEqual(hub._suscripciones, set())
+
+    @override_settings(COCINA_HUB='cafeteria.tests.HubPrueba')
+    def test_cambio_de_estado_publica_tarjeta(self):
+        user = User.objects.create_superuser('cocina', password='x')
+        self.client.force_login(user)
+        orden = Orden.objects.create(folio='K-1', creada_por=user, estado=Orden.Estado.EN_COLA)
+
+        for estado in ('EN_PREPARACION', 'LISTA', 'ENTREGADA'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/cocina/cambiar/{orden.pk}/{estado}/')
+
+        primero, _, segundo = obtener_hub().publicados
+        self.assertEqual(primero['estado'], 'EN_PREPARACION')
+        self.assertIn(f'id="card-{orden.pk}"', primero['html'])
+        self.assertEqual(segundo['estado'], 'ENTREGADA')
+        self.assertNotIn('html', segundo)
+
+    @override_settings(COCINA_HUB='cafeteria.tests.HubPrueba')
+    def test_lote_publica_con_consultas_fijas(self):
+        user = User.objects.create_user('cocina')
+        cat = Categoria.objects.create(nombre='Comida')
+        producto = Producto.objects.create(nombre='Torta', categoria=cat, precio=Decimal('50.00'))
+        ids = []
+        for i in range(5):
+            orden = Orden.objects.create(folio=f'K-{i}', creada_por=user, estado=Orden.Estado.EN_COLA)
+            OrdenItem.objects.create(orden=orden, producto=producto, cantidad=1, precio_unitario=producto.precio)
+            ids.append(orden.pk)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            transiciones.cambiar_estado(ids, Orden.Estado.EN_PREPARACION)
+        self.assertEqual(len(callbacks), 1)
+        with self.assertNumQueries(3):  # órdenes + creada_por, items, productos
+            callbacks[0]()
+        publicados = obtener_hub().publicados
+        self.assertEqual([e['orden'] for e in publicados], ids)
+        self.assertTrue(all('html' in e for e in publicados))
+
+        # Un bloque que falla no deja eventos pendientes para la siguiente transacción
+        orden = Orden.objects.get(pk=ids[0])
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic(), en_lote():
+                publicar_orden('estado_cambiado', orden)
+                raise RuntimeError
+            with transaction.atomic(), en_lote():
+                publicar_orden('orden_creada', orden)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual([e['tipo'] for e in obtener_hub().publicados[len(ids):]], ['orden_creada'])
+
+
+class VersionadoApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cat = Categoria.objects.create(nombre='Bebidas')
+        cls.cafe = Producto.objects.create(nombre='Café', categoria=cls.cat, precio=Decimal('20.00'))
+        cls.te = Producto.objects.create(nombre='Té', categoria=cls.cat, precio=Decimal('15.00'))
+
+    def test_304_hasta_que_cambia_el_catalogo(self):
+        r = self.client.get('/api/productos/')
+        etag = r['ETag']
+        with self.assertNumQueries(2):  # versión de productos + categorías
+            r = self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 304)
+
+        self.cat.nombre = 'Calientes'
+        self.cat.save()
+        r = self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r['ETag'], etag)
+
+    def test_since_devuelve_solo_cambios(self):
+        Producto.objects.update(actualizado=timezone.now() - timedelta(hours=1))
+        Categoria.objects.update(actualizado=timezone.now() - timedelta(hours=1))
+        cursor = a_cursor(timezone.now() - timedelta(minutes=30))
+        self.te.precio = Decimal('16.00')
+        self.te.save()
+        data = self.client.get('/api/productos/', {'since': cursor}).json()
+        self.assertEqual([p['nombre'] for p in data['results']], ['Té'])
+        self.assertEqual(data['total'], 2)
+        self.assertGreater(data['cursor'], cursor)
+
+    def test_since_incluye_cambios_de_categoria(self):
+        Producto.objects.update(actualizado=timezone.now() - timedelta(hours=1))
+        Categoria.objects.update(actualizado=timezone.now() - timedelta(hours=1))
+        menu = MenuDia.objects.create(fecha=timezone.localdate())
+        MenuItem.objects.create(menu=menu, producto=self.cafe)
+        MenuDia.objects.filter(pk=menu.pk).update(actualizado=timezone.now() - timedelta(hours=1))
+        cursor = a_cursor(timezone.now() - timedelta(minutes=30))
+        self.cat.nombre = 'Calientes'
+        self.cat.save()
+
+        data = self.client.get('/api/productos/', {'since': cursor}).json()
+        self.assertEqual({p['nombre'] for p in data['results']}, {'Café', 'Té'})
+        self.assertEqual(data['results'][0]['categoria_detalle']['nombre'], 'Calientes')
+        data = self.client.get('/api/menu/', {'since': cursor}).json()
+        self.assertEqual([m['id'] for m in data['results']], [menu.pk])
+
+    def test_since_de_ordenes_va_paginado(self):
+        user = User.objects.create_user('cajero')
+        Orden.objects.bulk_create([Orden(folio=f'S-{i}', creada_por=user) for i in range(7)])
+        data = self.client.get('/api/ordenes/', {'since': 0, 'page_size': 5}).json()
+        self.assertEqual((len(data['results']), data['total']), (5, 7))
+        siguiente = self.client.get(data['next']).json()
+        self.assertEqual(len(siguiente['results']), 2)
+        self.assertIsNone(siguiente['next'])
+        self.assertEqual(siguiente['cursor'], data['cursor'])
+
+    def test_cambio_de_item_invalida_la_orden(self):
+        user = User.objects.create_user('cajero')
+        orden = Orden.objects.create(folio='V-1', creada_por=user)
+        Orden.objects.filter(pk=orden.pk).update(actualizado=timezone.now() - timedelta(minutes=1))
+        etag = self.client.get(f'/api/ordenes/{orden.pk}/')['ETag']
+        OrdenItem.objects.create(orden=orden, producto=self.cafe, cantidad=1,
+                                 precio_unitario=self.cafe.precio)
+        r = self.client.get(f'/api/ordenes/{orden.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+
+    def test_llave_invalida_es_404(self):
+        self.assertEqual(self.client.get('/api/ordenes/abc/').status_code, 404)
+        self.assertEqual(self.client.get('/api/productos/abc/').status_code, 404)
+        self.assertEqual(self.client.get('/api/productos/999999/').status_code, 404)
+
+
+class CursorYCamposApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', password='x')
+        cat = Categoria.objects.create(nombre='Bebidas')
+        cls.cafe = Producto.objects.create(nombre='Café', categoria=cat, precio=Decimal('20.00'))
+        base = timezone.now()
+        for i in range(7):
+            o = Orden.objects.create(folio=f'C-{i}', creada_por=cls.user)
+            OrdenItem.objects.create(orden=o, producto=cls.cafe, cantidad=1, precio_unitario=cls.cafe.precio)
+            # Dos órdenes comparten "creado": el cursor debe desempatar
+            Orden.objects.filter(pk=o.pk).update(creado=base - timedelta(minutes=min(i, 5)))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_cursor_recorre_todo_sin_repetir(self):
+        folios, url = [], '/api/ordenes/?page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data['results']), 3)
+            folios += [o['folio'] for o in data['results']]
+            url = data['next']
+        self.assertEqual(folios, list(Orden.objects.order_by('-creado', '-id').values_list('folio', flat=True)))
+        self.assertEqual(len(self.client.get('/api/orden-items/?page_size=5').json()['results']), 5)
+
+    def test_fields_recorta_respuesta_y_select(self):
+        with CaptureQueriesContext(connection) as qs:
+            data = self.client.get('/api/ordenes/?fields=id,folio').json()
+        self.assertEqual(set(data['results'][0]), {'id', 'folio'})
+        sql = [q['sql'] for q in qs.captured_queries if 'LIMIT' in q['sql']]
+        self.assertNotIn('"total"', sql[0])
+        self.assertFalse(any('cafeteria_ordenitem' in q['sql'] for q in qs.captured_queries))
+
+        data = self.client.get('/api/orden-items/?fields=id,producto_nombre').json()
+        self.assertEqual(data['results'][0], {'id': OrdenItem.objects.latest('id').pk, 'producto_nombre': 'Café'})
+        hoy = timezone.localdate()
+        r = self.client.get(f'/api/ordenes/reporte/?desde={hoy}&fields=folio,total').json()
+        self.assertEqual(set(r['results'][0]), {'folio', 'total'})
+        orden = Orden.objects.first()
+        self.assertEqual(set(self.client.get(f'/api/ordenes/{orden.pk}/?fields=items').json()), {'items'})
+        self.assertEqual(self.client.get('/api/ordenes/?fields=id,nope').status_code, 400)
+
+
+class LecturaPlanaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('cajero')
+        cat = Categoria.objects.create(nombre='Bebidas')
+        productos = [Producto.objects.create(nombre=f'P{i}', categoria=cat, precio=Decimal('12.50'))
+                     for i in range(3)]
+        for i in range(4):
+            o = Orden.objects.create(folio=f'L-{i}', creada_por=user)
+            for p in productos[:i]:
+                OrdenItem.objects.create(orden=o, producto=p, cantidad=2, precio_unitario=p.precio)
+
+    def render(self, data):
+        return json.loads(ORJSONRenderer().render(data))
+
+    def test_misma_salida_que_los_serializers(self):
+        for qs, serializer, plano in [
+            (Orden.objects.order_by('pk'), OrdenSerializer, OrdenPlana),
+            (OrdenItem.objects.order_by('pk'), OrdenItemReadSerializer, OrdenItemPlano),
+            (Producto.objects.order_by('pk'), ProductoSerializer, ProductoPlano),
+        ]:
+            with self.subTest(plano.__name__):
+                self.assertEqual(self.render(plano(plano.consulta(qs), many=True).data),
+                                 self.render(serializer(qs, many=True).data))
+        orden = Orden.objects.get(folio='L-3')
+        with self.assertNumQueries(3):  # versión (ETag) + orden + sus líneas, sin importar cuántas
+            r = self.client.get(f'/api/ordenes/{orden.pk}/').json()
+        self.assertEqual(r['total'], '75.00')
+        self.assertEqual(len(r['items']), 3)
+
+    def test_renderer_y_parser(self):
+        ahora = datetime(2025, 10, 6, 13, 5, tzinfo=timezone.get_fixed_timezone(0))
+        self.assertEqual(self.render({'d': Decimal('1.50'), 'f': ahora}),
+                         {'d': '1.50', 'f': '2025-10-06T13:05:00Z'})
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        r = self.client.post('/api/ordenes/', b'{"folio": ', content_type='application/json')
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('JSON parse error', r.json()['detail'])
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command('benchmark_serializacion', '--ordenes', '20', '--productos', '10',
+                     '--repeticiones', '1', '--json', stdout=out)
+        r = json.loads(out.getvalue())
+        self.assertEqual(set(r), {'ordenes', 'orden_items', 'productos'})
+        self.assertEqual(r['orden_items']['filas'], 160)
+
+
+class ResumenDiarioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('super', password='x')
+        cat = Categoria.objects.create(nombre='Comida')
+        cls.torta = Producto.objects.create(nombre='Torta', categoria=cat, precio=Decimal('50.00'))
+
+    def orden(self, folio):
+        orden = Orden.objects.create(folio=folio, creada_por=self.user)
+        OrdenItem.objects.create(orden=orden, producto=self.torta, cantidad=1,
+                                 precio_unitario=self.torta.precio)
+        return Orden.objects.get(pk=orden.pk)
+
+    def mover(self, orden, estado):
+        orden.estado = estado
+        orden.save()
+
+    def test_rollup_sigue_las_transiciones(self):
+        a, b, c = self.orden('R-1'), self.orden('R-2'), self.orden('R-3')
+        self.mover(a, Orden.Estado.PAGADA)
+        self.mover(a, Orden.Estado.EN_COLA)
+        self.mover(b, Orden.Estado.PAGADA)
+        c.delete()
+
+        self.client.force_login(self.user)
+        with self.assertNumQueries(1):  # sólo el rollup: lectura pública, sin sesión ni usuario
+            data = self.client.get('/api/ordenes/estadisticas/').json()
+        self.assertEqual(data['total_ordenes_hoy'], 2)
+        self.assertEqual((data['pendientes_pago'], data['pagadas'], data['en_cola']), (0, 1, 1))
+        self.assertEqual(data['total_ventas_hoy'], 100.0)
+
+        esperado = resumen.agregar_ordenes(Orden.objects.filter(
+            creado__range=resumen.rango_dias(timezone.localdate())))
+        self.assertEqual(resumen.leer(timezone.localdate()), esperado)
+
+    def test_editar_items_despues_de_cobrar(self):
+        orden = self.orden('R-5')
+        self.mover(orden, Orden.Estado.PAGADA)
+        hoy = timezone.localdate()
+        esperado = lambda: resumen.agregar_ordenes(Orden.objects.filter(creado__range=resumen.rango_dias(hoy)))
+
+        self.client.force_login(self.user)
+        items = [{'producto': self.torta.pk, 'cantidad': 5, 'precio_unitario': '50.00'}]
+        r = self.client.put(f'/api/ordenes/{orden.pk}/', {'folio': 'R-5', 'items': items},
+                            content_type='application/json')
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(resumen.leer(hoy)['total_ventas'], Decimal('250.00'))
+        self.assertEqual(resumen.leer(hoy), esperado())
+
+        item = orden.items.get()
+        item.cantidad = 2
+        item.save()
+        self.assertEqual(resumen.leer(hoy), esperado())
+
+        self.assertEqual(self.client.delete(f'/api/ordenes/{orden.pk}/').status_code, 204)
+        self.assertEqual(resumen.leer(hoy), esperado())
+        self.assertEqual(resumen.leer(hoy)['total_ventas'], 0)
+
+    def test_rango_de_fechas(self):
+        hoy = timezone.localdate()
+        ResumenDiario.objects.create(fecha=hoy - timedelta(days=40), total_ordenes=3,
+                                     entregadas=3, total_ventas=Decimal('90.00'))
+        self.mover(self.orden('R-4'), Orden.Estado.PAGADA)
+        self.client.force_login(self.user)
+        data = self.client.get('/api/ordenes/estadisticas/', {
+            'desde': str(hoy - timedelta(days=60)), 'hasta': str(hoy)}).json()
+        self.assertEqual((data['total_ordenes'], data['entregadas'], data['pagadas']), (4, 3, 1))
+        self.assertEqual(data['total_ventas'], 140.0)
+
+
+class ReporteOrdenesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('super', password='x')
+        otro = User.objects.create_user('otro')
+        cat = Categoria.objects.create(nombre='Comida')
+        prods = Producto.objects.bulk_create([
+            Producto(nombre=f'P{i}', categoria=cat, precio=Decimal('5.00')) for i in range(5)])
+        for i in range(12):
+            orden = Orden.objects.create(folio=f'F-{i}', creada_por=otro if i % 3 else cls.user,
+                                         estado=Orden.Estado.ENTREGADA if i % 2 else Orden.Estado.PAGADA)
+            OrdenItem.objects.bulk_create([
+                OrdenItem(orden=orden, producto=p, cantidad=1, precio_unitario=p.precio, subtotal=p.precio)
+                for p in prods])
+        cls.vieja = Orden.objects.create(folio='VIEJA', creada_por=cls.user)
+        Orden.objects.filter(pk=cls.vieja.pk).update(creado=timezone.now() - timedelta(days=3))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_filtra_y_embebe_items_en_queries_fijas(self):
+        with self.assertNumQueries(5):  # sesión, usuario, COUNT, órdenes, items
+            data = self.client.get('/api/ordenes/reporte/', {
+                'estado': 'ENTREGADA', 'creador': self.user.pk, 'page_size': 50}).json()
+        self.assertEqual(data['count'], 2)
+        self.assertTrue(all(len(o['items']) == 5 for o in data['results']))
+
+    def test_rango_y_paginacion(self):
+        hoy = timezone.localdate()
+        data = self.client.get('/api/ordenes/reporte/', {'page_size': 5}).json()
+        self.assertEqual((data['count'], len(data['results'])), (12, 5))
+        self.assertIsNotNone(data['next'])
+        data = self.client.get('/api/ordenes/reporte/', {
+            'desde': str(hoy - timedelta(days=7)), 'hasta': str(hoy)}).json()
+        self.assertEqual(data['count'], 13)
+        r = self.client.get('/api/ordenes/reporte/', {'estado': 'NINGUNO'})
+        self.assertEqual(r.status_code, 400)
+
+
+class ExportarOrdenesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('super', password='x')
+        cat = Categoria.objects.create(nombre='Comida')
+        cafe = Producto.objects.create(nombre='Café', categoria=cat, precio=Decimal('20.00'))
+        for i in range(3):
+            orden = Orden.objects.create(folio=f'E-{i}', creada_por=cls.user)
+            OrdenItem.objects.create(orden=orden, producto=cafe, cantidad=i + 1,
+                                     precio_unitario=cafe.precio)
+        Pago.objects.create(orden=orden, metodo=Pago.Metodo.EFECTIVO, monto=Decimal('60.00'))
+
+    def test_csv_en_streaming(self):
+        self.client.force_login(self.user)
+        r = self.client.get('/reportes/exportar/', {'tipo': 'ordenes'})
+        self.assertTrue(r.streaming)
+        filas = list(csv.reader(b''.join(r.streaming_content).decode().splitlines()))
+        self.assertEqual(filas[0][:2], ['id', 'folio'])
+        self.assertEqual([f[1] for f in filas[1:]], ['E-0', 'E-1', 'E-2'])
+        self.assertEqual(filas[-1][-3:-1], ['EFECTIVO', '60.00'])
+
+    async def test_asgi_en_streaming_async(self):
+        # Bajo ASGI un iterador síncrono se juntaría completo en memoria
+        await self.async_client.aforce_login(self.user)
+        r = await self.async_client.get('/reportes/exportar/', {'tipo': 'ordenes'})
+        self.assertTrue(r.is_async)
+        contenido = b''.join([parte async for parte in r.streaming_content]).decode()
+        self.assertEqual([f[1] for f in csv.reader(contenido.splitlines())][1:], ['E-0', 'E-1', 'E-2'])
+
+    def test_comando_ndjson_de_lineas(self):
+        out = StringIO()
+        call_command('exportar_ordenes', '--tipo', 'lineas', '--formato', 'ndjson', stdout=out)
+        lineas = [json.loads(l) for l in out.getvalue().splitlines()]
+        self.assertEqual([l['cantidad'] for l in lineas], [1, 2, 3])
+        self.assertEqual(lineas[2]['subtotal'], '60.00')
+
+
+class CatalogoCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('super', password='x')
+        cls.cat = Categoria.objects.create(nombre='Bebidas')
+        Producto.objects.bulk_create([
+            Producto(nombre=f'Bebida {i:02d}', categoria=cls.cat, precio=Decimal('10.00'))
+            for i in range(30)])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_pos_y_api_leen_del_cache(self):
+        self.client.get('/pos/')
+        with self.assertNumQueries(2):  # sesión + usuario
+            r = self.client.get('/pos/', {'page': 2})
+        self.assertEqual(len(r.context['productos']), 12)
+
+        self.client.get('/api/productos/')
+        with self.assertNumQueries(4):  # sesión, usuario, versión de productos y categorías
+            r = self.client.get('/api/productos/')
+        self.assertEqual(len(r.json()), 30)
+
+    def test_guardar_producto_invalida(self):
+        self.assertEqual(len(catalogo.productos_disponibles()), 30)
+        p = Producto.objects.first()
+        p.disponible = False
+        p.save()
+        self.assertEqual(len(catalogo.productos_disponibles()), 29)
+        r = self.client.get('/api/productos/', {'disponible': 'false'})
+        self.assertEqual([x['id'] for x in r.json()], [p.pk])
+
+    def test_filtros_normalizados_comparten_llave(self):
+        self.assertEqual(len(self.client.get('/api/productos/', {'categoria': self.cat.pk}).json()), 30)
+        for valor in (f'0{self.cat.pk}', f' {self.cat.pk}'):
+            with self.assertNumQueries(4):  # misma entrada en caché que ?categoria=<pk>
+                self.assertEqual(len(self.client.get('/api/productos/', {'categoria': valor}).json()), 30)
+        r = self.client.get('/api/productos/', {'categoria': 'abc', 'disponible': 'quizá'})
+        self.assertEqual((r.status_code, len(r.json())), (200, 30))
+
+
+class BusquedaProductosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('super', password='x')
+        cat = Categoria.objects.create(nombre='Bebidas')
+        for nombre in ['Café Americano', 'Té de Manzanilla', 'Descafeinado', 'Agua', 'Frappé de Café']:
+            Producto.objects.create(nombre=nombre, categoria=cat, precio=Decimal('25.00'))
+        Producto.objects.create(nombre='Café Agotado', categoria=cat, precio=Decimal('1.00'),
+                                disponible=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_normaliza_nombre(self):
+        self.assertEqual(Producto.objects.get(nombre='Frappé de Café').nombre_busqueda, 'frappe de cafe')
+
+    def test_indice_en_memoria_rankea_prefijos(self):
+        nombres = [p.nombre for p in busqueda.buscar_productos('CAFE')]
+        self.assertEqual(nombres, ['Café Americano', 'Frappé de Café', 'Descafeinado'])
+        self.assertEqual([p.nombre for p in busqueda.buscar_productos('té')], ['Té de Manzanilla'])
+
+    def test_ruta_sql_coincide_con_el_indice(self):
+        en_memoria = [p.pk for p in busqueda.buscar_productos('cafe')]
+        with mock.patch.object(busqueda, 'usa_indice_sql', return_value=True):
+            self.assertEqual([p.pk for p in busqueda.buscar_productos('cafe')], en_memoria)
+
+    def test_autocompletar_api(self):
+        r = self.client.get('/api/productos/buscar/', {'q': 'cafe', 'limite': 2})
+        self.assertEqual([p['nombre'] for p in r.json()], ['Café Americano', 'Frappé de Café'])
+        self.assertEqual(set(r.json()[0]), {'id', 'nombre', 'precio'})
+        r = self.client.get('/api/productos/buscar/', {'q': 'cafe', 'limite': -1})
+        self.assertEqual(len(r.json()), 1)
+
+    def test_pos_y_api_ignoran_acentos(self):
+        self.client.force_login(self.user)
+        r = self.client.get('/pos/', {'q': 'manzanilla'})
+        self.assertEqual([p.nombre for p in r.context['productos']], ['Té de Manzanilla'])
+        r = self.client.get('/api/productos/', {'q': 'frappe'})
+        self.assertEqual([p['nombre'] for p in r.json()], ['Frappé de Café'])
+
+
+class MenuDelDiaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu = MenuDia.objects.create(fecha=timezone.localdate(), publicado=True)
+        for i in range(8):
+            cat = Categoria.objects.create(nombre=f'Cat {i}')
+            p = Producto.objects.create(nombre=f'Platillo {i}', categoria=cat, precio=Decimal('30.00'))
+            MenuItem.objects.create(menu=cls.menu, producto=p, destacado=i == 0)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lectura_sin_n_mas_1_y_en_cache(self):
+        with self.assertNumQueries(2):  # menú + items con producto y categoría
+            r = self.client.get('/api/menu/hoy/')
+        self.assertEqual(len(r.json()['items']), 8)
+        self.assertEqual(r.json()['items'][0]['producto']['categoria_detalle']['nombre'], 'Cat 0')
+        with self.assertNumQueries(0):
+            self.client.get('/api/menu/hoy/')
+            r = self.client.get('/')
+        self.assertContains(r, 'Platillo 7')
+
+        with self.assertNumQueries(5):  # versión (3) + menús + items
+            r = self.client.get('/api/menu/')
+        self.assertEqual(len(r.json()[0]['items']), 8)
+
+    def test_cambio_de_producto_invalida(self):
+        self.client.get('/api/menu/hoy/')
+        p = Producto.objects.get(nombre='Platillo 3')
+        p.precio = Decimal('35.00')
+        p.save()
+        items = self.client.get('/api/menu/hoy/').json()['items']
+        self.assertIn('35.00', [i['producto']['precio'] for i in items])
+        MenuItem.objects.filter(producto=p).delete()
+        self.assertEqual(len(self.client.get('/api/menu/hoy/').json()['items']), 7)
+
+
+class VistasAsyncTests(TestCase):
+    """Las lecturas async bajo la cadena ASGI: un acceso síncrono al ORM fallaría aquí."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('cocina', password='x')
+        cat = Categoria.objects.create(nombre='Bebidas', estacion='bebidas')
+        cafe = Producto.objects.create(nombre='Café', categoria=cat, precio=Decimal('20.00'))
+        menu = MenuDia.objects.create(fecha=timezone.localdate(), publicado=True)
+        MenuItem.objects.create(menu=menu, producto=cafe)
+        orden = Orden.objects.create(folio='A-1', creada_por=cls.user)
+        OrdenItem.objects.create(orden=orden, producto=cafe, cantidad=2, precio_unitario=cafe.precio)
+        transiciones.cambiar_estado([orden.pk], Orden.Estado.PAGADA)
+        transiciones.cambiar_estado([orden.pk], Orden.Estado.EN_COLA)
+
+    def setUp(self):
+        cache.clear()
+        registro.reiniciar()
+
+    async def test_paginas(self):
+        r = await self.async_client.get('/')
+        self.assertContains(r, 'Café')
+        self.assertEqual((await self.async_client.get('/cocina/')).status_code, 302)
+
+        await self.async_client.aforce_login(self.user)
+        r = await self.async_client.get('/cocina/')
+        self.assertContains(r, 'A-1')
+        self.assertEqual(r.context['estaciones'], {'bebidas': 1})
+        self.assertContains(await self.async_client.get('/'), 'cocina')  # usuario en base.html
+
+    async def test_api(self):
+        r = await self.async_client.get('/api/ordenes/estadisticas/')
+        self.assertEqual((r.json()['en_cola'], r.json()['total_ventas_hoy']), (1, 40.0))
+        # Las consultas del ORM async (en otro hilo) llegan a la medición de la petición
+        self.assertIn('desc="1 consultas"', r['Server-Timing'])
+        r = await self.async_client.get('/api/ordenes/estadisticas/', {'desde': 'ayer'})
+        self.assertEqual(r.status_code, 400)
+
+        r = await self.async_client.get('/api/menu/hoy/')
+        self.assertEqual(r.json()['items'][0]['producto']['nombre'], 'Café')
+        self.assertEqual((await self.async_client.post('/api/menu/hoy/')).status_code, 405)
+        await MenuDia.objects.all().aupdate(publicado=False)
+        await sync_to_async(catalogo.invalidar)()
+        self.assertEqual((await self.async_client.get('/api/menu/hoy/')).json(), {'detail': 'Sin menú para hoy'})
+
+
+class VerificarIndicesTests(TestCase):
+    def test_consultas_calientes_usan_indice(self):
+        out = StringIO()
+        call_command('verificar_indices', '--ordenes', '2000', stdout=out)
+        self.assertIn('usan índice', out.getvalue())
+        self.assertFalse(Orden.objects.exists())  # la siembra se revierte
+
+
+class BenchmarkTests(TransactionTestCase):
+    def test_siembra_y_benchmark(self):
+        call_command('sembrar_datos', '--productos', '12', '--categorias', '3', '--ordenes', '50',
+                     '--usuarios', '2', stdout=StringIO())
+        self.assertEqual(Orden.objects.filter(folio__startswith='bench-').count(), 50)
+        self.assertEqual(OrdenItem.objects.count(), 200)
+        self.assertEqual(sum(ResumenDiario.objects.values_list('total_ordenes', flat=True)), 50)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            salida = f'{tmp}/bench.json'
+            # Secuencial (primero cajeros, luego cocineros): SQLite no tolera escrituras concurrentes
+            call_command('benchmark_pos', '--cajeros', '1', '--cocineros', '0', '--ordenes', '3',
+                         '--items', '2', '--salida', salida, stdout=StringIO())
+            with open(salida) as f:
+                cajas = json.load(f)
+            call_command('benchmark_pos', '--cajeros', '0', '--cocineros', '1',
+                         '--salida', salida, stdout=StringIO())
+            with open(salida) as f:
+                cocina = json.load(f)
+
+        self.assertEqual(cajas['ordenes'], 3)
+        self.assertEqual(set(cajas['endpoints']),
+                         {'pos_nueva', 'pos_add_item', 'pos_cobrar', 'pos_enviar_cocina'})
+        self.assertEqual(cajas['endpoints']['pos_add_item']['n'], 6)
+        self.assertEqual(sum(e['errores'] for e in cajas['endpoints'].values()), 0)
+        self.assertIn('p99_ms', cajas['endpoints']['pos_cobrar'])
+        self.assertGreater(cocina['comandas'], 0)
+        self.assertEqual(cocina['endpoints']['comanda_terminar']['errores'], 0)
+        self.assertFalse(Comanda.objects.filter(terminada__isnull=True).exists())
+        # Sin superusuarios: los sembrados son cajeros y los del benchmark no quedan activos
+        self.assertFalse(User.objects.filter(is_superuser=True).exists())
+        self.assertEqual(set(User.objects.get(username='bench_0').groups.values_list('name', flat=True)),
+                         {'Cajero'})
+        self.assertFalse(User.objects.filter(username__startswith='_bench_', is_active=True).exists())
+        self.assertFalse(User.objects.filter(username__startswith='_bench_cocinero').exists())
+
+
+@override_settings(METRICAS_LENTO_MS=60_000)  # el login (hash de la contraseña) no es lo medido
+class BenchmarkConexionesTests(LiveServerTestCase):
+    def test_contra_servidor_corriendo(self):
+        User.objects.create_superuser('bench', password='x')
+        with tempfile.TemporaryDirectory() as tmp:
+            salida = f'{tmp}/conexiones.json'
+            # Sin escuchas SSE: el servidor de pruebas es WSGI y las retendría
+            call_command('benchmark_conexiones', '--url', self.live_server_url, '--usuario', 'bench',
+                         '--password', 'x', '--escuchas', '0', '--concurrencia', '1',
+                         '--duracion', '0.5', '--salida', salida, stdout=StringIO())
+            with open(salida) as f:
+                r = json.load(f)['servidores'][self.live_server_url]
+        self.assertGreater(r['peticiones'], 0)
+        self.assertEqual(set(r['endpoints']), {'/', '/cocina/', '/api/ordenes/estadisticas/', '/api/menu/hoy/'})
+        # /api/menu/hoy/ responde 404 sin menú publicado
+        self.assertEqual(r['errores'], r['endpoints']['/api/menu/hoy/']['errores'])
+
+
+@override_settings(POS_CARRITO_BORRADOR=True, SESSION_ENGINE='django.contrib.sessions.backends.cache')
+class CarritoBorradorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('cajero', password='x')
+        cat = Categoria.objects.create(nombre='Comida')
+        cls.torta = Producto.objects.create(nombre='Torta', categoria=cat, precio=Decimal('45.00'))
+        cls.agua = Producto.objects.create(nombre='Agua', categoria=cat, precio=Decimal('12.50'))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def agregar(self, producto, cantidad=1):
+        return self.client.post('/pos/add-item/', {'producto_id': producto.pk, 'cantidad': cantidad})
+
+    def test_captura_sin_escrituras_y_cobro_en_una_transaccion(self):
+        self.client.get('/pos/nueva/')
+        self.agregar(self.torta, 2)
+        self.agregar(self.agua)
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.agregar(self.agua, 2)
+        # Con la sesión en caché sólo queda leer el usuario (más el savepoint de la
+        # vista atómica): ni django_session ni cafeteria_*
+        self.assertEqual([q['sql'] for q in ctx.captured_queries
+                          if 'auth_user' not in q['sql'] and 'SAVEPOINT' not in q['sql']], [])
+        self.assertContains(r, '$127.50')
+        self.client.get(f'/pos/del-item/{self.torta.pk}/')
+        self.agregar(self.torta)
+        self.assertFalse(Orden.objects.exists())
+
+        r = self.client.post('/pos/cobrar/')
+        self.assertEqual(r.status_code, 200)
+        orden = Orden.objects.get()
+        self.assertEqual((orden.estado, orden.total), (Orden.Estado.PAGADA, Decimal('82.50')))
+        self.assertEqual(dict(orden.items.values_list('producto_id', 'cantidad')),
+                         {self.agua.pk: 3, self.torta.pk: 1})
+        self.assertEqual(self.client.session['orden_id'], orden.pk)
+        self.assertEqual(resumen.leer(timezone.localdate())['pagadas'], 1)
+
+        self.client.post('/pos/enviar-cocina/')
+        orden.refresh_from_db()
+        self.assertEqual(orden.estado, Orden.Estado.EN_COLA)
+
+    def test_carrito_vacio_no_se_cobra(self):
+        self.client.get('/pos/nueva/')
+        self.assertEqual(self.client.post('/pos/cobrar/').status_code, 400)
+        self.assertEqual(self.agregar(Producto(pk=999)).status_code, 404)
+
+    def test_no_cobra_productos_que_dejaron_de_estar_disponibles(self):
+        self.client.get('/pos/nueva/')
+        self.agregar(self.torta)
+        self.agregar(self.agua)
+        Producto.objects.filter(pk=self.agua.pk).update(disponible=False)
+        r = self.client.post('/pos/cobrar/')
+        self.assertContains(r, 'Agua', status_code=400)
+        self.assertFalse(Orden.objects.exists())
+
+        self.client.get(f'/pos/del-item/{self.agua.pk}/')
+        self.assertEqual(self.client.post('/pos/cobrar/').status_code, 200)
+        self.assertEqual(Orden.objects.get().total, Decimal('45.00'))
+
+
+class AgregarLineaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('cajero', password='x')
+        cat = Categoria.objects.create(nombre='Comida')
+        cls.torta = Producto.objects.create(nombre='Torta', categoria=cat, precio=Decimal('45.00'))
+
+    def test_upsert_suma_y_toma_precio_vigente(self):
+        orden = Orden.objects.create(folio='L-1', creada_por=self.user)
+        self.assertTrue(agregar_linea(orden.pk, self.torta, 2))
+        self.torta.precio = Decimal('50.00')
+        self.assertTrue(agregar_linea(orden.pk, self.torta, 1))
+        linea = orden.items.get()
+        self.assertEqual((linea.cantidad, linea.subtotal), (3, Decimal('150.00')))
+        orden.refresh_from_db()
+        self.assertEqual(orden.total, Decimal('150.00'))
+        self.assertFalse(agregar_linea(orden.pk + 1, self.torta, 1))
+
+    def test_vista_responde_con_el_carrito_fresco(self):
+        self.client.force_login(self.user)
+        self.client.get('/pos/nueva/')
+        datos = {'producto_id': self.torta.pk, 'cantidad': 2}
+        self.client.post('/pos/add-item/', datos)
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.post('/pos/add-item/', datos)
+        self.assertContains(r, '$180.00')
+        # candado + upsert + total + lectura del carrito; nada de refresh_from_db
+        cafeteria = [q for q in ctx.captured_queries if 'cafeteria_' in q['sql']]
+        self.assertLessEqual(len(cafeteria), 6)
+        self.assertEqual(OrdenItem.objects.get().cantidad, 4)
+
+
+class AgregarLineaConcurrenciaTests(TransactionTestCase):
+    HILOS = 8
+    POR_HILO = 10
+
+    def test_clics_simultaneos_sin_duplicados_ni_perdidas(self):
+        user = User.objects.create_user('cajero')
+        cat = Categoria.objects.create(nombre='Comida')
+        productos = [Producto.objects.create(nombre=f'P{i}', categoria=cat, precio=Decimal('10.00'))
+                     for i in range(2)]
+        orden = Orden.objects.create(folio='L-2', creada_por=user)
+        errores = []
+        barrera = threading.Barrier(self.HILOS)
+
+        def caja(i):
+            try:
+                barrera.wait()
+                for _ in range(self.POR_HILO):
+                    agregar_linea(orden.pk, productos[i % 2], 1)
+            except Exception as exc:  # pragma: no cover - se reporta abajo
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=caja, args=(i,)) for i in range(self.HILOS)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual(errores, [])
+        mitad = self.HILOS * self.POR_HILO // 2
+        self.assertEqual(dict(orden.items.values_list('producto_id', 'cantidad')),
+                         {productos[0].pk: mitad, productos[1].pk: mitad})
+        orden.refresh_from_db()
+        self.assertEqual(orden.total, Decimal('10.00') * mitad * 2)
+
+
+@override_settings(COCINA_HUB='cafeteria.tests.HubPrueba')
+class TransicionesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Cocinero: sólo change/view de órdenes, sin add
+        cls.user = User.objects.create_user('cocinero', password='x')
+        cls.user.user_permissions.set(Permission.objects.filter(
+            codename__in=['change_orden', 'view_orden']))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        E = Orden.Estado
+        self.prep = [Orden.objects.create(folio=f'T-{i}', creada_por=self.user, estado=E.EN_PREPARACION,
+                                          total=Decimal('10.00')) for i in range(3)]
+        self.entregada = Orden.objects.create(folio='T-9', creada_por=self.user, estado=E.ENTREGADA)
+
+    def test_lote_api_reporta_por_orden(self):
+        ids = [o.pk for o in self.prep] + [self.entregada.pk, 999999]
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post('/api/ordenes/transicion/', {'ordenes': ids, 'estado': 'LISTA'},
+                                 content_type='application/json')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()['aplicadas'], 3)
+        ok = {x['id']: x['ok'] for x in r.json()['resultados']}
+        self.assertEqual(ok, {**{o.pk: True for o in self.prep}, self.entregada.pk: False, 999999: False})
+        self.assertEqual(Orden.objects.filter(estado='LISTA').count(), 3)
+        r = resumen.leer(timezone.localdate())
+        self.assertEqual((r['en_preparacion'], r['listas'], r['entregadas']), (0, 3, 1))
+        self.assertEqual(len(obtener_hub().publicados), 3)
+
+    def test_no_pisa_un_cambio_concurrente(self):
+        orden = self.prep[0]
+        real = transiciones._mover_generico
+
+        def otra_caja_primero(ids, anterior, nuevo, ahora):
+            Orden.objects.filter(pk=orden.pk).update(estado=Orden.Estado.LISTA)
+            return real(ids, anterior, nuevo, ahora)
+
+        with mock.patch.object(transiciones, '_mover_generico', otra_caja_primero):
+            res, = transiciones.cambiar_estado([orden.pk], Orden.Estado.LISTA)
+        self.assertFalse(res['ok'])
+        self.assertIn('reintenta', res['error'])
+
+    def test_cocina_rechaza_saltos_y_lote_htmx(self):
+        r = self.client.post(f'/cocina/cambiar/{self.prep[0].pk}/PENDIENTE_PAGO/')
+        self.assertEqual(r.status_code, 409)
+        r = self.client.post('/cocina/cambiar-lote/', {
+            'estado': 'LISTA', 'ordenes': [self.prep[1].pk, self.entregada.pk]})
+        self.assertContains(r, '1 de 2 órdenes actualizadas')
+        self.assertContains(r, 'no permitida')
+
+    def test_edicion_y_pos_no_saltan_estados(self):
+        orden = self.prep[0]
+        r = self.client.patch(f'/api/ordenes/{orden.pk}/', {'estado': 'ENTREGADA'},
+                              content_type='application/json')
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('no permitida', r.json()['estado'][0])
+        r = self.client.patch(f'/api/ordenes/{orden.pk}/', {'estado': 'LISTA'},
+                              content_type='application/json')
+        self.assertEqual(r.status_code, 200)
+
+        # Ruta heredada del POS: cobrar una orden que ya está en cocina
+        producto = Producto.objects.create(nombre='Café', categoria=Categoria.objects.create(nombre='C'),
+                                           precio=Decimal('10.00'))
+        OrdenItem.objects.create(orden=self.prep[1], producto=producto, cantidad=1, precio_unitario=producto.precio)
+        sesion = self.client.session
+        sesion['orden_id'] = self.prep[1].pk
+        sesion.save()
+        self.assertEqual(self.client.post('/pos/cobrar/').status_code, 400)
+        self.prep[1].refresh_from_db()
+        self.assertEqual(self.prep[1].estado, Orden.Estado.EN_PREPARACION)
+
+
+class ColaEstacionesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana, cls.beto = [User.objects.create_user(n, password='x') for n in ('ana', 'beto')]
+        for u in (cls.ana, cls.beto):
+            u.user_permissions.set(Permission.objects.filter(codename__in=['change_orden', 'view_orden']))
+        bebidas = Categoria.objects.create(nombre='Bebidas', estacion='bebidas')
+        comida = Categoria.objects.create(nombre='Comida', estacion='caliente')
+        cls.cafe = Producto.objects.create(nombre='Café', categoria=bebidas, precio=Decimal('20.00'))
+        cls.torta = Producto.objects.create(nombre='Torta', categoria=comida, precio=Decimal('45.00'))
+
+    def enviar(self, folio, *productos):
+        orden = Orden.objects.create(folio=folio, creada_por=self.ana, estado=Orden.Estado.PAGADA)
+        for p in productos:
+            OrdenItem.objects.create(orden=orden, producto=p, cantidad=1, precio_unitario=p.precio)
+        transiciones.cambiar_estado([orden.pk], Orden.Estado.EN_COLA)
+        return orden
+
+    def test_cada_estacion_toma_su_parte(self):
+        orden = self.enviar('C-1', self.cafe, self.torta)
+        self.assertEqual(set(orden.comandas.values_list('estacion', flat=True)), {'bebidas', 'caliente'})
+        self.assertEqual(cola.estaciones(), {'bebidas': 1, 'caliente': 1})
+
+        c1 = cola.tomar_siguiente('bebidas', self.ana)
+        self.assertIsNone(cola.tomar_siguiente('bebidas', self.beto))
+        c2 = cola.tomar_siguiente('caliente', self.beto)
+        orden.refresh_from_db()
+        self.assertEqual(orden.estado, Orden.Estado.EN_PREPARACION)
+        lineas, = cola.en_curso('caliente', self.beto)
+        self.assertEqual([i.producto for i in lineas.lineas], [self.torta])
+
+        self.assertTrue(cola.terminar(c1))
+        self.assertFalse(cola.terminar(c1))
+        orden.refresh_from_db()
+        self.assertEqual(orden.estado, Orden.Estado.EN_PREPARACION)
+        cola.terminar(c2)
+        orden.refresh_from_db()
+        self.assertEqual(orden.estado, Orden.Estado.LISTA)
+
+    def test_api_y_pantalla_de_estacion(self):
+        self.enviar('C-2', self.cafe)
+        self.enviar('C-3', self.cafe)
+        self.client.force_login(self.beto)
+        r = self.client.post('/api/comandas/tomar/', {'estacion': 'bebidas'}, content_type='application/json')
+        self.assertEqual((r.status_code, r.json()['folio']), (201, 'C-2'))
+        self.assertEqual([c['folio'] for c in self.client.get('/api/comandas/').json()], ['C-2'])
+        r = self.client.post('/cocina/estacion/bebidas/tomar/', HTTP_HX_REQUEST='true')
+        self.assertContains(r, 'Folio C-3')
+        self.assertEqual(self.client.post('/cocina/estacion/bebidas/tomar/', HTTP_HX_REQUEST='true').status_code, 204)
+        self.assertContains(self.client.get('/cocina/estacion/bebidas/'), 'Folio C-3')
+        c = Comanda.objects.get(orden__folio='C-2')
+        self.assertEqual(self.client.post(f'/api/comandas/{c.pk}/terminar/').status_code, 204)
+
+
+class ColaConcurrenciaTests(TransactionTestCase):
+    HILOS = 6
+    COMANDAS = 30
+
+    def test_cada_comanda_se_toma_una_vez(self):
+        user = User.objects.create_user('cajero')
+        cocineros = [User.objects.create_user(f'cocinero{i}') for i in range(self.HILOS)]
+        cat = Categoria.objects.create(nombre='Bebidas', estacion='bebidas')
+        cafe = Producto.objects.create(nombre='Café', categoria=cat, precio=Decimal('20.00'))
+        for i in range(self.COMANDAS):
+            # Ya en preparación (otra estación empezó): sólo se compite por la comanda
+            orden = Orden.objects.create(folio=f'Q-{i}', creada_por=user, estado=Orden.Estado.EN_PREPARACION)
+            Comanda.objects.create(orden=orden, estacion='bebidas')
+        tomadas, errores = [], []
+        candado = threading.Lock()
+        barrera = threading.Barrier(self.HILOS)
+
+        def cocinero(u):
+            try:
+                barrera.wait()
+                while (c := cola.tomar_siguiente('bebidas', u)) is not None:
+                    with candado:
+                        tomadas.append(c.pk)
+            except Exception as exc:  # pragma: no cover - se reporta abajo
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=cocinero, args=(u,)) for u in cocineros]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(len(tomadas), self.COMANDAS)
+        self.assertEqual(len(set(tomadas)), self.COMANDAS)
+        self.assertFalse(Comanda.objects.filter(cocinero__isnull=True).exists())
+
+
+class BitacoraTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', password='x')
+        cat = Categoria.objects.create(nombre='Bebidas', estacion='bebidas')
+        cls.cafe = Producto.objects.create(nombre='Café', categoria=cat, precio=Decimal('20.00'))
+
+    def test_cada_transicion_queda_registrada(self):
+        E = Orden.Estado
+        orden = Orden.objects.create(folio='B-1', creada_por=self.user)
+        OrdenItem.objects.create(orden=orden, producto=self.cafe, cantidad=1, precio_unitario=self.cafe.precio)
+        orden.estado = E.PAGADA
+        orden.save()
+        transiciones.cambiar_estado([orden.pk], E.EN_COLA)
+        comanda = cola.tomar_siguiente('bebidas', self.user)
+        cola.terminar(comanda)
+        self.assertEqual(list(orden.eventos.order_by('pk').values_list('estacion', 'anterior', 'nuevo')), [
+            ('', '', E.PENDIENTE_PAGO), ('', E.PENDIENTE_PAGO, E.PAGADA), ('', E.PAGADA, E.EN_COLA),
+            ('bebidas', '', E.EN_COLA), ('bebidas', E.EN_COLA, E.EN_PREPARACION),
+            ('', E.EN_COLA, E.EN_PREPARACION), ('bebidas', E.EN_PREPARACION, E.LISTA),
+            ('', E.EN_PREPARACION, E.LISTA),
+        ])
+
+    def test_percentiles_por_hora_y_estacion(self):
+        E = Orden.Estado
+        base = timezone.make_aware(datetime(2025, 10, 6, 13, 5))
+        eventos = []
+        for i in range(1, 101):
+            o = Orden.objects.create(folio=f'B-{i}', creada_por=self.user)
+            cola_en, prep_en = base, base + timedelta(seconds=i)
+            for est in ('', 'bebidas'):
+                eventos += [EventoOrden(orden=o, estacion=est, nuevo=E.EN_COLA, en=cola_en),
+                            EventoOrden(orden=o, estacion=est, nuevo=E.EN_PREPARACION, en=prep_en),
+                            EventoOrden(orden=o, estacion=est, nuevo=E.LISTA, en=prep_en + timedelta(minutes=2))]
+        EventoOrden.objects.bulk_create(eventos)
+
+        r = bitacora.latencias(date(2025, 10, 6))
+        self.assertEqual(r['general']['espera'], {'n': 100, 'p50': 50, 'p95': 95, 'p99': 99})
+        self.assertEqual(r['general']['preparacion']['p99'], 120)
+        hora, = r['por_hora']
+        self.assertTrue(hora['hora'].startswith('2025-10-06T13:00'))
+        self.assertEqual([e['estacion'] for e in r['por_estacion']], ['bebidas'])
+
+        self.client.force_login(self.user)
+        api = self.client.get('/api/ordenes/latencias/?desde=2025-10-06').json()
+        self.assertEqual(api['por_estacion'][0]['espera']['p95'], 95)
+        out = StringIO()
+        call_command('latencias_cocina', '--desde', '2025-10-06', stdout=out)
+        self.assertIn('bebidas', out.getvalue())
+
+
+class ArchivoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', password='x')
+        cat = Categoria.objects.create(nombre='Bebidas', estacion='bebidas')
+        cls.cafe = Producto.objects.create(nombre='Café', categoria=cat, precio=Decimal('20.00'))
+
+    def orden(self, folio, estado, dias):
+        o = Orden.objects.create(folio=folio, creada_por=self.user, estado=estado)
+        OrdenItem.objects.create(orden=o, producto=self.cafe, cantidad=2, precio_unitario=self.cafe.precio)
+        Orden.objects.filter(pk=o.pk).update(creado=timezone.now() - timedelta(days=dias))
+        return o
+
+    def test_mueve_entregadas_viejas(self):
+        E = Orden.Estado
+        viejas = [self.orden(f'V-{i}', E.ENTREGADA, 40) for i in range(3)]
+        Pago.objects.create(orden=viejas[0], metodo=Pago.Metodo.EFECTIVO, monto=Decimal('40.00'))
+        Comanda.objects.create(orden=viejas[0], estacion='bebidas', terminada=timezone.now())
+        activa = self.orden('A-1', E.EN_COLA, 40)
+        reciente = self.orden('R-1', E.ENTREGADA, 2)
+        dia = timezone.localdate() - timedelta(days=40)
+        antes = resumen.reconstruir(dia)
+
+        out = StringIO()
+        call_command('archivar_ordenes', '--lote', '2', stdout=out)
+        self.assertIn('3 órdenes archivadas', out.getvalue())
+
+        self.assertEqual(set(Orden.objects.values_list('folio', flat=True)), {activa.folio, reciente.folio})
+        self.assertEqual(OrdenItem.objects.count(), 2)
+        self.assertFalse(Pago.objects.exists() or Comanda.objects.exists())
+        self.assertEqual(OrdenArchivada.objects.count(), 3)
+        self.assertEqual(OrdenItemArchivado.objects.count(), 3)
+        # Rollup intacto y reconstruible; la bitácora sigue con el mismo id
+        self.assertEqual(resumen.leer(dia), antes)
+        self.assertEqual(resumen.reconstruir(dia), antes)
+        self.assertTrue(EventoOrden.objects.filter(orden_id=viejas[0].pk).exists())
+
+        out = StringIO()
+        call_command('archivar_ordenes', stdout=out)
+        self.assertIn('0 órdenes archivadas', out.getvalue())
+
+    def test_api_solo_lectura(self):
+        o = self.orden('V-1', Orden.Estado.ENTREGADA, 40)
+        Pago.objects.create(orden=o, metodo=Pago.Metodo.TARJETA, monto=Decimal('40.00'))
+        call_command('archivar_ordenes', stdout=StringIO())
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(f'/api/ordenes/{o.pk}/').status_code, 404)
+        r = self.client.get(f'/api/ordenes-archivadas/{o.pk}/').json()
+        self.assertEqual((r['folio'], r['total'], r['pago']['metodo']), ('V-1', '40.00', 'TARJETA'))
+        self.assertEqual(r['items'][0]['producto_nombre'], 'Café')
+        listado = self.client.get('/api/ordenes-archivadas/?folio=V-1').json()
+        self.assertEqual(listado['count'], 1)
+        dia = timezone.localdate() - timedelta(days=40)
+        self.assertEqual(self.client.get(f'/api/ordenes-archivadas/?desde={dia}').json()['count'], 1)
+        self.assertEqual(self.client.get('/api/ordenes-archivadas/?desde=ayer').status_code, 400)
+        self.assertEqual(self.client.delete(f'/api/ordenes-archivadas/{o.pk}/').status_code, 405)
+
+    def test_exportar_y_reporte_tras_archivar(self):
+        E = Orden.Estado
+        self.orden('V-1', E.ENTREGADA, 40)
+        self.orden('A-1', E.EN_COLA, 41)
+        self.orden('R-1', E.ENTREGADA, 2)
+        call_command('archivar_ordenes', stdout=StringIO())
+        self.client.force_login(self.user)
+        rango = {'desde': str(timezone.localdate() - timedelta(days=45)), 'hasta': str(timezone.localdate())}
+
+        r = self.client.get('/reportes/exportar/', {'tipo': 'ordenes', **rango})
+        filas = list(csv.reader(b''.join(r.streaming_content).decode().splitlines()))[1:]
+        self.assertEqual([f[1] for f in filas], ['A-1', 'V-1', 'R-1'])  # intercaladas por fecha
+        r = self.client.get('/reportes/exportar/', {'tipo': 'lineas', 'formato': 'ndjson', **rango})
+        lineas = [json.loads(l) for l in b''.join(r.streaming_content).decode().splitlines()]
+        self.assertEqual([l['orden__folio'] for l in lineas], ['A-1', 'V-1', 'R-1'])
+
+        out = StringIO()
+        call_command('exportar_ordenes', '--desde', rango['desde'], '--hasta', rango['hasta'], stdout=out)
+        self.assertEqual([f[1] for f in csv.reader(out.getvalue().splitlines())][1:], ['A-1', 'V-1', 'R-1'])
+
+        r = self.client.get('/api/ordenes/reporte/', rango)
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('/api/ordenes-archivadas/', r.json()['detail'])
+        self.assertEqual(self.client.get('/api/ordenes/reporte/', {'desde': rango['hasta']}).json()['count'], 0)
+
+
+class PermisosCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('setup_roles', stdout=StringIO())
+        cls.cajeros = Group.objects.get(name='Cajero')
+        cls.user = User.objects.create_user('cajero', password='x')
+        cls.user.groups.add(cls.cajeros)
+
+    def setUp(self):
+        cache.clear()
+
+    def fresco(self):
+        # Cada petición trae su propia instancia del usuario
+        return User.objects.get(pk=self.user.pk)
+
+    def test_segunda_resolucion_sin_consultas(self):
+        u = self.fresco()
+        with self.assertNumQueries(2):  # permisos directos + de grupos
+            self.assertTrue(u.has_perm('cafeteria.add_orden'))
+        u = self.fresco()
+        with self.assertNumQueries(0):
+            self.assertTrue(u.has_perms(['cafeteria.add_orden', 'cafeteria.change_orden']))
+            self.assertFalse(u.has_perm('cafeteria.delete_producto'))
+
+        self.client.force_login(self.user)
+        self.client.get('/pos/')
+        with self.assertNumQueries(2):  # sesión + usuario; catálogo y permisos en caché
+            self.assertEqual(self.client.get('/pos/').status_code, 200)
+
+    def test_vista_async_sin_consultas_de_permisos(self):
+        cocinero = User.objects.create_user('cocinero')
+        cocinero.groups.add(Group.objects.get(name='Cocinero'))
+        async_to_sync(self.async_client.aforce_login)(cocinero)
+        get = async_to_sync(self.async_client.get)
+        get('/cocina/')
+        # sesión + usuario + órdenes (sin órdenes no hay prefetch) + estaciones (2); sin auth_permission
+        with self.assertNumQueries(5):
+            self.assertEqual(get('/cocina/').status_code, 200)
+
+    def test_cambios_de_rol_invalidan(self):
+        self.assertTrue(self.fresco().has_perm('cafeteria.add_orden'))
+        self.user.groups.remove(self.cajeros)
+        self.assertFalse(self.fresco().has_perm('cafeteria.add_orden'))
+
+        self.user.groups.add(self.cajeros)
+        self.assertTrue(self.fresco().has_perm('cafeteria.add_orden'))
+        self.cajeros.permissions.remove(Permission.objects.get(codename='add_orden'))
+        self.assertFalse(self.fresco().has_perm('cafeteria.add_orden'))
+
+        # setup_roles restaura los permisos del rol y renueva la caché
+        call_command('setup_roles', stdout=StringIO())
+        self.assertTrue(self.fresco().has_perm('cafeteria.add_orden'))
+        self.cajeros.delete()
+        self.assertFalse(self.fresco().has_perm('cafeteria.add_orden'))
+
+
+class MetricasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('cajero', password='x')
+        cat = Categoria.objects.create(nombre='Comida')
+        cls.torta = Producto.objects.create(nombre='Torta', categoria=cat, precio=Decimal('45.00'))
+
+    def setUp(self):
+        registro.reiniciar()
+        self.client.force_login(self.user)
+
+    def test_server_timing_e_histogramas(self):
+        self.client.get('/pos/nueva/')
+        r = self.client.post('/pos/add-item/', {'producto_id': self.torta.pk, 'cantidad': 1})
+        self.assertRegex(r['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ consultas", tpl;dur=[\d.]+, total;dur=')
+        texto = self.client.get('/metrics').content.decode()
+        self.assertIn('# TYPE cafeteria_request_seconds histogram', texto)
+        self.assertIn('cafeteria_queries_count{vista="pos_add_item"} 1', texto)
+        self.assertIn('cafeteria_template_seconds_bucket{vista="pos_add_item",le="+Inf"} 1', texto)
+
+    @override_settings(METRICAS_TOKEN='s3cr3t')
+    def test_token_en_metrics(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cr3t').status_code, 200)
+
+    def test_sin_token_solo_staff(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        self.client.force_login(User.objects.create_user('cocinero'))
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICAS_LENTO_MS=0)
+    def test_peticion_lenta_registra_su_sql(self):
+        with self.assertLogs('cafeteria.lento', 'WARNING') as logs:
+            self.client.get('/pos/')
+        self.assertIn('Petición lenta GET /pos/ (pos)', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class PresupuestoConsultasTests(TestCase):
+    """Tope de consultas por vista con datos de tamaño realista.
+
+    Con cientos de productos y órdenes de muchas líneas, cualquier N+1 (un
+    serializer anidado sin prefetch, un recálculo por item) rebasa el tope.
+    """
+    PRODUCTOS = 300
+    ORDENES = 60
+    LINEAS = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', password='x')
+        cats = Categoria.objects.bulk_create([
+            Categoria(nombre=f'Cat {i}', estacion=('bebidas', 'caliente')[i % 2]) for i in range(10)])
+        cls.productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', nombre_busqueda=f'producto {i}', categoria=cats[i % 10],
+                     precio=Decimal('10.00') + i) for i in range(cls.PRODUCTOS)])
+        cls.menu = MenuDia.objects.create(fecha=timezone.localdate(), publicado=True)
+        MenuItem.objects.bulk_create([MenuItem(menu=cls.menu, producto=p) for p in cls.productos[:40]])
+
+        estados = [Orden.Estado.EN_COLA, Orden.Estado.EN_PREPARACION, Orden.Estado.LISTA, Orden.Estado.ENTREGADA]
+        ordenes = Orden.objects.bulk_create([
+            Orden(folio=f'P-{i}', creada_por=cls.user, estado=estados[i % 4], total=Decimal('80.00'))
+            for i in range(cls.ORDENES)])
+        OrdenItem.objects.bulk_create([
+            OrdenItem(orden=o, producto=p, cantidad=1, precio_unitario=Decimal('10.00'), subtotal=Decimal('10.00'))
+            for i, o in enumerate(ordenes)
+            for p in cls.productos[i:i + cls.LINEAS]])
+        resumen.reconstruir(timezone.localdate())
+        cls.orden = ordenes[0]
+        cls.cocina = [o.pk for o in ordenes if o.estado == Orden.Estado.EN_PREPARACION]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertPresupuesto(self, maximo, peticion):
+        with CaptureQueriesContext(connection) as ctx:
+            r = peticion()
+        self.assertLess(r.status_code, 400, getattr(r, 'content', b'')[:300])
+        self.assertLessEqual(len(ctx), maximo, '\n'.join(q['sql'] for q in ctx.captured_queries))
+        return r
+
+    def json(self, metodo, url, datos):
+        return getattr(self.client, metodo)(url, datos, content_type='application/json')
+
+    def lineas(self, n):
+        return [{'producto': p.pk, 'cantidad': 2, 'precio_unitario': str(p.precio)}
+                for p in self.productos[:n]]
+
+    # ---- vistas HTML ----
+    def test_home(self):
+        self.assertPresupuesto(4, lambda: self.client.get('/'))
+
+    def test_pos(self):
+        self.client.get('/pos/nueva/')
+        for i in range(self.LINEAS):
+            self.client.post('/pos/add-item/', {'producto_id': self.productos[i].pk, 'cantidad': 1})
+        self.assertPresupuesto(7, lambda: self.client.get('/pos/'))
+        self.assertPresupuesto(5, lambda: self.client.get('/pos/?q=producto 1'))
+        self.assertPresupuesto(15, lambda: self.client.post(
+            '/pos/add-item/', {'producto_id': self.productos[-1].pk, 'cantidad': 1}))
+        # El cobro pasa por cambiar_estado: su lectura optimista y su savepoint
+        self.assertPresupuesto(14, lambda: self.client.post('/pos/cobrar/'))
+
+    def test_kitchen(self):
+        self.assertPresupuesto(7, lambda: self.client.get('/cocina/'))
+
+    # ---- API: productos ----
+    def test_api_productos(self):
+        p = self.productos[0]
+        self.assertPresupuesto(6, lambda: self.client.get('/api/productos/'))
+        self.assertPresupuesto(5, lambda: self.client.get('/api/productos/?q=producto'))
+        self.assertPresupuesto(5, lambda: self.client.get(f'/api/productos/{p.pk}/'))
+        self.assertPresupuesto(2, lambda: self.client.get('/api/productos/buscar/?q=prod'))
+        self.assertPresupuesto(4, lambda: self.json('post', '/api/productos/', {
+            'nombre': 'Nuevo', 'precio': '9.50', 'categoria': p.categoria_id}))
+        self.assertPresupuesto(4, lambda: self.json('patch', f'/api/productos/{p.pk}/', {'precio': '11.00'}))
+
+    # ---- API: menú ----
+    def test_api_menu(self):
+        self.assertPresupuesto(7, lambda: self.client.get('/api/menu/'))
+        self.assertPresupuesto(7, lambda: self.client.get(f'/api/menu/{self.menu.pk}/'))
+        self.assertPresupuesto(4, lambda: self.client.get('/api/menu/hoy/'))
+        self.assertPresupuesto(8, lambda: self.json('post', f'/api/menu/{self.menu.pk}/agregar_item/', {
+            'producto_id': self.productos[-1].pk}))
+
+    # ---- API: órdenes ----
+    def test_api_ordenes_lectura(self):
+        o = self.orden
+        self.assertPresupuesto(5, lambda: self.client.get('/api/ordenes/'))
+        self.assertPresupuesto(5, lambda: self.client.get(f'/api/ordenes/{o.pk}/'))
+        self.assertPresupuesto(4, lambda: self.client.get(f'/api/ordenes/{o.pk}/items/'))
+        self.assertPresupuesto(5, lambda: self.client.get('/api/ordenes/reporte/?estado=ENTREGADA'))
+        self.assertPresupuesto(3, lambda: self.client.get('/api/ordenes/estadisticas/'))
+        self.assertPresupuesto(3, lambda: self.client.get('/api/ordenes/latencias/'))
+
+    def test_api_ordenes_escritura(self):
+        r = self.assertPresupuesto(10, lambda: self.json('post', '/api/ordenes/', {
+            'folio': 'P-NUEVA', 'items': self.lineas(20)}))
+        pk = r.json()['id']
+        self.assertPresupuesto(9, lambda: self.json('patch', f'/api/ordenes/{pk}/', {'items': self.lineas(25)}))
+        self.assertPresupuesto(13, lambda: self.json('put', f'/api/ordenes/{pk}/', {
+            'folio': 'P-NUEVA', 'estado': 'PAGADA', 'items': self.lineas(10)}))
+        # Con RETURNING (PostgreSQL) un UPDATE por lote; sin él, uno por orden
+        transicion = 8 if connection.vendor == 'postgresql' else 7 + len(self.cocina)
+        self.assertPresupuesto(transicion, lambda: self.json('post', '/api/ordenes/transicion/', {
+            'ordenes': self.cocina, 'estado': 'LISTA'}))
+        # + la lectura de estado y total vigentes que la baja descuenta del rollup
+        self.assertPresupuesto(11, lambda: self.client.delete(f'/api/ordenes/{pk}/'))
@@ -0,0 +1,100 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import bitacora, resumen
+from .eventos import en_lote, publicar_orden
+from .models import Comanda, Orden, OrdenItem
+
+Estado = Orden.Estado
+
+# Máquina de estados: estado actual -> estados a los que puede pasar
+TRANSICIONES = {
+    Estado.PENDIENTE_PAGO: {Estado.PAGADA},
+    Estado.PAGADA: {Estado.EN_COLA},
+    Estado.EN_COLA: {Estado.EN_PREPARACION},
+    Estado.EN_PREPARACION: {Estado.LISTA},
+    Estado.LISTA: {Estado.ENTREGADA},
+    Estado.ENTREGADA: set(),
+}
+
+# Evento publicado a cocina según el estado destino
+EVENTO = {Estado.EN_COLA: 'orden_creada'}
+
+
+def permitida(anterior, nuevo):
+    return nuevo in TRANSICIONES.get(anterior, ())
+
+def encolar(orden_ids):
+    """Al entrar a cocina: una comanda por estación de la orden (idempotente)."""
+    pares = list(OrdenItem.objects.filter(orden_id__in=list(orden_ids))
+                 .values_list('orden_id', 'producto__categoria__estacion').distinct())
+    Comanda.objects.bulk_create([Comanda(orden_id=o, estacion=e) for o, e in pares],
+                                ignore_conflicts=True)
+    bitacora.registrar_estaciones(pares, None, Estado.EN_COLA)
+
+
+_UPDATE_PG = (
+    "UPDATE {tabla} SET estado = %s, actualizado = %s "
+    "WHERE id = ANY(%s) AND estado = %s RETURNING id"
+)
+
+def _mover_pg(ids, anterior, nuevo, ahora):
+    tabla = connection.ops.quote_name(Orden._meta.db_table)
+    with connection.cursor() as cur:
+        cur.execute(_UPDATE_PG.format(tabla=tabla), [nuevo, ahora, list(ids), anterior])
+        return {fila[0] for fila in cur.fetchall()}
+
+def _mover_generico(ids, anterior, nuevo, ahora):
+    # Sin RETURNING: un UPDATE condicional por orden; el conteo dice si ganó
+    return {pk for pk in ids
+            if Orden.objects.filter(pk=pk, estado=anterior).update(estado=nuevo, actualizado=ahora)}
+
+def _mover(ids, anterior, nuevo, ahora):
+    if connection.vendor == 'postgresql':
+        return _mover_pg(ids, anterior, nuevo, ahora)
+    return _mover_generico(ids, anterior, nuevo, ahora)
+
+
+@transaction.atomic
+def cambiar_estado(ids, nuevo):
+    """Pasa las órdenes ``ids`` a ``nuevo`` y devuelve el resultado de cada una.
+
+    Optimista: cada orden se mueve con ``UPDATE ... WHERE estado = <leído>``;
+    si otra caja la cambió entre la lectura y el UPDATE se reporta como
+    conflicto en vez de pisar el cambio. El UPDATE no dispara señales, así que
+    el rollup diario, la bitácora, las comandas y los eventos de cocina se
+    registran aquí.
+    """
+    if nuevo not in Estado.values:
+        raise ValueError(f"Estado inválido: {nuevo}")
+    ids = list(dict.fromkeys(int(pk) for pk in ids))
+    ordenes = Orden.objects.only('pk', 'estado', 'creado', 'total').in_bulk(ids)
+
+    resultados, grupos = {}, {}
+    for pk in ids:
+        orden = ordenes.get(pk)
+        if orden is None:
+            resultados[pk] = {'id': pk, 'ok': False, 'error': 'no existe'}
+        elif not permitida(orden.estado, nuevo):
+            resultados[pk] = {'id': pk, 'ok': False, 'estado': orden.estado,
+                              'error': f'transición {orden.estado} → {nuevo} no permitida'}
+        else:
+            grupos.setdefault(orden.estado, []).append(pk)
+
+    ahora = timezone.now()
+    # Un solo on_commit para los eventos de todas las órdenes movidas
+    with en_lote():
+        for anterior, pks in grupos.items():
+            movidas = _mover(pks, anterior, nuevo, ahora)
+            for pk in pks:
+                if pk in movidas:
+                    resultados[pk] = {'id': pk, 'ok': True, 'estado': nuevo}
+                else:
+                    resultados[pk] = {'id': pk, 'ok': False, 'error': 'la orden cambió de estado; reintenta'}
+            resumen.registrar_transiciones([ordenes[pk] for pk in movidas], anterior, nuevo)
+            bitacora.registrar(movidas, anterior, nuevo, en=ahora)
+            if nuevo == Estado.EN_COLA:
+                encolar(movidas)
+            for pk in movidas:
+                publicar_orden(EVENTO.get(nuevo, 'estado_cambiado'), ordenes[pk])
+    return [resultados[pk] for pk in ids]
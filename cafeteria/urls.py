@@ -15,18 +15,28 @@ urlpatterns = [
 
     # Cocina
     path('cocina/', views.kitchen, name='kitchen'),
+    path('cocina/eventos/', views.kitchen_eventos, name='kitchen_eventos'),
     path('cocina/cambiar/<int:orden_id>/<str:nuevo_estado>/',
          views.kitchen_cambiar_estado, name='kitchen_cambiar_estado'),
+    path('cocina/cambiar-lote/', views.kitchen_cambiar_lote, name='kitchen_cambiar_lote'),
+    path('cocina/estacion/<str:estacion>/', views.estacion, name='estacion'),
+    path('cocina/estacion/<str:estacion>/tomar/', views.estacion_tomar, name='estacion_tomar'),
+    path('cocina/comanda/<int:comanda_id>/terminar/', views.comanda_terminar, name='comanda_terminar'),
 
 
-    # API
+    # API (las dos lecturas async van antes que el router de DRF)
+    path('api/ordenes/estadisticas/', views.estadisticas, name='orden-estadisticas'),
+    path('api/menu/hoy/', views.menu_hoy, name='menu-hoy'),
     path('api/', include(api_router.urls)),
 
     path('catalogo/', views.catalogo, name='catalogo'),
 
      path('reportes/ordenes/', views.reporte_ordenes, name='reportes_ordenes'),
+     path('reportes/exportar/', views.exportar_ordenes, name='exportar_ordenes'),
 
      path('register/', views.register, name='register'),
+
+     path('metrics', views.metricas, name='metricas'),
      
 ]
 
@@ -1,6 +1,13 @@
+import unicodedata
 from datetime import datetime
 
-def generar_folio(seq: int) -> str:
+def generar_folio(seq: int, fecha=None) -> str:
 
-    hoy = datetime.now().strftime("%Y%m%d")
+    hoy = (fecha or datetime.now()).strftime("%Y%m%d")
     return f"{hoy}-{seq:04d}"
+
+def normalizar(texto: str) -> str:
+    # "  Café  con Leche" -> "cafe con leche": sin acentos, minúsculas, espacios simples
+    sin_acentos = unicodedata.normalize('NFKD', texto or '')
+    sin_acentos = ''.join(c for c in sin_acentos if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.casefold().split())
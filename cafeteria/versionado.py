@@ -0,0 +1,113 @@
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+# Un cambio puede confirmarse después de que otro cliente ya leyó un cursor
+# posterior a su "actualizado"; este margen lo vuelve a entregar (los clientes
+# aplican las filas como upsert, así que repetir es inocuo).
+MARGEN_SINCE = timedelta(seconds=5)
+
+
+def a_cursor(dt):
+    # Microsegundos desde epoch: opaco y seguro en query strings
+    return int(dt.timestamp() * 1_000_000) if dt else 0
+
+def desde_cursor(valor):
+    try:
+        return datetime.fromtimestamp(int(valor) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValidationError({'since': 'Cursor inválido'})
+
+
+class VersionadoMixin:
+    """GET condicional (ETag / Last-Modified) y sincronización por ``?since=``.
+
+    La versión de un listado es el ``Max('actualizado')`` y el conteo del
+    queryset filtrado (el conteo delata borrados), más el ``Max`` de los
+    modelos en ``versiones_extra`` que viajan anidados en la respuesta.
+    """
+    versiones_extra = ()
+
+    def filtrar_desde(self, qs, desde):
+        return qs.filter(actualizado__gt=desde)
+
+    def serializar_listado(self, qs):
+        # Punto de extensión para vistas que sirven el listado desde caché
+        return self.get_serializer(qs, many=True).data
+
+    def _version(self, qs):
+        agg = qs.order_by().aggregate(ultimo=Max('actualizado'), total=Count('pk'))
+        marcas = [agg['ultimo']] + [
+            m.objects.aggregate(u=Max('actualizado'))['u'] for m in self.versiones_extra
+        ]
+        ultimo = max((m for m in marcas if m), default=None)
+        firma = '|'.join(str(a_cursor(m)) for m in marcas) + f"|{agg['total']}"
+        etag = '"%s"' % hashlib.md5(firma.encode()).hexdigest()
+        return etag, ultimo, agg['total']
+
+    def _condicional(self, request, etag, ultimo):
+        return get_conditional_response(
+            request, etag=etag,
+            last_modified=int(ultimo.timestamp()) if ultimo else None,
+        )
+
+    def _con_cabeceras(self, resp, etag, ultimo):
+        resp['ETag'] = etag
+        if ultimo:
+            resp['Last-Modified'] = http_date(ultimo.timestamp())
+        return resp
+
+    def list(self, request, *args, **kwargs):
+        qs = self.filter_queryset(self.get_queryset())
+        since = request.query_params.get('since')
+        etag, ultimo, total = self._version(qs)
+        if since is None:
+            no_modificado = self._condicional(request, etag, ultimo)
+            if no_modificado is not None:
+                return no_modificado
+
+            page = self.paginate_queryset(qs)
+            if page is not None:
+                resp = self.get_paginated_response(self.get_serializer(page, many=True).data)
+            else:
+                resp = Response(self.serializar_listado(qs))
+            return self._con_cabeceras(resp, etag, ultimo)
+
+        # Modo delta: sólo filas cambiadas desde el cursor. No reporta borrados;
+        # si "total" no coincide con lo que tiene el cliente, debe resincronizar.
+        # Con paginación el delta también va por páginas ("next" conserva ?since=);
+        # el cliente guarda "cursor" hasta haber leído la última.
+        desde = desde_cursor(since)
+        cambios = self.filtrar_desde(qs, desde - MARGEN_SINCE)
+        page = self.paginate_queryset(cambios)
+        data = {
+            'cursor': a_cursor(ultimo) or since,
+            'total': total,
+            'results': self.get_serializer(cambios if page is None else page, many=True).data,
+        }
+        if page is not None:
+            data['next'] = self.paginator.get_next_link()
+        return self._con_cabeceras(Response(data), etag, ultimo)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            qs = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup]})
+        except (TypeError, ValueError, DjangoValidationError):
+            # Como get_object(): una llave que no es del tipo del campo es un 404
+            raise Http404
+        etag, ultimo, total = self._version(qs)
+        if total:
+            no_modificado = self._condicional(request, etag, ultimo)
+            if no_modificado is not None:
+                return no_modificado
+        resp = super().retrieve(request, *args, **kwargs)
+        return self._con_cabeceras(resp, etag, ultimo)
@@ -1,18 +1,44 @@
+from django.conf import settings
 from django.db import transaction
-from django.db.models import Prefetch, F
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404, render, redirect
-from django.http import HttpResponseBadRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from django.contrib.auth.decorators import login_required, permission_required
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
+from django.views.decorators.http import require_GET
 
-from .models import MenuDia, Producto, Orden, OrdenItem
+from .models import Comanda, Producto, Orden, OrdenItem
 from .forms import BuscarProductoForm, AddItemForm
-from .utils import generar_folio
+from .eventos import ESTADOS_COCINA, formato_sse, obtener_hub
+from . import cola, exportar, resumen
+from .busqueda import buscar_productos
+from .carrito import CarritoBorrador
+from .catalogo import amenu_del_dia, aobtener, productos_disponibles
+from .filtros import filtrar_archivadas, filtrar_ordenes, rango_fechas
+from .folios import siguiente_folio
+from .lineas import agregar_linea
+from .metricas import registro
+from .renderers import ORJSONRenderer
+from .serializers import MenuDiaSerializer
+from .transiciones import cambiar_estado
 
-def home(request):
+# Las vistas de lectura más concurridas son async: bajo config/asgi.py no
+# ocupan un hilo mientras esperan a la base de datos.
+async def _resolver_usuario(request):
+    # base.html lee request.user: se carga aquí con el ORM async y no de forma
+    # perezosa (síncrona) durante el render
+    request.user = await request.auser()
+
+def _json(data, status=200):
+    return HttpResponse(ORJSONRenderer().render(data), status=status, content_type='application/json')
+
+async def home(request):
     hoy = timezone.localdate()
-    menu = MenuDia.objects.filter(fecha=hoy, publicado=True).first()
+    menu = await amenu_del_dia(hoy)
+    await _resolver_usuario(request)
     return render(request, 'home.html', {'menu': menu, 'hoy': hoy})
 
 # -------- POS ----------
@@ -20,24 +46,21 @@ def home(request):
 @permission_required('cafeteria.add_orden', raise_exception=True)
 def pos(request):
     form = BuscarProductoForm(request.GET or None)
-    productos = (Producto.objects
-                 .filter(disponible=True)
-                 .select_related('categoria')
-                 .order_by('nombre'))
+    # Lista en caché del catálogo: sin query ni COUNT para paginar
+    productos = productos_disponibles()
     if form.is_valid() and form.cleaned_data.get('q'):
-        q = form.cleaned_data['q']
-        productos = productos.filter(nombre__icontains=q)
+        productos = buscar_productos(form.cleaned_data['q'])
 
     paginator = Paginator(productos, 12)
     page = request.GET.get('page')
     productos_page = paginator.get_page(page)
 
-    # Orden actual en sesión con prefetch
+    # Orden actual en sesión con prefetch (o el carrito borrador, sin queries)
     orden_id = request.session.get('orden_id')
     orden = (Orden.objects
              .filter(pk=orden_id)
              .prefetch_related('items__producto')
-             .first()) if orden_id else None
+             .first()) if orden_id else CarritoBorrador.de_sesion(request.session)
 
     return render(request, 'pos.html', {
         'form': form,
@@ -49,9 +72,13 @@ def pos(request):
 @permission_required('cafeteria.add_orden', raise_exception=True)
 @transaction.atomic
 def pos_nueva_orden(request):
-    hoy = timezone.localdate()
-    conteo = Orden.objects.filter(creado__date=hoy).count() + 1
-    folio = generar_folio(conteo)
+    if settings.POS_CARRITO_BORRADOR:
+        # La orden se crea hasta cobrar; mientras tanto vive en la sesión
+        request.session.pop('orden_id', None)
+        CarritoBorrador().guardar(request.session)
+        return redirect('pos')
+    CarritoBorrador.descartar(request.session)
+    folio = siguiente_folio()
     orden = Orden.objects.create(folio=folio, creada_por=request.user)
     request.session['orden_id'] = orden.id
     return redirect('pos')
@@ -66,32 +93,22 @@ def pos_add_item(request):
     if not form.is_valid():
         return HttpResponseBadRequest("Datos inválidos")
 
+    carrito = CarritoBorrador.de_sesion(request.session)
+    if carrito is not None:
+        carrito.agregar(form.cleaned_data['producto_id'], form.cleaned_data['cantidad'])
+        carrito.guardar(request.session)
+        return render(request, 'partials/_carrito.html', {'orden': carrito, 'hx': True})
+
     orden_id = request.session.get('orden_id')
     if not orden_id:
         return HttpResponseBadRequest("No hay orden activa")
-    orden = get_object_or_404(Orden, pk=orden_id)
-
     producto = get_object_or_404(Producto, pk=form.cleaned_data['producto_id'], disponible=True)
-    cantidad = form.cleaned_data['cantidad']
-
-    item, created = OrdenItem.objects.get_or_create(
-        orden=orden, producto=producto,
-        defaults={'cantidad': cantidad, 'precio_unitario': producto.precio, 'subtotal': 0}
-    )
-    if not created:
-        # Suma atómica de cantidades y asegura precio actual
-        OrdenItem.objects.filter(pk=item.pk).update(
-            cantidad=F('cantidad') + cantidad,
-            precio_unitario=producto.precio
-        )
-        item.refresh_from_db()
-
-    # Refresca Orden con items para traer totales actualizados (señales)
-    orden.refresh_from_db()
-    orden = (Orden.objects
-             .filter(pk=orden.pk)
-             .prefetch_related('items__producto')
-             .get())
+    if not agregar_linea(orden_id, producto, form.cleaned_data['cantidad']):
+        raise Http404("La orden no existe")
+
+    # Una sola lectura del carrito fresco: orden + items con su producto
+    items = OrdenItem.objects.select_related('producto')
+    orden = Orden.objects.prefetch_related(Prefetch('items', queryset=items)).get(pk=orden_id)
 
     # Devuelve parcial del carrito (con wrapper #carrito). OOB actualizará acciones.
     return render(request, 'partials/_carrito.html', {'orden': orden, 'hx': True})
@@ -100,6 +117,13 @@ def pos_add_item(request):
 @permission_required('cafeteria.change_orden', raise_exception=True)
 @transaction.atomic
 def pos_eliminar_item(request, item_id):
+    carrito = CarritoBorrador.de_sesion(request.session)
+    if carrito is not None:
+        # En el borrador el id de la línea es el del producto
+        carrito.quitar(item_id)
+        carrito.guardar(request.session)
+        return render(request, 'partials/_carrito.html', {'orden': carrito, 'hx': True})
+
     orden_id = request.session.get('orden_id')
     if not orden_id:
         return HttpResponseBadRequest("No hay orden activa")
@@ -107,7 +131,6 @@ def pos_eliminar_item(request, item_id):
     item = get_object_or_404(OrdenItem, pk=item_id, orden=orden)
     item.delete()
 
-    orden.refresh_from_db()
     orden = (Orden.objects
              .filter(pk=orden.pk)
              .prefetch_related('items__producto')
@@ -119,19 +142,34 @@ def pos_eliminar_item(request, item_id):
 @permission_required('cafeteria.change_orden', raise_exception=True)
 @transaction.atomic
 def pos_cobrar(request):
+    carrito = CarritoBorrador.de_sesion(request.session)
+    if carrito is not None:
+        try:
+            orden = carrito.persistir(request.user)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        if orden is None:
+            return HttpResponseBadRequest("La orden no tiene productos")
+        CarritoBorrador.descartar(request.session)
+        request.session['orden_id'] = orden.id
+        orden = (Orden.objects
+                 .filter(pk=orden.pk)
+                 .prefetch_related('items__producto')
+                 .get())
+        return render(request, 'partials/_carrito.html', {'orden': orden, 'hx': True})
+
     orden_id = request.session.get('orden_id')
     if not orden_id:
         return HttpResponseBadRequest("No hay orden activa")
-    orden = get_object_or_404(Orden, pk=orden_id)
-    if not orden.items.exists():
+    if not OrdenItem.objects.filter(orden_id=orden_id).exists():
         return HttpResponseBadRequest("La orden no tiene productos")
 
-    orden.estado = Orden.Estado.PAGADA
-    orden.save()
+    resultado, = cambiar_estado([orden_id], Orden.Estado.PAGADA)
+    if not resultado['ok']:
+        return HttpResponseBadRequest(resultado['error'])
 
-    orden.refresh_from_db()
     orden = (Orden.objects
-             .filter(pk=orden.pk)
+             .filter(pk=orden_id)
              .prefetch_related('items__producto')
              .get())
 
@@ -146,8 +184,10 @@ def pos_enviar_cocina(request):
     orden = get_object_or_404(Orden, pk=orden_id)
     if orden.estado != Orden.Estado.PAGADA:
         return HttpResponseBadRequest("La orden debe estar PAGADA")
-    orden.estado = Orden.Estado.EN_COLA
-    orden.save()
+    # Comandas, rollup, bitácora y el evento a cocina los registra cambiar_estado
+    resultado, = cambiar_estado([orden.pk], Orden.Estado.EN_COLA)
+    if not resultado['ok']:
+        return HttpResponseBadRequest(resultado['error'])
     # limpiar sesión
     request.session.pop('orden_id', None)
     return redirect('pos')
@@ -155,28 +195,141 @@ def pos_enviar_cocina(request):
 # -------- Cocina ----------
 @login_required
 @permission_required('cafeteria.change_orden', raise_exception=True)
-def kitchen(request):
-    estados = [Orden.Estado.EN_COLA, Orden.Estado.EN_PREPARACION, Orden.Estado.LISTA]
+async def kitchen(request):
     ordenes = (Orden.objects
-               .filter(estado__in=estados)
+               .filter(estado__in=ESTADOS_COCINA)
                .order_by('creado')
+               .select_related('creada_por')
                .prefetch_related('items__producto'))
-    return render(request, 'kitchen.html', {'ordenes': ordenes})
+    ordenes = [o async for o in ordenes]
+    await _resolver_usuario(request)
+    return render(request, 'kitchen.html', {'ordenes': ordenes, 'estaciones': await cola.aestaciones()})
+
+@login_required
+@permission_required('cafeteria.change_orden', raise_exception=True)
+def estacion(request, estacion):
+    return render(request, 'estacion.html', {
+        'estacion': estacion,
+        'comandas': cola.en_curso(estacion, request.user),
+        'pendientes': cola.estaciones().get(estacion, 0),
+    })
+
+@login_required
+@permission_required('cafeteria.change_orden', raise_exception=True)
+def estacion_tomar(request, estacion):
+    if request.method != "POST":
+        return HttpResponseBadRequest("POST requerido")
+    comanda = cola.tomar_siguiente(estacion, request.user)
+    if request.headers.get('HX-Request') != 'true':
+        return redirect('estacion', estacion=estacion)
+    if comanda is None:
+        return HttpResponse(status=204)
+    c, = cola.con_lineas(Comanda.objects.filter(pk=comanda.pk))
+    return render(request, 'partials/_comanda.html', {'c': c})
+
+@login_required
+@permission_required('cafeteria.change_orden', raise_exception=True)
+def comanda_terminar(request, comanda_id):
+    if request.method != "POST":
+        return HttpResponseBadRequest("POST requerido")
+    comanda = get_object_or_404(Comanda, pk=comanda_id, cocinero=request.user)
+    if not cola.terminar(comanda):
+        return HttpResponse("La comanda ya estaba terminada", status=409)
+    if request.headers.get('HX-Request') == 'true':
+        return HttpResponse('')
+    return redirect('estacion', estacion=comanda.estacion)
 
 @login_required
 @permission_required('cafeteria.change_orden', raise_exception=True)
 @transaction.atomic
 def kitchen_cambiar_estado(request, orden_id, nuevo_estado):
-    orden = get_object_or_404(Orden, pk=orden_id)
-    validos = {e for e, _ in Orden.Estado.choices}
-    if nuevo_estado not in validos:
+    if nuevo_estado not in Orden.Estado.values:
         return HttpResponseBadRequest("Estado inválido")
-    orden.estado = nuevo_estado
-    orden.save()
+    r, = cambiar_estado([orden_id], nuevo_estado)
+    if not r['ok']:
+        if r['error'] == 'no existe':
+            raise Http404("La orden no existe")
+        return HttpResponse(r['error'], status=409)
     if request.headers.get('HX-Request') == 'true':
+        orden = (Orden.objects.select_related('creada_por')
+                 .prefetch_related('items__producto').get(pk=orden_id))
         return render(request, 'partials/_card_orden.html', {'o': orden})
     return redirect('kitchen')
 
+@login_required
+@permission_required('cafeteria.change_orden', raise_exception=True)
+def kitchen_cambiar_lote(request):
+    # Varias órdenes al mismo estado; las tarjetas se actualizan por SSE
+    if request.method != "POST":
+        return HttpResponseBadRequest("POST requerido")
+    nuevo_estado = request.POST.get('estado', '')
+    try:
+        ids = [int(pk) for pk in request.POST.getlist('ordenes')]
+        resultados = cambiar_estado(ids, nuevo_estado)
+    except ValueError:
+        return HttpResponseBadRequest("Datos inválidos")
+    return render(request, 'partials/_resultado_lote.html', {
+        'resultados': resultados, 'aplicadas': sum(r['ok'] for r in resultados)})
+
+@login_required
+@permission_required('cafeteria.change_orden', raise_exception=True)
+async def kitchen_eventos(request):
+    # Server-sent events: pensado para servirse por config/asgi.py
+    hub = obtener_hub()
+
+    async def stream():
+        with hub.suscribir() as sub:
+            yield ": conectado\n\n"
+            while True:
+                evento = await sub.recibir(timeout=15)
+                yield formato_sse(evento) if evento else ": ping\n\n"
+
+    resp = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    resp['Cache-Control'] = 'no-cache'
+    resp['X-Accel-Buffering'] = 'no'
+    return resp
+
+# -------- API de lectura (async, fuera de DRF) ----------
+@require_GET
+async def estadisticas(request):
+    # Se lee del rollup diario: una búsqueda por fecha, o una suma por rango.
+    # Lectura pública como en la API (DjangoModelPermissionsOrAnonReadOnly): sin sesión
+    try:
+        desde, hasta = rango_fechas(request.GET)
+    except ValueError as e:
+        return _json({'detail': str(e)}, status=400)
+
+    r = await resumen.aleer(desde, hasta)
+    data = {
+        "total_ordenes": r['total_ordenes'],
+        "pendientes_pago": r['pendientes_pago'],
+        "pagadas": r['pagadas'],
+        "en_cola": r['en_cola'],
+        "en_preparacion": r['en_preparacion'],
+        "listas": r['listas'],
+        "entregadas": r['entregadas'],
+    }
+    if desde == hasta:
+        data = {"fecha": str(desde), "total_ventas_hoy": float(r['total_ventas']),
+                "total_ordenes_hoy": data.pop('total_ordenes'), **data}
+    else:
+        data = {"desde": str(desde), "hasta": str(hasta),
+                "total_ventas": float(r['total_ventas']), **data}
+    return _json(data)
+
+@require_GET
+async def menu_hoy(request):
+    hoy = timezone.localdate()
+
+    async def construir():
+        menu = await amenu_del_dia(hoy)
+        return {'data': dict(MenuDiaSerializer(menu).data) if menu else None}
+
+    data = (await aobtener(f'menu_api:{hoy}', construir))['data']
+    if data is None:
+        return _json({'detail': 'Sin menú para hoy'}, status=404)
+    return _json(data)
+
 @login_required
 def catalogo(request):
     return render(request, 'catalogo.html')
@@ -186,6 +339,28 @@ def catalogo(request):
 def reporte_ordenes(request):
     return render(request, 'reportes_ordenes.html')
 
+@login_required
+@permission_required('cafeteria.view_orden', raise_exception=True)
+def exportar_ordenes(request):
+    tipo = request.GET.get('tipo', 'ordenes')
+    formato = request.GET.get('formato', 'csv')
+    try:
+        exportar.validar(tipo, formato)
+        ordenes = filtrar_ordenes(Orden.objects.all(), request.GET)
+        archivadas = filtrar_archivadas(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    # Se escribe fila por fila conforme llega del cursor: memoria constante
+    content_type = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    # Bajo ASGI el contenido tiene que ser async para no juntarse completo en memoria
+    generar = exportar.agenerar if isinstance(request, ASGIRequest) else exportar.generar
+    resp = StreamingHttpResponse(generar(tipo, formato, ordenes, archivadas),
+                                 content_type=f'{content_type}; charset=utf-8')
+    nombre = f"{tipo}_{request.GET.get('desde') or timezone.localdate()}.{formato}"
+    resp['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return resp
+
 from django.contrib.auth import login
 from django.contrib.auth.forms import UserCreationForm
 
@@ -201,4 +376,15 @@ def register(request):
             return redirect('home')
     else:
         form = UserCreationForm()
-    return render(request, 'registration/register.html', {'form': form})
\ No newline at end of file
+    return render(request, 'registration/register.html', {'form': form})
+
+def metricas(request):
+    # Histogramas por vista en formato de texto de Prometheus (por proceso)
+    # Con token, el scraper lo manda como Bearer; sin token sólo el staff con sesión
+    token = settings.METRICAS_TOKEN
+    if token:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse(status=401)
+    elif not request.user.is_staff:
+        raise Http404
+    return HttpResponse(registro.exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
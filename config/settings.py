@@ -30,8 +30,9 @@ INSTALLED_APPS = [
 # ⚙️ Middleware
 # =========================
 MIDDLEWARE = [
+    'cafeteria.metricas.MetricasMiddleware',  # primero: mide la petición completa
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'cafeteria.estaticos.EstaticosMiddleware',  # WhiteNoise que también corre async
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -41,16 +42,19 @@ MIDDLEWARE = [
 ]
 
 # =========================
-# 🔗 URLs / WSGI
+# 🔗 URLs / WSGI / ASGI
 # =========================
 ROOT_URLCONF = 'config.urls'
 WSGI_APPLICATION = 'config.wsgi.application'
+# Producción (Procfile): gunicorn con workers de uvicorn sobre config/asgi.py
+ASGI_APPLICATION = 'config.asgi.application'
 
 # =========================
 # 📝 Templates
 # =========================
 TEMPLATES = [{
-    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    # DjangoTemplates que además mide el tiempo de render (ver cafeteria/metricas.py)
+    'BACKEND': 'cafeteria.metricas.PlantillasMedidas',
     'DIRS': [BASE_DIR / 'templates'],
     'OPTIONS': {
         'loaders': [
@@ -133,8 +137,49 @@ LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
 
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    # ModelBackend con los permisos de cada usuario en caché (ver cafeteria/permisos.py)
+    'cafeteria.permisos.PermisosCacheadosBackend',
 ]
+# Con locmem otro worker ve un cambio de roles hasta que expira su copia
+PERMISOS_CACHE_TTL = env.int('PERMISOS_CACHE_TTL', default=300)
+
+# =========================
+# 🗄 Caché
+# =========================
+# Por defecto memoria local (por proceso); CACHE_URL permite p.ej. redis://...
+CACHES = {'default': env.cache_url('CACHE_URL', default='locmemcache://')}
+# Con locmem cada worker invalida sólo su copia: el TTL acota lo que tarda en ver cambios de otro
+CATALOGO_CACHE_TTL = env.int('CATALOGO_CACHE_TTL', default=300)
+
+# =========================
+# 🛒 POS
+# =========================
+# Carrito en sesión: la Orden y sus líneas se escriben hasta cobrar
+POS_CARRITO_BORRADOR = env.bool('POS_CARRITO_BORRADOR', default=False)
+# Con sesiones en base cada clic del carrito sigue escribiendo django_session; con
+# CACHE_URL compartido (redis://...) usar django.contrib.sessions.backends.cache
+# para que la captura no toque la base. Con locmem no: cada worker tendría sus sesiones.
+SESSION_ENGINE = env('SESSION_ENGINE', default='django.contrib.sessions.backends.db')
+
+# =========================
+# 🗃 Archivo de órdenes
+# =========================
+# Días completos de órdenes ENTREGADA que se quedan en las tablas vivas (ver archivar_ordenes)
+ARCHIVO_RETENCION_DIAS = env.int('ARCHIVO_RETENCION_DIAS', default=31)
+
+# =========================
+# 📡 Eventos de cocina (SSE)
+# =========================
+# HubLocal sirve para un solo proceso; con varios workers usar un hub sobre broker externo
+COCINA_HUB = env('COCINA_HUB', default='cafeteria.eventos.HubLocal')
+
+# =========================
+# 📈 Métricas
+# =========================
+# Peticiones más lentas que esto se registran en el logger "cafeteria.lento" con su SQL
+METRICAS_LENTO_MS = env.int('METRICAS_LENTO_MS', default=500)
+# Si se define, /metrics exige "Authorization: Bearer <token>"; si no, sólo lo ve el staff
+METRICAS_TOKEN = env('METRICAS_TOKEN', default='')
 
 # =========================
 # 🔥 DRF (si lo usas)
@@ -145,5 +190,15 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly',
-    ]
+    ],
+    # orjson: Decimal como texto y fechas ISO 8601, más rápido que el json estándar
+    'DEFAULT_RENDERER_CLASSES': [
+        'cafeteria.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'cafeteria.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }